@@ -4,23 +4,55 @@
 # Django imports
 from django.apps import AppConfig
 from django.conf import settings
-from django.core.checks import register
-from django.db.models.signals import post_save
+from django.core.checks import Tags, register
+from django.core.signals import (
+    request_finished, request_started, setting_changed,
+)
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.utils import six
+from django.utils.module_loading import import_string
 
 # app imports
-from auth_enhanced.checks import check_settings_values
-from auth_enhanced.email import (
-    callback_admin_information_new_signup,
-    callback_user_signup_email_verification,
+from auth_enhanced.cache import (
+    callback_end_request_memo, callback_invalidate_status,
+    callback_start_request_memo,
+)
+from auth_enhanced.checks import (
+    DAE_PERFORMANCE_TAG, check_email_index, check_performance,
+    check_settings_values,
 )
 from auth_enhanced.exceptions import AuthEnhancedConversionError
 from auth_enhanced.settings import (
     DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_CONST_VERIFICATION_TOKEN_MAX_AGE,
-    convert_to_seconds, set_app_default_settings,
+    callback_refresh_app_settings, convert_to_seconds, refresh_app_settings,
+    set_app_default_settings,
 )
 
 
+def lazy_callback(dotted_path):
+    """Returns a signal callback, that imports the actual callback, when it is
+    called.
+
+    This keeps expensive modules (i.e. 'email.py', which pulls in Django's mail
+    and template machinery) out of the startup of processes, that never
+    trigger the signal. The callback is resolved on every call, so it can be
+    mocked in tests."""
+
+    def callback(sender, **kwargs):
+        return import_string(dotted_path)(sender, **kwargs)
+
+    callback.__name__ = str(dotted_path.rsplit('.', 1)[-1])
+    callback.__doc__ = "Lazily calls '{}'.".format(dotted_path)
+
+    return callback
+
+
+# the callbacks are module-level objects, because signals only keep weak
+#   references to their receivers
+callback_admin_information_new_signup = lazy_callback('auth_enhanced.email.callback_admin_information_new_signup')
+callback_user_signup_email_verification = lazy_callback('auth_enhanced.email.callback_user_signup_email_verification')
+
+
 class AuthEnhancedConfig(AppConfig):
     """App specific configuration class
 
@@ -53,8 +85,16 @@ class AuthEnhancedConfig(AppConfig):
                     DAE_CONST_VERIFICATION_TOKEN_MAX_AGE
                 )
 
+        # parse the settings once, the app's modules use the resulting object
+        #   instead of Django's settings. It is rebuilt, whenever an
+        #   app-specific setting is changed.
+        app_settings = refresh_app_settings()
+        setting_changed.connect(callback_refresh_app_settings, dispatch_uid='DAE_refresh_app_settings')
+
         # register app-specific system checks
         register(check_settings_values)
+        register(check_performance, DAE_PERFORMANCE_TAG, deploy=True)
+        register(check_email_index, DAE_PERFORMANCE_TAG, Tags.database, deploy=True)
 
         # add a 'post_save'-callback to automatically create a UserEnhancement,
         #   whenever a User-object is created.
@@ -68,7 +108,7 @@ class AuthEnhancedConfig(AppConfig):
         #   registered user.
         #   Please note: the callback is only registered, if the corresponding
         #   setting is not False.
-        if settings.DAE_ADMIN_SIGNUP_NOTIFICATION:
+        if app_settings.admin_signup_notification:
             post_save.connect(
                 callback_admin_information_new_signup,
                 sender=settings.AUTH_USER_MODEL,
@@ -80,9 +120,52 @@ class AuthEnhancedConfig(AppConfig):
         #   This means, an automatic email verification is only available in
         #   that mode. However, users may verify their email addresses by a
         #   manual process.
-        if settings.DAE_OPERATION_MODE == DAE_CONST_MODE_EMAIL_ACTIVATION:
+        if app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION:
             post_save.connect(
                 callback_user_signup_email_verification,
                 sender=settings.AUTH_USER_MODEL,
                 dispatch_uid='DAE_user_signup_email_verification'
             )
+
+        # add 'post_save'- and 'post_delete'-callbacks to invalidate the cached
+        #   email verification status (see 'cache.py')
+        post_save.connect(
+            callback_invalidate_status,
+            sender=self.get_model('UserEnhancement'),
+            dispatch_uid='DAE_invalidate_status_on_save'
+        )
+        post_delete.connect(
+            callback_invalidate_status,
+            sender=self.get_model('UserEnhancement'),
+            dispatch_uid='DAE_invalidate_status_on_delete'
+        )
+
+        # the per-request memo of the status cache is bound to the lifetime
+        #   of requests
+        request_started.connect(callback_start_request_memo, dispatch_uid='DAE_start_request_memo')
+        request_finished.connect(callback_end_request_memo, dispatch_uid='DAE_end_request_memo')
+
+        # add callbacks to keep the per-status counters up to date (see
+        #   'models.VerificationStatusCounter')
+        counter_model = self.get_model('VerificationStatusCounter')
+        pre_save.connect(
+            counter_model.callback_status_pre_save,
+            sender=self.get_model('UserEnhancement'),
+            dispatch_uid='DAE_count_status_pre_save'
+        )
+        post_save.connect(
+            counter_model.callback_status_post_save,
+            sender=self.get_model('UserEnhancement'),
+            dispatch_uid='DAE_count_status_post_save'
+        )
+        post_delete.connect(
+            counter_model.callback_status_post_delete,
+            sender=self.get_model('UserEnhancement'),
+            dispatch_uid='DAE_count_status_post_delete'
+        )
+
+        # load the things, that are required to sign up users, in advance
+        #   (see 'warmup.py'). The module is only imported, if it is required.
+        if app_settings.warmup_on_ready:
+            from auth_enhanced.warmup import READY_STEPS, warmup
+            warmup(READY_STEPS)
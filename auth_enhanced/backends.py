@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Contains app-specific authentication backends.
+
+The backend is activated by including it in the project's settings, i.e.
+    AUTHENTICATION_BACKENDS = ['auth_enhanced.backends.AuthEnhancedBackend', ]
+
+It is a drop-in replacement for Django's 'ModelBackend', that loads the
+'UserEnhancement' together with the User object. Accessing
+'request.user.enhancement' will then *not* cause another database query."""
+
+# Django imports
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.base_user import BaseUserManager
+from django.db.models import prefetch_related_objects
+from django.utils import six
+
+# app imports
+from auth_enhanced.models import UserEnhancement
+from auth_enhanced.settings import (
+    DAE_CONST_MODE_EMAIL_ACTIVATION, get_app_settings,
+)
+
+
+class AuthEnhancedBackend(ModelBackend):
+    """Authenticates against the project's User model and joins the
+    'UserEnhancement' into every lookup.
+
+    Optionally, logins of accounts with unverified email addresses are
+    rejected (see 'DAE_LOGIN_REQUIRE_VERIFIED_EMAIL')."""
+
+    def _get_user_queryset(self):
+        """Returns the queryset, that is used to look up users."""
+
+        # 'enhancement' is the reverse side of a OneToOneField, so this results
+        #   in a LEFT OUTER JOIN. Users without an enhancement are still found.
+        return get_user_model()._default_manager.select_related('enhancement')
+
+    def _get_user_by_natural_key(self, username):
+        """Returns the user with the given username, including its enhancement.
+
+        If the project's user manager overrides 'get_by_natural_key()' (i.e.
+        to look up usernames case-insensitively), its lookup is used and the
+        enhancement is fetched by another query. Otherwise, the enhancement is
+        joined into the lookup of Django's 'BaseUserManager'."""
+
+        user_model = get_user_model()
+        manager = user_model._default_manager
+
+        if (
+            six.get_unbound_function(type(manager).get_by_natural_key) is
+            six.get_unbound_function(BaseUserManager.get_by_natural_key)
+        ):
+            return self._get_user_queryset().get(**{user_model.USERNAME_FIELD: username})
+
+        user = manager.get_by_natural_key(username)
+        prefetch_related_objects([user], 'enhancement')
+        return user
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        """Mimics 'ModelBackend.authenticate()', but fetches the user by
+        using '_get_user_by_natural_key()'."""
+
+        user_model = get_user_model()
+
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+
+        try:
+            user = self._get_user_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            #   difference between an existing and a nonexistent user
+            #   (see Django's ModelBackend).
+            user_model().set_password(password)
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+
+    def get_user(self, user_id):
+        """Returns the user (including its enhancement) for the session."""
+
+        try:
+            user = self._get_user_queryset().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+
+        return user if self.user_can_authenticate(user) else None
+
+    def user_can_authenticate(self, user):
+        """Rejects inactive users and, if required by the app's settings,
+        users with unverified email addresses."""
+
+        if not super(AuthEnhancedBackend, self).user_can_authenticate(user):
+            return False
+
+        app_settings = get_app_settings()
+        if (
+            app_settings.login_require_verified_email and
+            app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION
+        ):
+            # the enhancement was already fetched by '_get_user_queryset()',
+            #   so this does not hit the database
+            try:
+                return user.enhancement.email_is_verified
+            except UserEnhancement.DoesNotExist:
+                return False
+
+        return True
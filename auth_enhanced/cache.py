@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Provides the caching layer for the users' email verification status.
+
+The status is looked up on hot paths (templates, permission checks, ...), so
+'UserEnhancement.get_status_cached()' does not query the database on every
+call. Two layers are applied:
+    1) a per-request memo, that lives in the current thread and is only
+        active between Django's 'request_started' and 'request_finished'
+        signals. Repeated lookups within one request cost nothing.
+    2) Django's cache framework (the 'default' cache), using the app's
+        settings 'DAE_STATUS_CACHE_PREFIX' and 'DAE_STATUS_CACHE_TIMEOUT'.
+
+Additionally, the status is cached together with the point in time of its
+last change (see 'UserEnhancement.get_status_info_cached()'), which provides
+the validators of 'EmailVerificationStatusView'. These values skip the
+per-request memo, because they are only read once per request.
+
+The cached values are invalidated by signal callbacks, whenever an
+UserEnhancement is saved or deleted (see 'apps.py'), as soon as the
+surrounding transaction is committed. Code, that modifies the status without
+triggering these signals (i.e. 'QuerySet.update()'), has to call
+'invalidate_cached_status()' itsself, preferably by 'transaction.on_commit()'."""
+
+# Python imports
+import threading
+
+# Django imports
+from django.core.cache import cache
+from django.db import transaction
+
+# app imports
+from auth_enhanced.instrumentation import timed
+from auth_enhanced.settings import (
+    DAE_CONST_REPLICA_LAG_WINDOW, get_app_settings,
+)
+
+# this object holds the per-request memo of the current thread
+_request_memo = threading.local()
+
+
+def get_status_cache_key(user_id):
+    """Returns the cache key for the status of the given user."""
+
+    return '{}:{}'.format(get_app_settings().status_cache_prefix, user_id)
+
+
+def get_status_info_cache_key(user_id):
+    """Returns the cache key for the status info of the given user."""
+
+    return '{}:info:{}'.format(get_app_settings().status_cache_prefix, user_id)
+
+
+def get_changed_cache_key(user_id):
+    """Returns the cache key, that marks the status of the given user as
+    recently changed."""
+
+    return '{}:changed:{}'.format(get_app_settings().status_cache_prefix, user_id)
+
+
+def is_recently_changed(user_id):
+    """Returns True, if the status of the given user has been changed within
+    the last 'DAE_CONST_REPLICA_LAG_WINDOW' seconds.
+
+    The status is only marked, if there is a 'DAE_READ_DATABASE'."""
+
+    return bool(cache.get(get_changed_cache_key(user_id)))
+
+
+def get_cached_status(user_id):
+    """Returns the cached status of the given user or None, if the status is
+    not cached."""
+
+    memo = getattr(_request_memo, 'statuses', None)
+    if memo is not None and user_id in memo:
+        return memo[user_id]
+
+    status = cache.get(get_status_cache_key(user_id))
+    if status is not None and memo is not None:
+        memo[user_id] = status
+
+    return status
+
+
+def set_cached_status(user_id, status):
+    """Stores the status of the given user in both layers of the cache."""
+
+    memo = getattr(_request_memo, 'statuses', None)
+    if memo is not None:
+        memo[user_id] = status
+
+    cache.set(get_status_cache_key(user_id), status, get_app_settings().status_cache_timeout)
+
+
+def get_cached_status_info(user_id):
+    """Returns the cached tuple of (STATUS, CHANGED_AT) of the given user or
+    None, if it is not cached."""
+
+    return cache.get(get_status_info_cache_key(user_id))
+
+
+def set_cached_status_info(user_id, status_info):
+    """Stores the tuple of (STATUS, CHANGED_AT) of the given user."""
+
+    cache.set(get_status_info_cache_key(user_id), status_info, get_app_settings().status_cache_timeout)
+
+
+def invalidate_cached_status(user_ids):
+    """Removes the status of the given users from both layers of the cache."""
+
+    memo = getattr(_request_memo, 'statuses', None)
+    if memo is not None:
+        for user_id in user_ids:
+            memo.pop(user_id, None)
+
+    cache.delete_many(
+        [get_status_cache_key(user_id) for user_id in user_ids] +
+        [get_status_info_cache_key(user_id) for user_id in user_ids]
+    )
+
+    # the status is not read from a (possibly lagging) replica, until the
+    #   change has been replicated (see 'UserEnhancement.get_status_database()')
+    if get_app_settings().read_database is not None:
+        cache.set_many(
+            dict((get_changed_cache_key(user_id), True) for user_id in user_ids),
+            DAE_CONST_REPLICA_LAG_WINDOW
+        )
+
+
+@timed('invalidate_status')
+def callback_invalidate_status(sender, instance, **kwargs):
+    """Invalidates the cached status of a saved or deleted UserEnhancement.
+
+    The cache is only invalidated, when the surrounding transaction is
+    committed. Otherwise, a concurrent request could read the old row in the
+    meantime and put it into the cache again.
+
+    This function acts like a callback to 'post_save'- and 'post_delete'-
+    signals."""
+
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_cached_status([user_id]), using=kwargs.get('using'))
+
+
+def callback_start_request_memo(sender, **kwargs):
+    """Activates the per-request memo.
+
+    This function acts like a callback to the 'request_started'-signal."""
+
+    _request_memo.statuses = {}
+
+
+def callback_end_request_memo(sender, **kwargs):
+    """Deactivates (and empties) the per-request memo.
+
+    This function acts like a callback to the 'request_finished'-signal."""
+
+    _request_memo.statuses = None
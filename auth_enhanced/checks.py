@@ -6,23 +6,41 @@ https://docs.djangoproject.com/en/dev/ref/checks/ for details.
 
 There are two different types of checks:
 1) checks, that all app-specific settings are set to accepted values
-2) checks, that the logical connection between different settings is valid"""
+2) checks, that the logical connection between different settings is valid
 
+Additionally, there are performance checks ('dae.p0xx'), that report
+configurations, that will not work well at scale. They are registered as
+deployment checks with the tag 'dae_performance' and may be run by
+    python manage.py check --deploy --tag dae_performance
+The check for an index on the email column queries the database, so it is
+only run, if one of the tags 'dae_performance' or 'database' is requested."""
+
+
+# Python imports
+import re
 
 # Django imports
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.checks import Error, Warning
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db import connections, router
 from django.utils import six
 from django.utils.translation import ugettext_lazy as _
 
 # app imports
+from auth_enhanced.exceptions import AuthEnhancedConversionError
 from auth_enhanced.settings import (
-    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
-    DAE_CONST_MODE_MANUAL_ACTIVATION, DAE_CONST_RECOMMENDED_LOGIN_URL,
+    DAE_CONST_MAX_NOTIFICATION_RECIPIENTS, DAE_CONST_MODE_AUTO_ACTIVATION,
+    DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_CONST_MODE_MANUAL_ACTIVATION,
+    DAE_CONST_RECOMMENDED_LOGIN_URL, get_app_settings, get_mail_template_names,
+    parse_rate_limits,
 )
 
+# the tag of the performance checks
+DAE_PERFORMANCE_TAG = 'dae_performance'
+
 # DAE_OPERATION_MODE
 E001 = Error(
     _("'DAE_OPERATION_MODE' is set to an invalid value!"),
@@ -136,6 +154,230 @@ E010 = Error(
     id='dae.e010'
 )
 
+# DAE_LOGIN_REQUIRE_VERIFIED_EMAIL
+E011 = Error(
+    _("'DAE_LOGIN_REQUIRE_VERIFIED_EMAIL' has to be a boolean value!"),
+    hint=_(
+        "Please check your settings and ensure, that "
+        "'DAE_LOGIN_REQUIRE_VERIFIED_EMAIL' is set to either 'True' or "
+        "'False' (default: False)."
+    ),
+    id='dae.e011'
+)
+
+# DAE_STATUS_CACHE_PREFIX
+E012 = Error(
+    _("'DAE_STATUS_CACHE_PREFIX' has to be a string!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_STATUS_CACHE_PREFIX' "
+        "is set to a string-value (default: 'dae_status')."
+    ),
+    id='dae.e012'
+)
+
+# DAE_STATUS_CACHE_TIMEOUT
+E013 = Error(
+    _("'DAE_STATUS_CACHE_TIMEOUT' has to be an integer!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_STATUS_CACHE_TIMEOUT' "
+        "is set to an integer value, specifying the timeout in seconds "
+        "(default: 300)."
+    ),
+    id='dae.e013'
+)
+
+# DAE_READ_DATABASE
+E014 = Error(
+    _("'DAE_READ_DATABASE' has to be None or the alias of a configured database!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_READ_DATABASE' is "
+        "either set to None or to a key of your 'DATABASES'-setting "
+        "(default: None)."
+    ),
+    id='dae.e014'
+)
+
+# DAE_WARMUP_ON_READY
+E015 = Error(
+    _("'DAE_WARMUP_ON_READY' has to be a boolean value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_WARMUP_ON_READY' is "
+        "set to either 'True' or 'False' (default: False)."
+    ),
+    id='dae.e015'
+)
+
+# DAE_LATENCY_HISTOGRAMS
+E016 = Error(
+    _("'DAE_LATENCY_HISTOGRAMS' has to be a boolean value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_LATENCY_HISTOGRAMS' "
+        "is set to either 'True' or 'False' (default: False)."
+    ),
+    id='dae.e016'
+)
+
+# DAE_RATE_LIMITS
+E017 = Error(
+    _("'DAE_RATE_LIMITS' is set to an invalid value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_RATE_LIMITS' is "
+        "either set to boolean 'False' or a dictionary, following the form of "
+        "'{ENDPOINT: {SCOPE: RATE}}', where ENDPOINT is one of 'login', "
+        "'signup' or 'verification', SCOPE is either 'ip' or 'identity' and "
+        "RATE is a string like '10/m' or '100/15m'."
+    ),
+    id='dae.e017'
+)
+
+# DAE_AUTO_LOGIN
+E018 = Error(
+    _("'DAE_AUTO_LOGIN' has to be a boolean value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_AUTO_LOGIN' is set "
+        "to either 'True' or 'False' (default: False)."
+    ),
+    id='dae.e018'
+)
+
+# DAE_DEFERRED_SIGNUP
+E019 = Error(
+    _("'DAE_DEFERRED_SIGNUP' has to be a boolean value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_DEFERRED_SIGNUP' is "
+        "set to either 'True' or 'False' (default: False)."
+    ),
+    id='dae.e019'
+)
+
+# DAE_METRICS_TOKEN
+E020 = Error(
+    _("'DAE_METRICS_TOKEN' is set to an invalid value!"),
+    hint=_(
+        "Please check your settings and ensure, that 'DAE_METRICS_TOKEN' is "
+        "either set to 'None' (default) or a non-empty string."
+    ),
+    id='dae.e020'
+)
+
+# synchronous mail backend
+P001 = Warning(
+    _("Verification mails are sent synchronously during signup!"),
+    hint=_(
+        "'DAE_OPERATION_MODE' is set to '{}' and 'EMAIL_BACKEND' is Django's "
+        "SMTP backend, so every signup waits for the SMTP server. Consider "
+        "using a mail backend, that queues the mails and sends them in the "
+        "background.".format(DAE_CONST_MODE_EMAIL_ACTIVATION)
+    ),
+    id='dae.p001'
+)
+
+# index on the email column
+P002 = Warning(
+    _("The email column of the user model is not indexed!"),
+    hint=_(
+        "Every signup looks up the given email address, to ensure its "
+        "uniqueness. Without an index, this requires a scan of the user "
+        "table. Please add an index on the email column."
+    ),
+    id='dae.p002'
+)
+
+# DAE_ADMIN_SIGNUP_NOTIFICATION
+P003 = Warning(
+    _("'DAE_ADMIN_SIGNUP_NOTIFICATION' notifies more than {} admins by mail!".format(
+        DAE_CONST_MAX_NOTIFICATION_RECIPIENTS
+    )),
+    hint=_(
+        "A separate mail is sent to every admin on every signup, while the "
+        "new user is waiting. Please consider notifying fewer admins, i.e. "
+        "by using a shared address."
+    ),
+    id='dae.p003'
+)
+
+# the status cache
+P004 = Warning(
+    _("The 'default' cache is process-local!"),
+    hint=_(
+        "The email verification status of users is cached in the 'default' "
+        "cache, which uses Django's local-memory backend. If your project runs "
+        "in multiple processes, their caches are not invalidated, when the "
+        "status changes. Please use a shared cache (i.e. memcached or redis) "
+        "or set 'DAE_STATUS_CACHE_TIMEOUT' to a low value."
+    ),
+    id='dae.p004'
+)
+
+
+def get_missing_template_error(template_name):
+    """Returns the error, that reports a missing mail template."""
+
+    return Error(
+        _("The mail template '{}' can not be found!".format(template_name)),
+        hint=_(
+            "This template is required to send mails. Please check "
+            "'DAE_EMAIL_TEMPLATE_PREFIX' and your template settings."
+        ),
+        id='dae.p005'
+    )
+
+
+def has_email_index(user_model, connection):
+    """Returns True, if the database provides an index on the email column."""
+
+    email_column = user_model._meta.get_field(user_model.EMAIL_FIELD).column
+
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, user_model._meta.db_table)
+
+    return any(
+        (c['index'] or c['unique']) and c['columns'] and c['columns'][0] == email_column
+        for c in constraints.values()
+    )
+
+
+def _get_index_definition(connection, cursor, name, constraint):
+    """Returns the SQL definition of an index, if the database provides it.
+
+    PostgreSQL includes the definition of expression indexes in its
+    introspection, SQLite stores it in 'sqlite_master'."""
+
+    if constraint.get('definition'):
+        return constraint['definition']
+
+    if connection.vendor == 'sqlite':
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = %s", [name])
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    return None
+
+
+def has_normalised_email_index(user_model, connection):
+    """Returns True, if the database provides an index on the lowercased email
+    column, i.e. 'CREATE INDEX ... ON auth_user (LOWER(email))'.
+
+    Grouping by the normalised address can only use such an expression index,
+    a plain index on the column does not help. Expression indexes are only
+    detected on PostgreSQL and SQLite."""
+
+    email_column = user_model._meta.get_field(user_model.EMAIL_FIELD).column
+    # i.e. 'lower((email)::text)' (PostgreSQL) or 'lower("email")' (SQLite)
+    pattern = re.compile(r'lower\s*\(\s*\(?\s*["`]?{}["`]?\W'.format(re.escape(email_column)), re.IGNORECASE)
+
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, user_model._meta.db_table)
+        for name, constraint in constraints.items():
+            # the columns of an expression index are not known
+            if not constraint['index'] or any(constraint['columns'] or [None]):
+                continue
+            definition = _get_index_definition(connection, cursor, name, constraint)
+            if definition and pattern.search(definition):
+                return True
+
+    return False
+
 
 def check_settings_values(app_configs, **kwargs):
     """Checks, if the app-specific settings have valid values."""
@@ -222,5 +464,105 @@ def check_settings_values(app_configs, **kwargs):
     if not isinstance(settings.DAE_VERIFICATION_TOKEN_MAX_AGE, six.integer_types):
         errors.append(E010)
 
+    # DAE_LOGIN_REQUIRE_VERIFIED_EMAIL
+    if not isinstance(settings.DAE_LOGIN_REQUIRE_VERIFIED_EMAIL, bool):
+        errors.append(E011)
+
+    # DAE_STATUS_CACHE_PREFIX
+    if not isinstance(settings.DAE_STATUS_CACHE_PREFIX, six.string_types):
+        errors.append(E012)
+
+    # DAE_STATUS_CACHE_TIMEOUT
+    if not isinstance(settings.DAE_STATUS_CACHE_TIMEOUT, six.integer_types):
+        errors.append(E013)
+
+    # DAE_READ_DATABASE
+    if settings.DAE_READ_DATABASE is not None and settings.DAE_READ_DATABASE not in settings.DATABASES:
+        errors.append(E014)
+
+    # DAE_WARMUP_ON_READY
+    if not isinstance(settings.DAE_WARMUP_ON_READY, bool):
+        errors.append(E015)
+
+    # DAE_LATENCY_HISTOGRAMS
+    if not isinstance(settings.DAE_LATENCY_HISTOGRAMS, bool):
+        errors.append(E016)
+
+    # DAE_RATE_LIMITS
+    try:
+        parse_rate_limits(settings.DAE_RATE_LIMITS)
+    except AuthEnhancedConversionError:
+        errors.append(E017)
+
+    # DAE_AUTO_LOGIN
+    if not isinstance(settings.DAE_AUTO_LOGIN, bool):
+        errors.append(E018)
+
+    # DAE_DEFERRED_SIGNUP
+    if not isinstance(settings.DAE_DEFERRED_SIGNUP, bool):
+        errors.append(E019)
+
+    # DAE_METRICS_TOKEN
+    if settings.DAE_METRICS_TOKEN is not None and (
+        not isinstance(settings.DAE_METRICS_TOKEN, six.string_types) or not settings.DAE_METRICS_TOKEN
+    ):
+        errors.append(E020)
+
     # and now hope, this is still empty! ;)
     return errors
+
+
+def check_performance(app_configs, **kwargs):
+    """Checks for configurations, that will not work well at scale."""
+
+    # the template machinery is only loaded, if the check is actually run
+    from django.template.exceptions import TemplateDoesNotExist
+    from django.template.loader import get_template
+
+    errors = []
+    app_settings = get_app_settings()
+
+    # synchronous mail backend
+    if (
+        app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION and
+        settings.EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend'
+    ):
+        errors.append(P001)
+
+    # DAE_ADMIN_SIGNUP_NOTIFICATION
+    if len(app_settings.admin_signup_notification_recipients) > DAE_CONST_MAX_NOTIFICATION_RECIPIENTS:
+        errors.append(P003)
+
+    # the status cache
+    if settings.CACHES.get('default', {}).get('BACKEND') == 'django.core.cache.backends.locmem.LocMemCache':
+        errors.append(P004)
+
+    # mail templates
+    #   Every template is looked up once, so a missing template is reported
+    #   here and not by the first signup.
+    for template_name in get_mail_template_names():
+        template_name = '{}/{}.txt'.format(app_settings.email_template_prefix, template_name)
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            errors.append(get_missing_template_error(template_name))
+
+    return errors
+
+
+def check_email_index(app_configs, **kwargs):
+    """Checks, if the email column of the user model is indexed.
+
+    This check queries the database."""
+
+    user_model = get_user_model()
+    connection = connections[router.db_for_read(user_model)]
+
+    # the table does not exist, before the migrations are applied
+    if user_model._meta.db_table not in connection.introspection.table_names():
+        return []
+
+    if not has_email_index(user_model, connection):
+        return [P002]
+
+    return []
@@ -7,12 +7,13 @@ This file provides some wrappers, to make the usage more conistent and
 convenient."""
 
 # Django imports
-from django.conf import settings
 from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
 from django.utils.translation import ugettext_lazy as _
 
 # app imports
 from auth_enhanced.exceptions import AuthEnhancedException
+from auth_enhanced.instrumentation import timed
+from auth_enhanced.settings import get_app_settings
 
 
 class EnhancedCrypto:
@@ -23,19 +24,22 @@ class EnhancedCrypto:
     def __init__(self):
         """Create the required instance of Signer."""
 
+        app_settings = get_app_settings()
+
         # this parameter determines, how long a verification token is considered
         #   valid. Please be aware, that this setting is applied to all
         #   verification processes in the app.
-        self.max_age = settings.DAE_VERIFICATION_TOKEN_MAX_AGE
+        self.max_age = app_settings.verification_token_max_age
 
         # get Django's signer with an app-specific salt (see settings.py for details)
-        self.signer = TimestampSigner(salt=settings.DAE_SALT)
+        self.signer = TimestampSigner(salt=app_settings.salt)
 
     class EnhancedCryptoException(AuthEnhancedException):
         """This Exception indicates, that something went wrong during crypto
         operations."""
         pass
 
+    @timed('token_signing')
     def get_verification_token(self, user_obj=None):
         """Returns a verification token by hashing the username."""
 
@@ -51,6 +55,7 @@ class EnhancedCrypto:
 
         return token
 
+    @timed('token_verification')
     def verify_token(self, token=None):
         """Verifys a token by using Django's TimestampSigner.unsign().
 
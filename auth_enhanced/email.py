@@ -3,25 +3,28 @@
 
 
 # Django imports
-from django.conf import settings
+from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.exceptions import TemplateDoesNotExist
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 # app imports
 from auth_enhanced.crypto import EnhancedCrypto
 from auth_enhanced.exceptions import AuthEnhancedException
+from auth_enhanced.instrumentation import timed
 from auth_enhanced.settings import (
     DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
-    DAE_CONST_MODE_MANUAL_ACTIVATION,
+    DAE_CONST_MODE_MANUAL_ACTIVATION, get_app_settings,
 )
 
 
 class AuthEnhancedEmail(EmailMultiAlternatives):
     """Base class for all app-related email messages."""
 
+    @timed('mail_rendering')
     def __init__(self, template_name=None, context=None, **kwargs):
 
         # remove the body, because the app relies on templates instead
@@ -43,9 +46,11 @@ class AuthEnhancedEmail(EmailMultiAlternatives):
         if context is None or not isinstance(context, dict):
             context = {}
 
+        template_prefix = get_app_settings().email_template_prefix
+
         # render and attach the 'txt_body'
         try:
-            txt_template = '{}/{}.txt'.format(settings.DAE_EMAIL_TEMPLATE_PREFIX, template_name)
+            txt_template = '{}/{}.txt'.format(template_prefix, template_name)
             txt_body = render_to_string(txt_template, context)
             self.body = txt_body.strip()
         except TemplateDoesNotExist:
@@ -54,7 +59,7 @@ class AuthEnhancedEmail(EmailMultiAlternatives):
 
         # render an alternative 'html_body'
         try:
-            html_template = '{}/{}.html'.format(settings.DAE_EMAIL_TEMPLATE_PREFIX, template_name)
+            html_template = '{}/{}.html'.format(template_prefix, template_name)
             html_body = render_to_string(html_template, context)
             self.attach_alternative(html_body, 'text/html')
         except TemplateDoesNotExist:
@@ -66,6 +71,7 @@ class AuthEnhancedEmail(EmailMultiAlternatives):
         pass
 
 
+@timed('admin_notification')
 def callback_admin_information_new_signup(sender, instance, created, **kwargs):
     """Sends an email to specified admins to inform them of a new signup.
 
@@ -74,13 +80,15 @@ def callback_admin_information_new_signup(sender, instance, created, **kwargs):
     # only send email on new registration
     if created:
 
+        app_settings = get_app_settings()
+
         # set the email subject
         mail_subject = _('New Signup Notification')
-        if settings.DAE_EMAIL_ADMIN_NOTIFICATION_PREFIX:
-            mail_subject = '[{}] {}'.format(settings.DAE_EMAIL_ADMIN_NOTIFICATION_PREFIX, mail_subject)
+        if app_settings.email_admin_notification_prefix:
+            mail_subject = '[{}] {}'.format(app_settings.email_admin_notification_prefix, mail_subject)
 
-        # prepare the recipient list
-        mail_to = [(x[0], x[1]) for x in settings.DAE_ADMIN_SIGNUP_NOTIFICATION if 'mail' in x[2]]
+        # the recipient list is prepared, when the settings are parsed
+        mail_to = app_settings.admin_signup_notification_recipients
 
         # TODO: prepare the context
         mail_context = {
@@ -95,17 +103,17 @@ def callback_admin_information_new_signup(sender, instance, created, **kwargs):
             # TODO: have another look at email best practices. How is the 'from'
             #   address related to 'reply_to'? Is the format of these addresses
             #   important (<name> name@domain.tld vs. name@domain.tld)?
-            'webmaster_email': settings.DAE_EMAIL_FROM_ADDRESS,
+            'webmaster_email': app_settings.email_from_address,
         }
 
         # addes the current operation mode to the context
         # TODO: This is not the best solution, but even better than to compare
         #   to some string in the template
-        if settings.DAE_OPERATION_MODE == DAE_CONST_MODE_AUTO_ACTIVATION:
+        if app_settings.operation_mode == DAE_CONST_MODE_AUTO_ACTIVATION:
             mail_context['mode_auto'] = True
-        elif settings.DAE_OPERATION_MODE == DAE_CONST_MODE_EMAIL_ACTIVATION:
+        elif app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION:
             mail_context['mode_email'] = True
-        elif settings.DAE_OPERATION_MODE == DAE_CONST_MODE_MANUAL_ACTIVATION:
+        elif app_settings.operation_mode == DAE_CONST_MODE_MANUAL_ACTIVATION:
             mail_context['mode_manual'] = True
         else:
             pass
@@ -120,7 +128,7 @@ def callback_admin_information_new_signup(sender, instance, created, **kwargs):
             mails.append(
                 AuthEnhancedEmail(
                     context=loop_mail_context,
-                    from_email=settings.DAE_EMAIL_FROM_ADDRESS,
+                    from_email=app_settings.email_from_address,
                     subject=mail_subject,
                     template_name='admin_signup_notification',
                     to=(m[1], )
@@ -129,7 +137,8 @@ def callback_admin_information_new_signup(sender, instance, created, **kwargs):
 
         # get an email connection
         connection = get_connection()
-        connection.send_messages(mails)
+        with timed('mail_sending'):
+            connection.send_messages(mails)
 
         return True
 
@@ -137,33 +146,61 @@ def callback_admin_information_new_signup(sender, instance, created, **kwargs):
         return False
 
 
+def send_verification_mail(user_obj):
+    """Sends the verification mail to the given user.
+
+    The User object does not have to be saved, which is used by deferred
+    signups (see 'DAE_DEFERRED_SIGNUP')."""
+
+    app_settings = get_app_settings()
+
+    # set the email subject
+    mail_subject = _('Email Verification Mail')
+    if app_settings.email_prefix:
+        mail_subject = '[{}] {}'.format(app_settings.email_prefix, mail_subject)
+
+    mail = AuthEnhancedEmail(
+        context={
+            'new_user': user_obj,
+            'verification_token': EnhancedCrypto().get_verification_token(user_obj),
+            'webmaster_email': app_settings.email_from_address,  # TODO: see notice above
+        },
+        from_email=app_settings.email_from_address,
+        subject=mail_subject,
+        template_name='user_email_verification',
+        to=(user_obj.email, )   # TODO: don't rely on email! Use EMAIL_FIELD
+    )
+
+    # actually send the mail
+    with timed('mail_sending'):
+        mail.send()
+
+
+@timed('verification_mail')
 def callback_user_signup_email_verification(sender, instance, created, **kwargs):
     """Sends the verification mail to the newly created user.
 
     This function acts like a callback to a 'post_save'-signal."""
 
-    # the verification mail must only be sent (automatically) on object creation
-    if created:
+    # the verification mail must only be sent (automatically) on object
+    #   creation. Accounts of verified signups (see 'PendingSignup') skip it.
+    if created and not getattr(instance, '_dae_skip_verification_mail', False):
 
-        # set the email subject
-        mail_subject = _('Email Verification Mail')
-        if settings.DAE_EMAIL_PREFIX:
-            mail_subject = '[{}] {}'.format(settings.DAE_EMAIL_PREFIX, mail_subject)
-
-        mail = AuthEnhancedEmail(
-            context={
-                'new_user': instance,
-                'verification_token': EnhancedCrypto().get_verification_token(instance),
-                'webmaster_email': settings.DAE_EMAIL_FROM_ADDRESS,  # TODO: see notice above
-            },
-            from_email=settings.DAE_EMAIL_FROM_ADDRESS,
-            subject=mail_subject,
-            template_name='user_email_verification',
-            to=(instance.email, )   # TODO: don't rely on email! Use EMAIL_FIELD
-        )
-
-        # actually send the mail
-        mail.send()
+        send_verification_mail(instance)
+
+        # track the verification process.
+        #   The model is looked up here, because this module is imported by
+        #   'apps.py' before the app registry is ready.
+        #   Usually, the enhancement has just been created by another
+        #   'post_save'-callback and is already attached to 'instance'.
+        enhancement_model = apps.get_model('auth_enhanced', 'UserEnhancement')
+        try:
+            enhancement = instance.enhancement
+        except enhancement_model.DoesNotExist:
+            enhancement = enhancement_model(user=instance)
+        enhancement.email_verification_status = enhancement_model.EMAIL_VERIFICATION_IN_PROGRESS
+        enhancement.verification_sent_at = timezone.now()
+        enhancement.save()
 
         return True
 
@@ -8,5 +8,16 @@ class AuthEnhancedException(Exception):
 
 
 class AuthEnhancedConversionError(AuthEnhancedException):
-    """This exception is raised by 'settings.convert_to_seconds()'."""
+    """This exception is raised by 'settings.convert_to_seconds()' and
+    'settings.convert_rate()'."""
     pass
+
+
+class AuthEnhancedRateLimitExceeded(AuthEnhancedException):
+    """This exception is raised by 'ratelimit.check_rate_limit()'.
+
+    'retry_after' is the number of seconds until the exceeded limit is reset."""
+
+    def __init__(self, message, retry_after):
+        super(AuthEnhancedRateLimitExceeded, self).__init__(message)
+        self.retry_after = retry_after
@@ -2,21 +2,34 @@
 """Contains app-specific forms."""
 
 # Django imports
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from django.core.signing import SignatureExpired
+from django.db import router, transaction
+from django.db.models import Q
 from django.forms import CharField, Form, ValidationError
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 # app imports
 from auth_enhanced.crypto import EnhancedCrypto
-from auth_enhanced.models import UserEnhancement
+from auth_enhanced.instrumentation import timed
+from auth_enhanced.models import PendingSignup, UserEnhancement
 from auth_enhanced.settings import (
     DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_CONST_MODE_MANUAL_ACTIVATION,
+    get_app_settings,
 )
 
 
+def is_signup_deferred():
+    """Returns True, if signups are stored as 'PendingSignup' until their
+    email address is verified (see 'DAE_DEFERRED_SIGNUP')."""
+
+    app_settings = get_app_settings()
+
+    return app_settings.deferred_signup and app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION
+
+
 class EmailVerificationForm(Form):
     """Handles email verification by dealing with submitted tokens."""
 
@@ -24,6 +37,10 @@ class EmailVerificationForm(Form):
 
     username = None
 
+    # set by 'activate_user()': True, if the email address had already been
+    #   verified before, i.e. by an earlier use of the same token
+    already_verified = None
+
     # let's mimic the behaviour of 'UserCreationForm'. And yes, this is dirty (;
     class Meta:
         # be as pluggable as possible, so django.contrib.auth's User is not
@@ -45,7 +62,7 @@ class EmailVerificationForm(Form):
                     "It seems like you have submitted a valid verification "
                     "token, that is expired. Be aware, that verification "
                     "tokens are considered valid for {} seconds and must be "
-                    "used within that time period.".format(settings.DAE_VERIFICATION_TOKEN_MAX_AGE)
+                    "used within that time period.".format(get_app_settings().verification_token_max_age)
                 ),
                 code='dae_token_expired'
             )
@@ -58,36 +75,62 @@ class EmailVerificationForm(Form):
 
         return token
 
+    @timed('user_activation')
     def activate_user(self):
-        """If the submitted token is verified, the account can safely get activated."""
+        """If the submitted token is verified, the account can safely get activated.
+
+        Returns the activated user. If the account does not exist (anymore),
+        i.e. because it was purged, the token is treated as invalid: the error
+        is added to the form and None is returned."""
+
+        # the account is modified right away, so it is read from the database
+        #   for writes, not from a (possibly lagging) replica
+        db = router.db_for_write(self._meta.model)
 
         user_to_be_activated = None
         user_query = {
             self._meta.model.USERNAME_FIELD: self.username,
         }
         try:
-            user_to_be_activated = self._meta.model.objects.get(**user_query)
+            user_to_be_activated = self._meta.model.objects.using(db).get(**user_query)
         except self._meta.model.DoesNotExist:
-            # the user could not be found
-            raise
+            # the account may be a deferred signup, that is created now
+            try:
+                user_to_be_activated = PendingSignup.create_user(self.username, using=db)
+            except self._meta.model.DoesNotExist:
+                self.add_error('token', ValidationError(
+                    _("Your submitted token could not be verified!"),
+                    code='dae_token_could_not_be_verified'
+                ))
+                return None
 
         # the following part could be done more defensively, if guarded with
         #   'if user_to_be_activated:'
         try:
-            enhancement = UserEnhancement.objects.get(user=user_to_be_activated)
+            enhancement = UserEnhancement.objects.using(db).get(user=user_to_be_activated)
         except UserEnhancement.DoesNotExist:
             # logical database integrity FAILED
             # TODO: Should this be raised? Or handle it gracefully by creating an enhancement-object?
-            enhancement = UserEnhancement.objects.create(user=user_to_be_activated)
+            enhancement = UserEnhancement.objects.using(db).create(user=user_to_be_activated)
+
+        self.already_verified = enhancement.email_is_verified
+        if self.already_verified:
+            # the token is used again, so nothing is written. This keeps the
+            #   original 'verified_at' (and the status' ETag, see
+            #   'EmailVerificationStatusView').
+            return user_to_be_activated
 
         # update the verification status
         enhancement.email_verification_status = enhancement.EMAIL_VERIFICATION_COMPLETED
-        enhancement.save(update_fields=['email_verification_status'])
+        enhancement.verified_at = timezone.now()
+        enhancement.save(update_fields=['email_verification_status', 'verified_at'])
 
         # activate the user
         user_to_be_activated.is_active = True
         user_to_be_activated.save(update_fields=['is_active'])
 
+        return user_to_be_activated
+
 
 class SignupForm(UserCreationForm):
     """Extends Django's form to create new User objects.
@@ -114,7 +157,7 @@ class SignupForm(UserCreationForm):
         super(SignupForm, self).__init__(*args, **kwargs)
 
         # if the email address is not mandatorily required, remove it from the form
-        if not settings.DAE_OPERATION_MODE == DAE_CONST_MODE_EMAIL_ACTIVATION:
+        if not get_app_settings().operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION:
             del self.fields[self._meta.model.EMAIL_FIELD]
 
     def clean(self):
@@ -130,7 +173,7 @@ class SignupForm(UserCreationForm):
         email = cleaned_data.get(self._meta.model.EMAIL_FIELD)
 
         # enforce a valid email address (if required)
-        if settings.DAE_OPERATION_MODE == DAE_CONST_MODE_EMAIL_ACTIVATION and not email:
+        if get_app_settings().operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION and not email:
             raise ValidationError(
                 _('A valid email address is required!'),
                 code='valid_email_required'
@@ -150,8 +193,12 @@ class SignupForm(UserCreationForm):
         email_query = {
             self._meta.model.EMAIL_FIELD: email,
         }
+        # the account is created right after this check, so the database for
+        #   writes is queried, not a (possibly lagging) replica
         try:
-            already_used_email = self._meta.model.objects.get(**email_query)
+            already_used_email = self._meta.model.objects.using(
+                router.db_for_write(self._meta.model)
+            ).get(**email_query)
         except self._meta.model.DoesNotExist:
             # if the exception is thrown, the email address is not in the database,
             #   just what is expected/required! Just go on!
@@ -167,22 +214,66 @@ class SignupForm(UserCreationForm):
                 code='email_not_unique'
             )
 
+        # signups, that wait for their verification, reserve their username
+        #   and email address (see 'DAE_DEFERRED_SIGNUP')
+        if is_signup_deferred():
+            username = cleaned_data.get(self._meta.model.USERNAME_FIELD)
+            pending = (
+                PendingSignup.objects.using(router.db_for_write(PendingSignup))
+                .unexpired()
+                .filter(Q(username=username) | Q(email=email))
+                .values_list('username', 'email')
+            )
+            for pending_username, pending_email in pending:
+                if pending_username == username:
+                    raise ValidationError(
+                        _('This username is already waiting for the verification of its email address!'),
+                        code='username_pending'
+                    )
+                raise ValidationError(
+                    _('This email address is already in use! Email addresses may only be registered once!'),
+                    code='email_not_unique'
+                )
+
         # pass the data on
         return cleaned_data
 
+    @timed('signup')
     def save(self, commit=True):
         """This method ensures, that the 'is_active'-flag is filled according
         to the app's settings."""
 
-        # call the parent's 'save()' without saving
-        user = super(SignupForm, self).save(commit=False)
+        # call the parent's 'save()' without saving, which hashes the password
+        with timed('password_hashing'):
+            user = super(SignupForm, self).save(commit=False)
 
         # 'DAE_CONST_MODE_MANUAL_ACTIVATION' or 'DAE_CONST_MODE_EMAIL_ACTIVATION'
         # implies 'is_active' = False
-        if settings.DAE_OPERATION_MODE in (DAE_CONST_MODE_MANUAL_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION):
+        if get_app_settings().operation_mode in (DAE_CONST_MODE_MANUAL_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION):
             user.is_active = False
 
         if commit:
-            user.save()
+            if is_signup_deferred():
+                self.save_pending(user)
+            else:
+                user.save()
 
         return user
+
+    def save_pending(self, user):
+        """Stores the signup as 'PendingSignup' and sends the verification
+        mail. The given User object is not saved."""
+
+        # the mail is sent by 'email.py', which pulls in Django's mail and
+        #   template machinery, so it is imported on demand (see 'apps.py')
+        from auth_enhanced.email import send_verification_mail
+
+        username = user.get_username()
+        email = getattr(user, self._meta.model.EMAIL_FIELD)
+
+        with transaction.atomic(using=router.db_for_write(PendingSignup)):
+            # expired signups may still hold the username or email address
+            PendingSignup.objects.filter(Q(username=username) | Q(email=email)).expired().delete()
+            PendingSignup.objects.create(username=username, email=email, password=user.password)
+
+        send_verification_mail(user)
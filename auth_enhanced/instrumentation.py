@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Provides the latency instrumentation of the app's hot paths.
+
+The durations of the operations, that make up a signup, an email verification
+and the sending of mails, are measured by 'timed()'. Every measurement is
+    1) sent as 'latency_measured'-signal, using the name of the operation as
+        sender, and
+    2) observed by the in-process histogram 'registry', if the setting
+        'DAE_LATENCY_HISTOGRAMS' is True.
+
+If the signal has no receivers and the histograms are disabled, nothing is
+measured at all, so the instrumentation costs next to nothing.
+
+    - usage:
+        with timed('mail_sending'):
+            connection.send_messages(mails)
+
+        @timed('token_signing')
+        def get_verification_token(self, user_obj=None):
+            ...
+
+The registry is kept per process. It is exported in Prometheus' text format by
+'HistogramRegistry.render_prometheus()' and by the app's view 'MetricsView'."""
+
+# Python imports
+import threading
+from bisect import bisect_left
+from functools import wraps
+from timeit import default_timer
+
+# Django imports
+from django.dispatch import Signal
+
+# app imports
+from auth_enhanced.settings import get_app_settings
+
+# the upper bounds (in seconds) of the histograms' buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the name of the exported metric and its description
+METRIC_NAME = 'dae_operation_duration_seconds'
+METRIC_HELP = 'Duration of the operations of django-auth_enhanced.'
+
+# the content type of Prometheus' text format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# sent after every measured operation
+#   The sender is the name of the operation (i.e. 'signup'), so receivers may
+#   subscribe to single operations.
+latency_measured = Signal(providing_args=['name', 'duration'])
+
+
+class Histogram(object):
+    """Counts observed values in fixed buckets, just like Prometheus'
+    histograms."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last bucket takes all values greater than the largest bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Adds a single value to the histogram."""
+
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """Returns the cumulative counts of all buckets (including '+Inf') and
+        the sum of all observed values."""
+
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+
+        return cumulative, total
+
+
+class HistogramRegistry(object):
+    """Holds one Histogram per operation."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value):
+        """Adds a value to the histogram of the given operation."""
+
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(self.buckets))
+
+        histogram.observe(value)
+
+    def get(self, name):
+        """Returns the histogram of the given operation or None."""
+
+        return self._histograms.get(name)
+
+    def clear(self):
+        """Removes all histograms."""
+
+        with self._lock:
+            self._histograms = {}
+
+    def render_prometheus(self):
+        """Returns all histograms in Prometheus' text format."""
+
+        lines = [
+            '# HELP {} {}'.format(METRIC_NAME, METRIC_HELP),
+            '# TYPE {} histogram'.format(METRIC_NAME),
+        ]
+
+        for name, histogram in sorted(self._histograms.items()):
+            cumulative, total = histogram.snapshot()
+            bounds = [repr(float(bound)) for bound in histogram.buckets] + ['+Inf']
+            for bound, count in zip(bounds, cumulative):
+                lines.append('{}_bucket{{operation="{}",le="{}"}} {}'.format(METRIC_NAME, name, bound, count))
+            lines.append('{}_sum{{operation="{}"}} {!r}'.format(METRIC_NAME, name, total))
+            lines.append('{}_count{{operation="{}"}} {}'.format(METRIC_NAME, name, cumulative[-1]))
+
+        return '\n'.join(lines) + '\n'
+
+
+# the registry of the current process
+registry = HistogramRegistry()
+
+
+def is_enabled():
+    """Returns True, if measurements are required by anyone."""
+
+    return bool(latency_measured.receivers) or get_app_settings().latency_histograms
+
+
+def record(name, duration):
+    """Publishes the duration (in seconds) of an operation."""
+
+    if latency_measured.receivers:
+        latency_measured.send(sender=name, name=name, duration=duration)
+
+    if get_app_settings().latency_histograms:
+        registry.observe(name, duration)
+
+
+class Timer(object):
+    """Measures the duration of an operation, see 'timed()'."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start_time = None
+
+    def __enter__(self):
+        if is_enabled():
+            self.start_time = default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start_time is not None:
+            record(self.name, default_timer() - self.start_time)
+            self.start_time = None
+
+    def __call__(self, func):
+        name = self.name
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+
+            start_time = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, default_timer() - start_time)
+
+        return wrapper
+
+
+def timed(name):
+    """Measures the duration of the operation 'name'.
+
+    May be used as context manager or as decorator. Failed operations are
+    measured as well."""
+
+    return Timer(name)
@@ -2,134 +2,956 @@
 """Provides the 'authenhanced' management command, that is used to control and
 check certain bits of 'django-auth_ehanced'."""
 
+# Python imports
+import json
+import math
+import multiprocessing
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+
 # Django imports
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hashers, make_password
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Count
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, Q, QuerySet
+from django.db.models.functions import Length, Lower
+from django.utils import timezone
+from django.utils.module_loading import import_string
 
 # app imports
-from auth_enhanced.models import UserEnhancement
+from auth_enhanced.checks import has_normalised_email_index
+from auth_enhanced.exceptions import AuthEnhancedConversionError
+from auth_enhanced.models import (
+    PendingSignup, UserEnhancement, VerificationStatusCounter,
+)
+from auth_enhanced.settings import convert_to_seconds, get_app_settings
+from auth_enhanced.warmup import warmup
+
+
+def _admin_notification_accounts(user_model, usernames, using):
+    """Returns the relevant details of the given accounts, including the
+    status of their UserEnhancement.
+
+    The fields are not referenced directly, to be as pluggable as possible."""
+
+    return user_model.objects.using(using).filter(
+        **{'{}__in'.format(user_model.USERNAME_FIELD): usernames}
+    ).values_list(
+        user_model.USERNAME_FIELD,
+        user_model.EMAIL_FIELD,
+        'enhancement__email_verification_status',
+        'is_superuser',
+    )
 
 
-def check_admin_notification():
+def check_admin_notification(using=None):
     """Checks, if the respective setting contains valid accounts with verified
-    email addresses."""
+    email addresses.
 
-    user_model = get_user_model()
+    All listed accounts are fetched with a single query and compared in memory.
+    All problems are reported at once. The accounts are read from the database
+    'using', if provided."""
 
-    # extract the list of usernames
-    username_list = [x[0] for x in settings.DAE_ADMIN_SIGNUP_NOTIFICATION]
+    # there is nothing to check, if notifications are disabled
+    notification = get_app_settings().admin_signup_notification
+    if not notification:
+        return True
 
-    # check, if all listed accounts have verified email addresses
-    verified_email = (
-        # get listed accounts
-        user_model.objects.filter(
-            # this really complex statement is used, to not reference the
-            #   'username' field directly, to be as pluggable as possible
-            **{'{}__in'.format(user_model.USERNAME_FIELD): username_list}
-        )
-        # this filter only delivers accounts with verified email addresses
-        .filter(enhancement__email_verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED)
+    user_model = get_user_model()
+
+    # fetch the relevant details of all listed accounts
+    accounts = dict(
+        (account[0], account[1:])
+        for account in _admin_notification_accounts(user_model, [x[0] for x in notification], using)
     )
 
-    # determine, which accounts do have unverified email addresses
-    if len(username_list) > len(verified_email):
-        # actually build the list to raise the error message
-        unverified_email = [
-            u for u in username_list if u not in verified_email.values_list(
-                user_model.USERNAME_FIELD, flat=True
-            )
-        ]
-
-        # TODO: For the moment, this is perfectly fine. But if there are some
-        #   more, different notification methods, this might not be necessary
-        #   anymore. This check then have to take the specified 'notification-
-        #   method' into consideration. Instead of raising the CommandError,
-        #   only a warning has to be displayed.
-        raise CommandError(
+    unverified_email = []
+    not_matching_email = []
+    unauthorised_users = []
+    for entry in notification:
+        username, email = entry[0], entry[1]
+        account_email, status, is_superuser = accounts.get(username, (None, None, False))
+
+        # notifications are only sent to verified email addresses
+        if status != UserEnhancement.EMAIL_VERIFICATION_COMPLETED:
+            unverified_email.append(username)
+
+        # the specified email address has to be the one of the account
+        if username in accounts and email != account_email:
+            not_matching_email.append(username)
+
+        # determine, if the specified users have sufficient permissions
+        # TODO: For the moment, only superusers are able to actually change
+        #   user-objects. If there is a custom permission system, it is possible
+        #   to actually check for more specific conditions/permissions
+        if not is_superuser:
+            unauthorised_users.append(username)
+
+    # TODO: For the moment, this is perfectly fine. But if there are some
+    #   more, different notification methods, this might not be necessary
+    #   anymore. This check then have to take the specified 'notification-
+    #   method' into consideration. Instead of raising the CommandError,
+    #   only a warning has to be displayed.
+    errors = []
+    if unverified_email:
+        errors.append(
             "The following accounts do not have a verified email address: {}. "
             "Administrative notifications will only be sent to verified email "
             "addresses.".format(', '.join(unverified_email))
         )
-
-    # check, if the verified email addresses are in fact the ones specified in
-    #   the respective setting
-    not_matching_email = [
-        u[0] for u in settings.DAE_ADMIN_SIGNUP_NOTIFICATION if u[1] not in verified_email.values_list(
-            user_model.EMAIL_FIELD, flat=True
-        )
-    ]
-
     if not_matching_email:
-        raise CommandError(
+        errors.append(
             "The following accounts do not match the project's settings: {}. "
             "The specified email addresses are not the ones associated with "
             "the account. Administrative notifications will only be sent to "
             "registered email addresses.".format(', '.join(not_matching_email))
         )
-
-    # determine, if the specified users have sufficient permissions
-    # TODO: For the moment, only superusers are able to actually change
-    #   user-objects. If there is a custom permission system, it is possible
-    #   to actually check for more specific conditions/permissions
-    authorised_users = verified_email.filter(is_superuser=True)
-
-    if len(username_list) > len(authorised_users):
-        unauthorised_users = [
-            u for u in username_list if u not in authorised_users.values_list(
-                user_model.USERNAME_FIELD, flat=True
-            )
-        ]
-
-        raise CommandError(
+    if unauthorised_users:
+        errors.append(
             "The following accounts do not have the sufficient permissions to "
             "actually modify accounts: {}.".format(', '.join(unauthorised_users))
         )
 
+    if errors:
+        raise CommandError('\n'.join(errors))
+
     return True
 
 
-def check_email_uniqueness():
-    """This function checks, if all email addresses are unique."""
+def _duplicate_emails_querysets(user_model, using):
+    """Returns the accounts with a non-blank email address (annotated with
+    their normalised address) and the grouping of these addresses, that
+    returns the duplicate ones."""
 
-    user_model = get_user_model()
+    non_blank = user_model.objects.using(using).exclude(
+        **{user_model.EMAIL_FIELD: ''}
+    ).exclude(
+        **{'{}__isnull'.format(user_model.EMAIL_FIELD): True}
+    ).annotate(normalised_email=Lower(user_model.EMAIL_FIELD))
 
-    # find the email addresses, that are not unique
-    non_unique_emails = (
-        # get all email addresses
-        user_model.objects.values(user_model.EMAIL_FIELD)
-        # annotate them by counting a guaranteed unique field
+    duplicates = (
+        non_blank.order_by()
+        .values('normalised_email')
         .annotate(count=Count('pk'))
-        # get all email addresses, that appear more than one time
         .filter(count__gt=1)
-        # remove the annotation again
-        .values(user_model.EMAIL_FIELD)
+        .order_by('normalised_email')
     )
 
-    if non_unique_emails:
-        # get the usernames of accounts, that have non-unique email addresses
-        non_unique_accounts = (
-            user_model.objects.filter(
-                # this really complex statement is used, to not reference the
-                #   'email' field directly, to be as pluggable as possible
-                **{'{}__in'.format(user_model.EMAIL_FIELD): non_unique_emails}
-            )
-            # simply list the usernames
-            .values_list(user_model.USERNAME_FIELD, flat=True)
-        )
+    return non_blank, duplicates
+
+
+def _find_duplicate_emails_database(user_model, limit, offset, using):
+    """Lets the database group the accounts by their normalised email address.
+
+    Only the duplicate addresses of the requested page are transferred, so
+    this relies on the database to perform the aggregation efficiently (i.e.
+    by using an index on 'LOWER(email)')."""
+
+    non_blank, duplicates = _duplicate_emails_querysets(user_model, using)
+
+    total = duplicates.count()
+    page = [d['normalised_email'] for d in duplicates[offset:offset + limit]]
+
+    groups = OrderedDict((email, []) for email in page)
+    for email, username in (
+        non_blank.filter(normalised_email__in=page)
+        .order_by('normalised_email', user_model.USERNAME_FIELD)
+        .values_list('normalised_email', user_model.USERNAME_FIELD)
+    ):
+        groups[email].append(username)
+
+    return list(groups.items()), total
+
+
+def _find_duplicate_emails_stream(user_model, limit, offset, chunk_size, partition_size, progress, using):
+    """Streams all accounts in chunks and finds duplicates in Python.
+
+    To keep the memory usage bounded, the addresses are split into partitions
+    by their hash value. Every partition requires a scan of the table, but
+    only holds about 'partition_size' addresses in memory."""
+
+    non_blank = user_model.objects.using(using).exclude(
+        **{user_model.EMAIL_FIELD: ''}
+    ).exclude(
+        **{'{}__isnull'.format(user_model.EMAIL_FIELD): True}
+    )
+
+    rows = non_blank.count()
+    partitions = max(1, -(-rows // partition_size))
+
+    duplicates = []
+    scanned = 0
+    for partition in range(partitions):
+        seen = {}
+        last_pk = None
+        while True:
+            chunk = non_blank.order_by('pk')
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list('pk', user_model.USERNAME_FIELD, user_model.EMAIL_FIELD)[:chunk_size])
+
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+
+            for _pk, username, email in chunk:
+                email = email.lower()
+                if partitions > 1 and zlib.crc32(email.encode('utf-8')) % partitions != partition:
+                    continue
+                seen.setdefault(email, []).append(username)
+
+            scanned += len(chunk)
+            if progress:
+                progress(scanned, rows * partitions)
+
+        duplicates.extend((email, sorted(usernames)) for email, usernames in seen.items() if len(usernames) > 1)
 
+    duplicates.sort()
+
+    return duplicates[offset:offset + limit], len(duplicates)
+
+
+def find_duplicate_emails(mode='auto', limit=100, offset=0, chunk_size=10000, partition_size=500000, progress=None,
+                          using=None):
+    """Finds accounts, that share an email address.
+
+    Email addresses are compared case-insensitively and blank addresses are
+    ignored. Returns a tuple of the requested page of duplicate addresses (a
+    list of tuples of the normalised address and the usernames using it) and
+    the total number of duplicate addresses.
+
+    'mode' determines, how the accounts are scanned:
+        'database'  - the database groups the accounts
+        'stream'    - the accounts are streamed in chunks of 'chunk_size' and
+                      grouped in Python, see '_find_duplicate_emails_stream()'
+        'auto'      - uses 'database', if there is an index on the
+                      lowercased email column, 'stream' otherwise. A plain
+                      index on the column can not serve the grouping.
+
+    'progress' may be a callable, that is called with the number of scanned
+    and the number of rows to scan ('stream' only).
+
+    The accounts are read from the database 'using', if provided."""
+
+    user_model = get_user_model()
+
+    if mode == 'auto':
+        connection = connections[using or router.db_for_read(user_model)]
+        mode = 'database' if has_normalised_email_index(user_model, connection) else 'stream'
+
+    if mode == 'database':
+        return _find_duplicate_emails_database(user_model, limit, offset, using)
+
+    return _find_duplicate_emails_stream(user_model, limit, offset, chunk_size, partition_size, progress, using)
+
+
+def check_email_uniqueness(**kwargs):
+    """This function checks, if all email addresses are unique.
+
+    All keyword arguments are passed to 'find_duplicate_emails()'."""
+
+    duplicates, total = find_duplicate_emails(**kwargs)
+
+    if total:
         # raise an Error and include a list of usernames without unique email
         #   addresses
-        raise CommandError(
-            "The following accounts don't have unique email addresses: {}".format(
-                ', '.join(non_unique_accounts)
-            )
+        message = "The following accounts don't have unique email addresses: {}".format(
+            ', '.join(username for _email, usernames in duplicates for username in usernames)
         )
+        if len(duplicates) < total:
+            message += " (showing {} of {} duplicate email addresses)".format(len(duplicates), total)
+
+        raise CommandError(message)
 
     return True
 
 
+def _purge_candidates(status, cutoff):
+    """Returns the UserEnhancements of inactive accounts with the given status,
+    whose verification mail was sent before 'cutoff', in the order of the
+    index on ('email_verification_status', 'verification_sent_at')."""
+
+    return (
+        UserEnhancement.objects
+        .filter(
+            email_verification_status=status,
+            verification_sent_at__lt=cutoff,
+            user__is_active=False,
+        )
+        .order_by('verification_sent_at', 'pk')
+    )
+
+
+def purge_unverified_accounts(max_age, chunk_size=1000, pause=0.0, dry_run=False):
+    """Deletes inactive accounts, that did not verify their email address.
+
+    Candidates are accounts, that are not active and whose verification mail
+    was sent more than 'max_age' seconds ago without being verified. Accounts
+    without a recorded verification mail are never considered.
+
+    The candidates are selected in chunks of 'chunk_size', using the index on
+    ('email_verification_status', 'verification_sent_at') and keyset
+    pagination. Every chunk is deleted in its own transaction, followed by a
+    'pause' (in seconds) to keep replication lag low.
+
+    This is a generator, yielding the number of deleted accounts per chunk.
+    With 'dry_run', nothing is deleted and the number of candidates per chunk
+    is yielded."""
+
+    user_model = get_user_model()
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    statuses = (UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS, UserEnhancement.EMAIL_VERIFICATION_FAILED)
+
+    # every status is handled on its own, so the pagination follows the
+    #   order of the index
+    for status in statuses:
+        candidates = _purge_candidates(status, cutoff)
+
+        last_key = None
+        while True:
+            chunk = candidates
+            if last_key is not None:
+                chunk = chunk.filter(
+                    Q(verification_sent_at__gt=last_key[0]) |
+                    Q(verification_sent_at=last_key[0], pk__gt=last_key[1])
+                )
+            chunk = list(chunk.values_list('verification_sent_at', 'pk')[:chunk_size])
+
+            if not chunk:
+                break
+            last_key = chunk[-1]
+
+            if dry_run:
+                yield len(chunk)
+                continue
+
+            # the counter updates of all deleted objects are applied at once
+            with transaction.atomic(), VerificationStatusCounter.batched():
+                # the candidates are locked and checked again, because they
+                #   may have been verified in the meantime
+                user_ids = list(
+                    candidates.select_for_update()
+                    .filter(pk__in=[c[1] for c in chunk])
+                    .values_list('user_id', flat=True)
+                )
+                # the 'post_delete'-callbacks take care of the cached status
+                UserEnhancement.objects.filter(user_id__in=user_ids).delete()
+                user_model.objects.filter(pk__in=user_ids).delete()
+
+            yield len(user_ids)
+
+            if pause:
+                time.sleep(pause)
+
+
+def purge_expired_signups(chunk_size=1000, pause=0.0, dry_run=False):
+    """Deletes PendingSignups, whose verification token has expired (see
+    'DAE_DEFERRED_SIGNUP').
+
+    The expired signups are selected in chunks of 'chunk_size', using the
+    index on 'created_at'. Every chunk is deleted by a single 'DELETE',
+    followed by a 'pause' (in seconds).
+
+    This is a generator, yielding the number of deleted signups per chunk.
+    With 'dry_run', nothing is deleted and the number of expired signups per
+    chunk is yielded."""
+
+    # the cutoff is fixed, so signups, that expire while the command runs,
+    #   do not extend it
+    cutoff = PendingSignup.objects.get_cutoff()
+    expired = PendingSignup.objects.filter(created_at__lt=cutoff).order_by('created_at', 'pk')
+
+    last_key = None
+    while True:
+        chunk = expired
+        if last_key is not None:
+            chunk = chunk.filter(
+                Q(created_at__gt=last_key[0]) |
+                Q(created_at=last_key[0], pk__gt=last_key[1])
+            )
+        chunk = list(chunk.values_list('created_at', 'pk')[:chunk_size])
+
+        if not chunk:
+            break
+        last_key = chunk[-1]
+
+        if dry_run:
+            yield len(chunk)
+            continue
+
+        # PendingSignups have neither relations nor signal callbacks, so this
+        #   is a single 'DELETE'
+        deleted, _rows = PendingSignup.objects.filter(pk__in=[c[1] for c in chunk]).delete()
+
+        yield deleted
+
+        if pause:
+            time.sleep(pause)
+
+
+def backfill_enhancements(chunk_size=1000, pause=0.0, dry_run=False):
+    """Creates the missing UserEnhancements of existing accounts.
+
+    If the app is installed on a project, that already has users, none of
+    these accounts has an UserEnhancement. The accounts are found by an
+    anti-join (LEFT OUTER JOIN on the enhancement), paginated by their primary
+    key in chunks of 'chunk_size'. The UserEnhancements of every chunk are
+    created by a single 'bulk_create()', followed by a 'pause' (in seconds).
+
+    Existing UserEnhancements are not modified. As accounts with an
+    enhancement are skipped, the function can be interrupted and restarted
+    at any time.
+
+    This is a generator, yielding the number of created UserEnhancements per
+    chunk. With 'dry_run', nothing is created and the number of accounts
+    without an enhancement per chunk is yielded."""
+
+    # the accounts did not verify their email address with this app
+    status = UserEnhancement.EMAIL_VERIFICATION_FAILED
+
+    missing = (
+        get_user_model().objects
+        .filter(enhancement__isnull=True)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+    last_pk = None
+    while True:
+        chunk = missing
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        user_ids = list(chunk[:chunk_size])
+
+        if not user_ids:
+            break
+        last_pk = user_ids[-1]
+
+        if dry_run:
+            yield len(user_ids)
+            continue
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    UserEnhancement.objects.bulk_create([
+                        UserEnhancement(user_id=pk, email_verification_status=status) for pk in user_ids
+                    ])
+            except IntegrityError:
+                # some of the accounts got their enhancement in the meantime
+                #   (i.e. by activating them), so only the remaining ones are
+                #   created
+                user_ids = list(missing.filter(pk__in=user_ids))
+                UserEnhancement.objects.bulk_create([
+                    UserEnhancement(user_id=pk, email_verification_status=status) for pk in user_ids
+                ])
+
+            # 'bulk_create()' does not send any signals
+            VerificationStatusCounter.adjust({status: len(user_ids)})
+
+        yield len(user_ids)
+
+        if pause:
+            time.sleep(pause)
+
+
+def seed_accounts(
+    users, verified_ratio=0.3, in_progress_ratio=0.5, duplicate_ratio=0.0, password=None,
+    prefix='seed', sent_within=60 * 86400, chunk_size=1000, random_seed=None
+):
+    """Creates 'users' synthetic accounts with their UserEnhancements, i.e. to
+    run load tests or to reproduce scaling problems.
+
+    The password is hashed only once and shared by all accounts (if 'password'
+    is None, the accounts get an unusable password). The accounts and their
+    UserEnhancements are created by 'bulk_create()' in chunks of
+    'chunk_size', so no signals are sent and only the status counters are
+    adjusted.
+
+    The accounts are distributed randomly (using 'random_seed', if given):
+        - 'verified_ratio': active accounts with a verified email address
+        - 'in_progress_ratio': inactive accounts, whose verification mail was
+            sent within the last 'sent_within' seconds
+        - the remaining accounts are inactive and did not get a verification
+            mail ('failed')
+        - 'duplicate_ratio': accounts, that reuse the email address of an
+            earlier seeded account (in a different letter case with a chance
+            of 50%)
+
+    The usernames are built from 'prefix' and a running number, that is
+    continued after the highest existing number on subsequent runs.
+
+    This is a generator, yielding the number of created accounts per status
+    (and the number of duplicate addresses) of every chunk as a dict."""
+
+    if verified_ratio < 0 or in_progress_ratio < 0 or verified_ratio + in_progress_ratio > 1:
+        raise ValueError("The ratios of verified and in-progress accounts have to add up to at most 1!")
+    if not 0 <= duplicate_ratio < 1:
+        raise ValueError("The ratio of duplicate email addresses has to be in [0, 1)!")
+
+    user_model = get_user_model()
+    username_field, email_field = user_model.USERNAME_FIELD, user_model.get_email_field_name()
+
+    rng = random.Random(random_seed)
+    password_hash = make_password(password)
+    now = timezone.now()
+
+    # continue after the highest number of previous runs. Counting the seeded
+    #   accounts is not sufficient, because some of them may have been
+    #   deleted (i.e. by 'purge-unverified'). Without leading zeros, the
+    #   longest username with the highest value has the highest number.
+    last_username = (
+        user_model.objects
+        .filter(**{'{}__regex'.format(username_field): r'^{}-[0-9]+$'.format(re.escape(prefix))})
+        .annotate(username_length=Length(username_field))
+        .order_by('-username_length', '-{}'.format(username_field))
+        .values_list(username_field, flat=True)
+        .first()
+    )
+    first = int(last_username[len(prefix) + 1:]) + 1 if last_username else 0
+
+    # the numbers of accounts with an original email address, which may be
+    #   reused by duplicates
+    originals = array('l')
+
+    for chunk_start in range(first, first + users, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, first + users)
+        counts = {'completed': 0, 'in_progress': 0, 'failed': 0, 'duplicates': 0}
+        accounts = []
+        details = {}
+
+        for number in range(chunk_start, chunk_end):
+            username = '{}-{}'.format(prefix, number)
+
+            if originals and rng.random() < duplicate_ratio:
+                email = '{}-{}@example.com'.format(prefix, originals[rng.randrange(len(originals))])
+                if rng.random() < 0.5:
+                    email = email.upper()
+                counts['duplicates'] += 1
+            else:
+                email = '{}@example.com'.format(username)
+                originals.append(number)
+
+            joined = now - timedelta(seconds=rng.uniform(0, sent_within))
+            choice = rng.random()
+            if choice < verified_ratio:
+                status, is_active, sent_at = UserEnhancement.EMAIL_VERIFICATION_COMPLETED, True, joined
+                counts['completed'] += 1
+            elif choice < verified_ratio + in_progress_ratio:
+                status, is_active, sent_at = UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS, False, joined
+                counts['in_progress'] += 1
+            else:
+                status, is_active, sent_at = UserEnhancement.EMAIL_VERIFICATION_FAILED, False, None
+                counts['failed'] += 1
+
+            accounts.append(user_model(**{
+                username_field: username,
+                email_field: email,
+                'password': password_hash,
+                'is_active': is_active,
+                'date_joined': joined,
+            }))
+            details[username] = (status, sent_at)
+
+        with transaction.atomic():
+            user_model.objects.bulk_create(accounts)
+
+            # not all database backends return the primary keys of
+            #   'bulk_create()', so they are fetched
+            created = user_model.objects.filter(
+                **{'{}__in'.format(username_field): list(details)}
+            ).values_list('pk', username_field)
+
+            enhancements = []
+            for pk, username in created:
+                status, sent_at = details[username]
+                enhancements.append(UserEnhancement(
+                    user_id=pk,
+                    email_verification_status=status,
+                    verification_sent_at=sent_at,
+                    verified_at=sent_at if status == UserEnhancement.EMAIL_VERIFICATION_COMPLETED else None,
+                ))
+            UserEnhancement.objects.bulk_create(enhancements)
+
+            # 'bulk_create()' does not send any signals
+            VerificationStatusCounter.adjust({
+                UserEnhancement.EMAIL_VERIFICATION_COMPLETED: counts['completed'],
+                UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS: counts['in_progress'],
+                UserEnhancement.EMAIL_VERIFICATION_FAILED: counts['failed'],
+            })
+
+        yield counts
+
+
+def get_status_statistics(recount=False, chunk_size=10000, using=None):
+    """Returns the number of accounts per email verification status.
+
+    The numbers are read from the maintained counters (see
+    'VerificationStatusCounter') on the database 'using', if provided, so this
+    does not scan the user table. With 'recount', the counters are rebuilt
+    first, which always uses the database for writes."""
+
+    if recount:
+        counts = VerificationStatusCounter.recount(chunk_size=chunk_size)
+    else:
+        counts = VerificationStatusCounter.get_counts(using=using)
+
+    statistics = {
+        'completed': counts.get(UserEnhancement.EMAIL_VERIFICATION_COMPLETED, 0),
+        'in_progress': counts.get(UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS, 0),
+        'failed': counts.get(UserEnhancement.EMAIL_VERIFICATION_FAILED, 0),
+    }
+    statistics['total'] = sum(statistics.values())
+
+    return statistics
+
+
+# patterns of sequential scans in the output of EXPLAIN per database vendor
+#   SQLite reports scans of an index as 'SCAN <table> USING [COVERING] INDEX'.
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?!\w| USING)'),
+}
+
+
+def get_hot_querysets(using=None):
+    """Returns the querysets of the app's hot paths, as they are built by the
+    app's forms, models and this command, using placeholder values.
+
+    Returns a list of tuples of the name of the query, the queryset and a
+    boolean, that indicates, if the query has to read the whole table anyway."""
+
+    user_model = get_user_model()
+    users = user_model.objects.using(using)
+    usernames = [x[0] for x in get_app_settings().admin_signup_notification] or ['explain']
+    _non_blank, duplicates = _duplicate_emails_querysets(user_model, using)
+
+    return [
+        # the uniqueness check of 'SignupForm.clean()'
+        ('email-uniqueness', users.filter(**{user_model.EMAIL_FIELD: 'explain@example.com'}), False),
+        # 'EmailVerificationForm.activate_user()'
+        ('activation-lookup', users.filter(**{user_model.USERNAME_FIELD: 'explain'}), False),
+        # 'activate_user()' and 'UserEnhancement.get_status_cached()'
+        ('enhancement-lookup', UserEnhancement.objects.using(using).filter(user_id=0), False),
+        ('admin-notification', _admin_notification_accounts(user_model, usernames, using), False),
+        (
+            'purge-candidates',
+            _purge_candidates(UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS, timezone.now()).using(using),
+            False
+        ),
+        ('duplicate-scan', duplicates, True),
+        ('backfill-missing', users.filter(enhancement__isnull=True).order_by('pk'), True),
+    ]
+
+
+def _count_rows(connection, table):
+    """Returns the (estimated) number of rows of the given table.
+
+    PostgreSQL provides an estimate, that does not require a scan of the
+    table."""
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+        else:
+            cursor.execute('SELECT COUNT(*) FROM {}'.format(connection.ops.quote_name(table)))
+        row = cursor.fetchone()
+
+    return max(int(row[0]), 0) if row else 0
+
+
+def explain_hot_queries(using=None, min_rows=10000):
+    """Runs EXPLAIN on the querysets of the app's hot paths (see
+    'get_hot_querysets()') against the database 'using'.
+
+    Returns a list of dicts with the name, the SQL and the plan of every query,
+    the sequential scans found in the plan (SQLite and PostgreSQL only) and
+    if the query reads the whole table anyway ('full_scan').
+    A query is flagged, if it scans a table with at least 'min_rows' rows,
+    unless it has to read the whole table anyway."""
+
+    if not hasattr(QuerySet, 'explain'):
+        raise CommandError("'explain' requires Django 2.1 or newer!")
+
+    connection = connections[using or router.db_for_read(get_user_model())]
+    pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+    tables = set(connection.introspection.table_names())
+
+    row_counts = {}
+    results = []
+    for name, queryset, full_scan in get_hot_querysets(using):
+        plan = queryset.explain()
+
+        scans = []
+        if pattern:
+            for table in sorted(set(m.group('table') for m in pattern.finditer(plan))):
+                # the pattern may match subqueries and temporary tables
+                if table not in tables:
+                    continue
+                if table not in row_counts:
+                    row_counts[table] = _count_rows(connection, table)
+                scans.append({'table': table, 'rows': row_counts[table]})
+
+        results.append({
+            'name': name,
+            'sql': str(queryset.query),
+            'plan': plan,
+            'sequential_scans': scans,
+            'full_scan': full_scan,
+            'flagged': not full_scan and any(scan['rows'] >= min_rows for scan in scans),
+        })
+
+    return results
+
+
+# the parameters of Django's password hashers, that control their work factor,
+#   and how the duration scales with them: 'linear' or 'log2' (every increment
+#   doubles the duration)
+HASHER_WORK_FACTORS = (
+    ('iterations', 'linear'),
+    ('time_cost', 'linear'),
+    ('rounds', 'log2'),
+)
+
+
+def _measure_hasher(hasher, samples, concurrency):
+    """Returns the median duration (in seconds) of hashing a password with the
+    given hasher, while 'concurrency' threads are hashing at the same time.
+
+    The hashing libraries release the GIL, so the threads compete for the
+    CPU cores just like the worker processes of a server do."""
+
+    # the first call may load the hasher's library
+    hasher.encode('calibrate-hasher', hasher.salt())
+
+    durations = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            for _i in range(samples):
+                salt = hasher.salt()
+                start_time = time.time()
+                hasher.encode('calibrate-hasher', salt)
+                duration = time.time() - start_time
+                with lock:
+                    durations.append(duration)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # exceptions of the threads are raised in the calling thread
+    if errors:
+        raise errors[0]
+
+    durations.sort()
+    return durations[len(durations) // 2]
+
+
+def calibrate_hashers(target_ms=150.0, samples=5, concurrency=None):
+    """Benchmarks the configured password hashers ('PASSWORD_HASHERS') and
+    determines the work factor, that hits the latency 'target_ms'.
+
+    Every hasher is measured 'samples' times by a single thread and by
+    'concurrency' threads (default: the number of CPU cores) at once. The
+    work factor is scaled by the loaded duration and the recommended value is
+    measured again, so the reported numbers are real. Hashers without a work
+    factor (i.e. 'MD5PasswordHasher') are only measured.
+
+    Returns a list of dicts, one per hasher. Hashing dominates the duration
+    of a signup and a login, so 'signups_per_second' estimates the throughput
+    of a single worker, that handles one request at a time."""
+
+    concurrency = concurrency or multiprocessing.cpu_count()
+    target = target_ms / 1000.0
+
+    results = []
+    for index, hasher in enumerate(get_hashers()):
+        result = {
+            'algorithm': hasher.algorithm,
+            'hasher': '{}.{}'.format(hasher.__class__.__module__, hasher.__class__.__name__),
+            'default': index == 0,
+            'parameter': None,
+            'current': None,
+            'recommended': None,
+        }
+        results.append(result)
+
+        try:
+            single = _measure_hasher(hasher, samples, 1)
+        except ValueError as e:
+            # the hasher's library is not installed
+            result['error'] = str(e)
+            continue
+        loaded = _measure_hasher(hasher, samples, concurrency)
+
+        result.update({
+            'current_ms': single * 1000,
+            'current_loaded_ms': loaded * 1000,
+            'current_signups_per_second': 1 / loaded if loaded else None,
+        })
+
+        for parameter, scaling in HASHER_WORK_FACTORS:
+            current = getattr(hasher, parameter, None)
+            if current is not None:
+                break
+        else:
+            continue
+
+        if scaling == 'log2':
+            recommended = max(4, current + int(math.floor(math.log(target / loaded, 2))))
+        else:
+            recommended = max(1, int(round(current * target / loaded)))
+            # large values are rounded to three significant digits
+            if recommended >= 1000:
+                magnitude = 10 ** (len(str(recommended)) - 3)
+                recommended = int(round(float(recommended) / magnitude)) * magnitude
+
+        # the recommended value is measured on a copy, the configured hasher
+        #   is not modified
+        calibrated = hasher.__class__()
+        setattr(calibrated, parameter, recommended)
+        recommended_loaded = _measure_hasher(calibrated, samples, concurrency)
+
+        result.update({
+            'parameter': parameter,
+            'current': current,
+            'recommended': recommended,
+            'recommended_loaded_ms': recommended_loaded * 1000,
+            'recommended_signups_per_second': 1 / recommended_loaded if recommended_loaded else None,
+        })
+
+    return results
+
+
+# the registry of checks, that are run by this command
+#   The functions are referenced by their dotted path and imported, when the
+#   check is run. They have to return True or raise a CommandError, describing
+#   their findings line by line.
+CHECKS = OrderedDict()
+
+# exit codes of the command, suitable for monitoring systems
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+def register_check(name, function, success_message, get_kwargs=None):
+    """Adds a check to the registry.
+
+    'get_kwargs' may be a callable, that determines the keyword arguments of
+    the check function from the command's options."""
+
+    CHECKS[name] = (function, success_message, get_kwargs)
+
+
+register_check(
+    'unique-email',
+    '{}.check_email_uniqueness'.format(__name__),
+    'All email addresses are unique!',
+    lambda options: {
+        'mode': options.get('scan_mode', 'auto'),
+        'limit': options.get('limit', 100),
+        'offset': options.get('offset', 0),
+        'chunk_size': options.get('chunk_size', 10000),
+        'progress': options.get('progress'),
+        'using': options.get('database'),
+    }
+)
+register_check(
+    'admin-notification',
+    '{}.check_admin_notification'.format(__name__),
+    'Notification settings are valid!',
+    lambda options: {
+        'using': options.get('database'),
+    }
+)
+
+
+def run_check(name, options=None):
+    """Runs a single registered check and returns its structured result.
+
+    The result is a dict, containing the check's 'name', its 'status' ('ok',
+    'failed' or 'error'), its 'duration' in seconds and a list of 'messages'."""
+
+    function, success_message, get_kwargs = CHECKS[name]
+    kwargs = get_kwargs(options or {}) if get_kwargs else {}
+
+    start_time = time.time()
+    try:
+        import_string(function)(**kwargs)
+        status, messages = 'ok', [success_message]
+    except CommandError as e:
+        status, messages = 'failed', str(e).splitlines()
+    except Exception as e:
+        status, messages = 'error', ['{}: {}'.format(e.__class__.__name__, e)]
+
+    return {
+        'name': name,
+        'status': status,
+        'duration': time.time() - start_time,
+        'messages': messages,
+    }
+
+
+def run_checks(names, options=None, jobs=1):
+    """Runs the given checks and returns their results in the given order.
+
+    With 'jobs' > 1, the checks are run concurrently in threads. Every thread
+    uses its own database connections, which are closed afterwards."""
+
+    if jobs <= 1:
+        return [run_check(name, options) for name in names]
+
+    results = {}
+    pending = list(names)
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    name = pending.pop(0)
+                results[name] = run_check(name, options)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _i in range(min(jobs, len(names)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return [results[name] for name in names]
+
+
+class ChecksFailed(CommandError):
+    """Raised by the command, if any check did not pass.
+
+    The 'returncode' is used as the exit code of the command."""
+
+    def __init__(self, message, returncode=EXIT_FAILED):
+        super(ChecksFailed, self).__init__(message)
+        self.returncode = returncode
+
+
 class Command(BaseCommand):
     """Provides the command 'authenhanced'."""
 
@@ -147,29 +969,513 @@ class Command(BaseCommand):
                 "The actual command to perform (accepted values: "
                 "'admin-notification', "
                 "'unique-email', "
-                "and 'full')"
+                "'full', "
+                "'purge-unverified', "
+                "'backfill-enhancements', "
+                "'stats', "
+                "'seed', "
+                "'explain', "
+                "'warmup' "
+                "and 'calibrate-hasher')"
+            )
+        )
+        parser.add_argument(
+            '--jobs', dest='jobs', default=1, type=int,
+            help=(
+                "The number of checks, that are run concurrently, each using "
+                "its own database connection (default: 1)."
+            )
+        )
+        parser.add_argument(
+            '--format', dest='format', default='text', choices=('text', 'json'),
+            help="The output format of reports (default: 'text')."
+        )
+        parser.add_argument(
+            '--database', dest='database', default=None,
+            help=(
+                "The database, that read-only checks and reports are run "
+                "against (default: the setting 'DAE_READ_DATABASE')."
+            )
+        )
+        parser.add_argument(
+            '--chunk-size', dest='chunk_size', default=1000, type=int,
+            help="The number of rows, that are processed in one chunk (default: 1000)."
+        )
+
+        # options of 'unique-email'
+        parser.add_argument(
+            '--scan-mode', dest='scan_mode', default='auto', choices=('auto', 'database', 'stream'),
+            help=(
+                "How to scan for duplicate email addresses: 'database' lets "
+                "the database group the accounts, 'stream' processes them in "
+                "chunks in Python, 'auto' uses 'database' if the email column "
+                "is indexed (default: 'auto')."
+            )
+        )
+        parser.add_argument(
+            '--limit', dest='limit', default=100, type=int,
+            help="The maximum number of reported duplicate email addresses (default: 100)."
+        )
+        parser.add_argument(
+            '--offset', dest='offset', default=0, type=int,
+            help="The number of duplicate email addresses to skip in the report (default: 0)."
+        )
+
+        # options of 'purge-unverified'
+        parser.add_argument(
+            '--older-than', dest='older_than', default='30d',
+            help=(
+                "Only accounts, whose verification mail is older than this, "
+                "are purged. Accepts seconds or a number with a trailing 'h' "
+                "or 'd' (default: '30d')."
+            )
+        )
+        parser.add_argument(
+            '--sleep', dest='sleep', default=0.5, type=float,
+            help="Seconds to wait between two chunks (default: 0.5)."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true', dest='dry_run',
+            help="Only count the accounts, that would be purged or backfilled."
+        )
+
+        # options of 'stats'
+        parser.add_argument(
+            '--recount', action='store_true', dest='recount',
+            help="Rebuild the status counters before reporting them."
+        )
+
+        # options of 'seed'
+        parser.add_argument(
+            '--users', dest='users', default=1000, type=int,
+            help="The number of accounts to create (default: 1000)."
+        )
+        parser.add_argument(
+            '--verified-ratio', dest='verified_ratio', default=0.3, type=float,
+            help="The share of accounts with a verified email address (default: 0.3)."
+        )
+        parser.add_argument(
+            '--in-progress-ratio', dest='in_progress_ratio', default=0.5, type=float,
+            help=(
+                "The share of accounts, that got a verification mail, but did "
+                "not verify their address yet (default: 0.5). The remaining "
+                "accounts did not get a verification mail."
+            )
+        )
+        parser.add_argument(
+            '--duplicate-ratio', dest='duplicate_ratio', default=0.0, type=float,
+            help="The share of accounts, that reuse the email address of another account (default: 0.0)."
+        )
+        parser.add_argument(
+            '--sent-within', dest='sent_within', default='60d',
+            help=(
+                "The accounts are created and their verification mails sent "
+                "within this period. Accepts seconds or a number with a "
+                "trailing 'h' or 'd' (default: '60d')."
             )
         )
+        parser.add_argument(
+            '--password', dest='password', default=None,
+            help="The password of all accounts (default: an unusable password)."
+        )
+        parser.add_argument(
+            '--prefix', dest='prefix', default='seed',
+            help="The prefix of the usernames (default: 'seed')."
+        )
+        parser.add_argument(
+            '--random-seed', dest='random_seed', default=None, type=int,
+            help="Makes the distribution of the accounts reproducible."
+        )
+
+        # options of 'explain'
+        parser.add_argument(
+            '--min-rows', dest='min_rows', default=10000, type=int,
+            help="Sequential scans are flagged on tables with at least this number of rows (default: 10000)."
+        )
+
+        # options of 'calibrate-hasher'
+        parser.add_argument(
+            '--target-ms', dest='target_ms', default=150.0, type=float,
+            help="The targeted duration of hashing a password in milliseconds (default: 150)."
+        )
+        parser.add_argument(
+            '--samples', dest='samples', default=5, type=int,
+            help="The number of passwords, that are hashed per thread and measurement (default: 5)."
+        )
+        parser.add_argument(
+            '--concurrency', dest='concurrency', default=None, type=int,
+            help="The number of concurrently hashing threads (default: the number of CPU cores)."
+        )
 
     def handle(self, *args, **options):
         """Check, which of the available commands is to be executed."""
 
         self.cmd = options['cmd'][0]
 
-        if self.cmd not in ('unique-email', 'admin-notification', 'full'):
+        if self.cmd not in list(CHECKS) + [
+            'full', 'purge-unverified', 'backfill-enhancements', 'stats', 'seed', 'explain', 'warmup',
+            'calibrate-hasher',
+        ]:
             raise CommandError("No valid command was provided!")
 
-        if self.cmd in ('unique-email', 'full'):
-            if check_email_uniqueness():
-                # all email addresses are unique!
-                self.stdout.write(
-                    self.style.SUCCESS('[ok] All email addresses are unique!')
+        if options['chunk_size'] < 1:
+            raise CommandError("'--chunk-size' has to be a positive integer!")
+
+        # read-only checks and reports may be run against a replica, while
+        #   all commands, that modify data, use the database for writes
+        options['database'] = options['database'] or get_app_settings().read_database
+        if options['database'] is not None and options['database'] not in settings.DATABASES:
+            raise CommandError("'--database' has to be the alias of a configured database!")
+
+        if self.cmd == 'purge-unverified':
+            return self._purge_unverified(options)
+
+        if self.cmd == 'backfill-enhancements':
+            return self._backfill_enhancements(options)
+
+        if self.cmd == 'stats':
+            return self._stats(options)
+
+        if self.cmd == 'seed':
+            return self._seed(options)
+
+        if self.cmd == 'explain':
+            return self._explain(options)
+
+        if self.cmd == 'warmup':
+            return self._warmup(options)
+
+        if self.cmd == 'calibrate-hasher':
+            return self._calibrate_hasher(options)
+
+        return self._checks(options)
+
+    def run_from_argv(self, argv):
+        """Applies the exit code of failed checks.
+
+        Django exits with code 1 on every CommandError, so the exit code is
+        adjusted afterwards (see 'ChecksFailed')."""
+
+        self.returncode = EXIT_OK
+        try:
+            super(Command, self).run_from_argv(argv)
+        except SystemExit:
+            if self.returncode != EXIT_OK:
+                sys.exit(self.returncode)
+            raise
+
+    def _checks(self, options):
+        """Runs the selected checks and reports their results.
+
+        'full' runs all registered checks, regardless of their results."""
+
+        names = list(CHECKS) if self.cmd == 'full' else [self.cmd]
+
+        check_options = dict(options)
+        if options['verbosity'] >= 2 and options['format'] == 'text':
+            check_options['progress'] = self._scan_progress
+
+        start_time = time.time()
+        results = run_checks(names, check_options, jobs=options['jobs'])
+        duration = time.time() - start_time
+
+        statuses = set(r['status'] for r in results)
+        if 'error' in statuses:
+            status, returncode = 'error', EXIT_ERROR
+        elif 'failed' in statuses:
+            status, returncode = 'failed', EXIT_FAILED
+        else:
+            status, returncode = 'ok', EXIT_OK
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(
+                {'status': status, 'duration': duration, 'checks': results},
+                sort_keys=True
+            ))
+        else:
+            for result in results:
+                if result['status'] == 'ok':
+                    self.stdout.write(self.style.SUCCESS(
+                        '[ok] {} ({:.3f}s)'.format(result['messages'][0], result['duration'])
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        '[{}] {} ({:.3f}s)'.format(result['status'], result['name'], result['duration'])
+                    ))
+                    for message in result['messages']:
+                        self.stdout.write('    {}'.format(message))
+
+        if returncode != EXIT_OK:
+            self.returncode = returncode
+            raise ChecksFailed(
+                "The following checks did not pass: {}".format(
+                    ', '.join(r['name'] for r in results if r['status'] != 'ok')
+                ),
+                returncode=returncode
+            )
+
+    def _scan_progress(self, scanned, total):
+        """Reports the progress of long running scans."""
+
+        self.stdout.write('... scanned {} of {} rows'.format(scanned, total))
+
+    def _purge_unverified(self, options):
+        """Runs 'purge_unverified_accounts()' and reports its progress."""
+
+        try:
+            max_age = convert_to_seconds(options['older_than'])
+        except AuthEnhancedConversionError:
+            raise CommandError("'--older-than' could not be converted to seconds!")
+
+        # accounts, whose verification token is still valid, may not be
+        #   purged, otherwise the emailed link would point to a deleted account
+        if max_age < get_app_settings().verification_token_max_age:
+            raise CommandError(
+                "'--older-than' has to be at least DAE_VERIFICATION_TOKEN_MAX_AGE "
+                "({} seconds)!".format(get_app_settings().verification_token_max_age)
+            )
+
+        total = 0
+        start_time = time.time()
+        for count in purge_unverified_accounts(
+            max_age,
+            chunk_size=options['chunk_size'],
+            pause=options['sleep'],
+            dry_run=options['dry_run']
+        ):
+            total += count
+            if options['verbosity'] >= 2:
+                self.stdout.write('... {} accounts'.format(total))
+        duration = time.time() - start_time
+
+        if options['dry_run']:
+            self.stdout.write('[dry-run] {} accounts would be purged.'.format(total))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    '[ok] Purged {} unverified accounts in {:.1f}s ({:.1f} rows/s).'.format(
+                        total, duration, total / duration if duration else 0.0
+                    )
+                )
+            )
+
+        # deferred signups expire together with their verification token,
+        #   independent of '--older-than'
+        total = 0
+        start_time = time.time()
+        for count in purge_expired_signups(
+            chunk_size=options['chunk_size'],
+            pause=options['sleep'],
+            dry_run=options['dry_run']
+        ):
+            total += count
+            if options['verbosity'] >= 2:
+                self.stdout.write('... {} pending signups'.format(total))
+        duration = time.time() - start_time
+
+        if options['dry_run']:
+            self.stdout.write('[dry-run] {} expired pending signups would be purged.'.format(total))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    '[ok] Purged {} expired pending signups in {:.1f}s ({:.1f} rows/s).'.format(
+                        total, duration, total / duration if duration else 0.0
+                    )
+                )
+            )
+
+    def _backfill_enhancements(self, options):
+        """Runs 'backfill_enhancements()' and reports its progress."""
+
+        total = 0
+        start_time = time.time()
+        for count in backfill_enhancements(
+            chunk_size=options['chunk_size'],
+            pause=options['sleep'],
+            dry_run=options['dry_run']
+        ):
+            total += count
+            if options['verbosity'] >= 2:
+                self.stdout.write('... {} accounts'.format(total))
+        duration = time.time() - start_time
+
+        if options['dry_run']:
+            self.stdout.write('[dry-run] {} accounts are missing their enhancement.'.format(total))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    '[ok] Created {} enhancements in {:.1f}s ({:.1f} rows/s).'.format(
+                        total, duration, total / duration if duration else 0.0
+                    )
                 )
+            )
+
+    def _stats(self, options):
+        """Reports the number of accounts per email verification status."""
+
+        statistics = get_status_statistics(
+            recount=options['recount'], chunk_size=options['chunk_size'], using=options['database']
+        )
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(statistics, sort_keys=True))
+            return
+
+        self.stdout.write('Email verification status of accounts:')
+        for key, label in (
+            ('completed', 'completed'),
+            ('in_progress', 'in progress'),
+            ('failed', 'failed'),
+            ('total', 'total'),
+        ):
+            self.stdout.write('    {:<12} {}'.format(label + ':', statistics[key]))
 
-        if self.cmd in ('admin-notification', 'full'):
-            if check_admin_notification():
+    def _seed(self, options):
+        """Runs 'seed_accounts()' and reports its progress."""
+
+        if options['users'] < 1:
+            raise CommandError("'--users' has to be a positive integer!")
+
+        try:
+            sent_within = convert_to_seconds(options['sent_within'])
+        except AuthEnhancedConversionError:
+            raise CommandError("'--sent-within' could not be converted to seconds!")
+
+        totals = {'completed': 0, 'in_progress': 0, 'failed': 0, 'duplicates': 0}
+        start_time = time.time()
+        try:
+            for counts in seed_accounts(
+                options['users'],
+                verified_ratio=options['verified_ratio'],
+                in_progress_ratio=options['in_progress_ratio'],
+                duplicate_ratio=options['duplicate_ratio'],
+                password=options['password'],
+                prefix=options['prefix'],
+                sent_within=sent_within,
+                chunk_size=options['chunk_size'],
+                random_seed=options['random_seed']
+            ):
+                for key, count in counts.items():
+                    totals[key] += count
+                if options['verbosity'] >= 2:
+                    self.stdout.write('... {} accounts'.format(
+                        totals['completed'] + totals['in_progress'] + totals['failed']
+                    ))
+        except ValueError as e:
+            raise CommandError(str(e))
+        duration = time.time() - start_time
+
+        total = totals['completed'] + totals['in_progress'] + totals['failed']
+        self.stdout.write(
+            self.style.SUCCESS(
+                '[ok] Created {} accounts ({} verified, {} in progress, {} failed, {} duplicate email '
+                'addresses) in {:.1f}s ({:.1f} rows/s).'.format(
+                    total, totals['completed'], totals['in_progress'], totals['failed'], totals['duplicates'],
+                    duration, total / duration if duration else 0.0
+                )
+            )
+        )
+
+    def _explain(self, options):
+        """Prints the plans of the app's hot queries and flags sequential scans
+        on large tables."""
+
+        results = explain_hot_queries(using=options['database'], min_rows=options['min_rows'])
+        flagged = [r['name'] for r in results if r['flagged']]
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(
+                {'status': 'failed' if flagged else 'ok', 'queries': results},
+                sort_keys=True
+            ))
+        else:
+            for result in results:
+                self.stdout.write('{}:'.format(result['name']))
+                if options['verbosity'] >= 2:
+                    self.stdout.write('    {}'.format(result['sql']))
+                for line in result['plan'].splitlines():
+                    self.stdout.write('    {}'.format(line))
+                for scan in result['sequential_scans']:
+                    message = '    sequential scan on {} ({} rows{})'.format(
+                        scan['table'], scan['rows'], ', expected' if result['full_scan'] else ''
+                    )
+                    self.stdout.write(self.style.WARNING(message) if result['flagged'] else message)
+
+            if not flagged:
+                self.stdout.write(self.style.SUCCESS(
+                    '[ok] No sequential scans on tables with at least {} rows.'.format(options['min_rows'])
+                ))
+
+        if flagged:
+            self.returncode = EXIT_FAILED
+            raise ChecksFailed(
+                "The following queries scan large tables sequentially: {}".format(', '.join(flagged)),
+                returncode=EXIT_FAILED
+            )
+
+    def _warmup(self, options):
+        """Runs the app's warmup routine and reports the duration of its
+        steps."""
+
+        durations = warmup()
+        total = sum(durations.values())
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps({'steps': durations, 'duration': total}))
+            return
+
+        self.stdout.write('Warmup steps:')
+        for name, duration in durations.items():
+            self.stdout.write('    {:<20} {:.1f}ms'.format(name + ':', duration * 1000))
+        self.stdout.write(self.style.SUCCESS('[ok] Warmup finished in {:.1f}ms.'.format(total * 1000)))
+
+    def _calibrate_hasher(self, options):
+        """Runs 'calibrate_hashers()' and reports the measured durations and
+        the recommended work factors."""
+
+        if options['target_ms'] <= 0:
+            raise CommandError("'--target-ms' has to be a positive number!")
+        if options['samples'] < 1:
+            raise CommandError("'--samples' has to be a positive integer!")
+        if options['concurrency'] is not None and options['concurrency'] < 1:
+            raise CommandError("'--concurrency' has to be a positive integer!")
+
+        concurrency = options['concurrency'] or multiprocessing.cpu_count()
+        results = calibrate_hashers(
+            target_ms=options['target_ms'], samples=options['samples'], concurrency=concurrency
+        )
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(
+                {'target_ms': options['target_ms'], 'concurrency': concurrency, 'hashers': results},
+                sort_keys=True
+            ))
+            return
+
+        self.stdout.write('Password hashers (target: {:.0f}ms, {} concurrent hashes):'.format(
+            options['target_ms'], concurrency
+        ))
+        for result in results:
+            self.stdout.write('    {}{}'.format(result['hasher'], ' (default)' if result['default'] else ''))
+            if 'error' in result:
+                self.stdout.write(self.style.WARNING('        {}'.format(result['error'])))
+                continue
+
+            current = '{}={}'.format(result['parameter'], result['current']) if result['parameter'] else '-'
+            self.stdout.write(
+                '        current:     {:<20} {:>8.1f}ms (single) {:>8.1f}ms ({} concurrent) '
+                '{:>8.1f} signups/s per worker'.format(
+                    current, result['current_ms'], result['current_loaded_ms'], concurrency,
+                    result['current_signups_per_second'] or 0.0
+                )
+            )
+            if result['parameter']:
                 self.stdout.write(
-                    self.style.SUCCESS('[ok] Notification settings are valid!')
+                    '        recommended: {:<20} {:>27.1f}ms ({} concurrent) {:>8.1f} signups/s per worker'.format(
+                        '{}={}'.format(result['parameter'], result['recommended']),
+                        result['recommended_loaded_ms'], concurrency,
+                        result['recommended_signups_per_second'] or 0.0
+                    )
                 )
 
     def get_version(self):
@@ -0,0 +1,19 @@
+# Converting 'email_verification_status' to a small integer, step 1 of 3:
+#   add the new column next to the old one.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_enhanced', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userenhancement',
+            name='email_verification_status_int',
+            field=models.PositiveSmallIntegerField(choices=[(2, 'Email verification completed'), (1, 'Email verification in progress'), (0, 'Email verification failed')], default=0),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Converting 'email_verification_status' to a small integer, step 2 of 3:
+#   copy the values in chunks of primary keys.
+#
+# This migration is not atomic on purpose: every chunk is committed in its own
+#   transaction, so large tables are not locked for the whole conversion.
+
+from django.db import migrations, transaction
+from django.db.models import Max
+
+# the number of primary keys, that are handled in one transaction
+CHUNK_SIZE = 5000
+
+# maps the old string values to the new integer values
+STATUS_MAP = (
+    ('EMAIL_VERIFICATION_FAILED', 0),
+    ('EMAIL_VERIFICATION_IN_PROGRESS', 1),
+    ('EMAIL_VERIFICATION_COMPLETED', 2),
+)
+
+
+def _copy_in_chunks(apps, schema_editor, source, target, forward):
+    """Copies 'source' to 'target', applying STATUS_MAP in the given direction."""
+
+    enhancement_model = apps.get_model('auth_enhanced', 'UserEnhancement')
+    db_alias = schema_editor.connection.alias
+    queryset = enhancement_model.objects.using(db_alias)
+
+    max_pk = queryset.aggregate(max_pk=Max('pk'))['max_pk']
+    if max_pk is None:
+        return
+
+    for chunk_start in range(0, max_pk + 1, CHUNK_SIZE):
+        with transaction.atomic(using=db_alias):
+            chunk = queryset.filter(pk__gte=chunk_start, pk__lt=chunk_start + CHUNK_SIZE)
+            for old_value, new_value in STATUS_MAP:
+                if forward:
+                    chunk.filter(**{source: old_value}).update(**{target: new_value})
+                else:
+                    chunk.filter(**{source: new_value}).update(**{target: old_value})
+
+
+def forwards(apps, schema_editor):
+    _copy_in_chunks(apps, schema_editor, 'email_verification_status', 'email_verification_status_int', True)
+
+
+def backwards(apps, schema_editor):
+    _copy_in_chunks(apps, schema_editor, 'email_verification_status_int', 'email_verification_status', False)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('auth_enhanced', '0002_email_verification_status_integer'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,36 @@
+# Converting 'email_verification_status' to a small integer, step 3 of 3:
+#   drop the old column, move the new one into its place and add the index on
+#   pending verifications (see 'models.pending_verification_index()').
+
+from django import VERSION as DJANGO_VERSION
+from django.db import migrations, models
+
+index_kwargs = {
+    'fields': ['email_verification_status'],
+    'name': 'dae_ue_pending_status_idx',
+}
+if DJANGO_VERSION >= (2, 2):
+    index_kwargs['condition'] = ~models.Q(email_verification_status=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_enhanced', '0003_email_verification_status_data'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userenhancement',
+            name='email_verification_status',
+        ),
+        migrations.RenameField(
+            model_name='userenhancement',
+            old_name='email_verification_status_int',
+            new_name='email_verification_status',
+        ),
+        migrations.AddIndex(
+            model_name='userenhancement',
+            index=models.Index(**index_kwargs),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_enhanced', '0004_email_verification_status_swap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userenhancement',
+            name='verification_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userenhancement',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userenhancement',
+            index=models.Index(fields=['email_verification_status', 'verification_sent_at'], name='dae_ue_status_sent_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def count_statuses(apps, schema_editor):
+    """Initialises the counters with the current number of UserEnhancements
+    per status."""
+
+    enhancement_model = apps.get_model('auth_enhanced', 'UserEnhancement')
+    counter_model = apps.get_model('auth_enhanced', 'VerificationStatusCounter')
+    db_alias = schema_editor.connection.alias
+
+    counts = (
+        enhancement_model.objects.using(db_alias)
+        .order_by()
+        .values_list('email_verification_status')
+        .annotate(n=models.Count('pk'))
+    )
+    counter_model.objects.using(db_alias).bulk_create(
+        [counter_model(status=status, count=n) for status, n in counts]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_enhanced', '0005_verification_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationStatusCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveSmallIntegerField(choices=[(2, 'Email verification completed'), (1, 'Email verification in progress'), (0, 'Email verification failed')], unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Verification Status Counter',
+                'verbose_name_plural': 'Verification Status Counters',
+            },
+        ),
+        migrations.RunPython(count_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_enhanced', '0006_verificationstatuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSignup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=254, unique=True)),
+                ('email', models.EmailField(db_index=True, max_length=254)),
+                ('password', models.CharField(max_length=128)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Pending Signup',
+                'verbose_name_plural': 'Pending Signups',
+            },
+        ),
+    ]
@@ -10,14 +10,101 @@ Though Django's 'auth' app was focused, 'django-auth_enhanced' tries to be as
 pluggable as possible."""
 
 
+# Python imports
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
 # Django imports
+from django import VERSION as DJANGO_VERSION
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 # app imports
+from auth_enhanced.cache import (
+    get_cached_status, get_cached_status_info, invalidate_cached_status,
+    is_recently_changed, set_cached_status, set_cached_status_info,
+)
 from auth_enhanced.exceptions import AuthEnhancedException
+from auth_enhanced.instrumentation import timed
+from auth_enhanced.settings import get_app_settings
+
+# holds the pending counter updates, while 'VerificationStatusCounter.batched()'
+#   is active in the current thread
+_counter_batch = threading.local()
+
+
+# the stored value of 'UserEnhancement.EMAIL_VERIFICATION_COMPLETED', which is
+#   defined here, because 'UserEnhancement.Meta' can not access the constants
+#   of its model class
+_EMAIL_VERIFICATION_COMPLETED = 2
+
+
+def pending_verification_index():
+    """Returns the index on 'email_verification_status'.
+
+    Most queries on this column look for accounts, that have *not* yet
+    completed their verification. Starting with Django 2.2, the index is
+    restricted to these rows (a partial index), so it stays small, even if
+    the table grows. Database backends without support for partial indexes
+    (and older versions of Django) will create a plain index instead.
+
+    Please note, that the migrations of this app mimic this function."""
+
+    # the name has to be fixed, because partial indexes must be named
+    index_kwargs = {
+        'fields': ['email_verification_status'],
+        'name': 'dae_ue_pending_status_idx',
+    }
+
+    if DJANGO_VERSION >= (2, 2):
+        index_kwargs['condition'] = ~models.Q(email_verification_status=_EMAIL_VERIFICATION_COMPLETED)
+
+    return models.Index(**index_kwargs)
+
+
+class UserEnhancementQuerySet(models.QuerySet):
+    """Provides bulk operations on UserEnhancements, that keep the app's
+    derived data (cached status, status counters) consistent."""
+
+    def update_status(self, status, **kwargs):
+        """Sets 'email_verification_status' of all matched objects.
+
+        In contrast to 'update()', the status counters are adjusted and the
+        cached status is invalidated. Additional fields may be updated by
+        passing them as keyword arguments.
+
+        Please note, that the affected user ids are loaded into memory, so
+        very large querysets should be processed in chunks."""
+
+        with transaction.atomic(using=self.db):
+            changing = list(
+                self.exclude(email_verification_status=status)
+                .select_for_update()
+                .values_list('user_id', 'email_verification_status')
+            )
+            user_ids = [c[0] for c in changing]
+
+            self.model.objects.using(self.db).filter(user_id__in=user_ids).update(
+                email_verification_status=status, **kwargs
+            )
+
+            deltas = {status: len(changing)}
+            for _user_id, old_status in changing:
+                deltas[old_status] = deltas.get(old_status, 0) - 1
+            # the counters are updated on the same database and in the same
+            #   transaction as the objects
+            VerificationStatusCounter.adjust(deltas, using=self.db)
+
+        # the cache is invalidated after the commit, which may be the commit
+        #   of an outer transaction (see 'callback_invalidate_status()')
+        transaction.on_commit(lambda: invalidate_cached_status(user_ids), using=self.db)
+
+        return len(changing)
 
 
 class UserEnhancement(models.Model):
@@ -26,9 +113,13 @@ class UserEnhancement(models.Model):
     Please note, that this model is meant to be pluggable by using a reference
     to 'AUTH_USER_MODEL'."""
 
-    EMAIL_VERIFICATION_COMPLETED = 'EMAIL_VERIFICATION_COMPLETED'
-    EMAIL_VERIFICATION_IN_PROGRESS = 'EMAIL_VERIFICATION_IN_PROGRESS'
-    EMAIL_VERIFICATION_FAILED = 'EMAIL_VERIFICATION_FAILED'
+    # the status is stored as a small integer instead of its name, which keeps
+    #   the rows (and the index on this column) compact.
+    #   Please note: these values are stored in the database, so they must not
+    #   be changed without providing a corresponding data migration.
+    EMAIL_VERIFICATION_FAILED = 0
+    EMAIL_VERIFICATION_IN_PROGRESS = 1
+    EMAIL_VERIFICATION_COMPLETED = _EMAIL_VERIFICATION_COMPLETED
     EMAIL_VERIFICATION_STATUS = (
         (EMAIL_VERIFICATION_COMPLETED, _('Email verification completed')),
         (EMAIL_VERIFICATION_IN_PROGRESS, _('Email verification in progress')),
@@ -36,12 +127,17 @@ class UserEnhancement(models.Model):
     )
 
     # the actual verification status
-    email_verification_status = models.CharField(
-        max_length=30,
+    email_verification_status = models.PositiveSmallIntegerField(
         choices=EMAIL_VERIFICATION_STATUS,
         default=EMAIL_VERIFICATION_FAILED,
     )
 
+    # the point in time, when the last verification mail was sent
+    verification_sent_at = models.DateTimeField(blank=True, null=True)
+
+    # the point in time, when the email address was verified
+    verified_at = models.DateTimeField(blank=True, null=True)
+
     # a reference to the user object
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -49,19 +145,42 @@ class UserEnhancement(models.Model):
         related_name='enhancement'
     )
 
+    objects = UserEnhancementQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('User Enhancement')
         verbose_name_plural = _('User Enhancements')
+        # the second index enables range scans on the age of verifications of
+        #   a given status (i.e. finding stale pending verifications)
+        indexes = [
+            pending_verification_index(),
+            models.Index(fields=['email_verification_status', 'verification_sent_at'], name='dae_ue_status_sent_idx'),
+        ]
 
     def __str__(self):
         """Provides the string representation of these objects."""
         return "Enhancement of '{}'".format(self.user.get_username())   # pragma: nocover
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the status as loaded from the database.
+
+        This is required to detect status transitions, see
+        'VerificationStatusCounter'."""
+
+        instance = super(UserEnhancement, cls).from_db(db, field_names, values)
+
+        if 'email_verification_status' in field_names:
+            instance._loaded_status = instance.email_verification_status
+
+        return instance
+
     class UserEnhancementException(AuthEnhancedException):
         """This exception indicates, that something went wrong inside this model"""
         pass
 
     @classmethod
+    @timed('create_enhancement')
     def callback_create_enhancement_object(cls, sender, instance, created, user_obj=None, user_id=None, **kwargs):
         """Returns a new instance of UserEnhancement, tied to a User-object"""
 
@@ -84,6 +203,72 @@ class UserEnhancement(models.Model):
         else:
             return None
 
+    @classmethod
+    def get_status_database(cls, user_id):
+        """Returns the database, that the status of the given user is read
+        from, before it is cached.
+
+        This is 'DAE_READ_DATABASE', if provided. The status of a recently
+        changed account is read from the database for writes, because a
+        lagging replica would put a stale status into the cache."""
+
+        read_database = get_app_settings().read_database
+        if read_database is None or is_recently_changed(user_id):
+            return router.db_for_write(cls)
+
+        return read_database
+
+    @classmethod
+    def get_status_cached(cls, user_id):
+        """Returns the 'email_verification_status' of the given user.
+
+        The status is read through the app's caching layer (see 'cache.py'),
+        so repeated calls will not hit the database. If the user does not
+        have an UserEnhancement, None is returned."""
+
+        status = get_cached_status(user_id)
+
+        if status is None:
+            try:
+                status = (
+                    cls.objects.using(cls.get_status_database(user_id))
+                    .values_list('email_verification_status', flat=True)
+                    .get(user_id=user_id)
+                )
+            except cls.DoesNotExist:
+                return None
+
+            set_cached_status(user_id, status)
+
+        return status
+
+    @classmethod
+    def get_status_info_cached(cls, user_id):
+        """Returns a tuple of the 'email_verification_status' of the given
+        user and the point in time of its last change (or None, if unknown).
+
+        The point in time is 'verified_at' for completed verifications and
+        'verification_sent_at' otherwise. Just like 'get_status_cached()', the
+        result is cached. If the user does not have an UserEnhancement, None
+        is returned."""
+
+        status_info = get_cached_status_info(user_id)
+
+        if status_info is None:
+            try:
+                status, sent_at, verified_at = (
+                    cls.objects.using(cls.get_status_database(user_id))
+                    .values_list('email_verification_status', 'verification_sent_at', 'verified_at')
+                    .get(user_id=user_id)
+                )
+            except cls.DoesNotExist:
+                return None
+
+            status_info = (status, verified_at if status == cls.EMAIL_VERIFICATION_COMPLETED else sent_at)
+            set_cached_status_info(user_id, status_info)
+
+        return status_info
+
     @property
     def email_is_verified(self):
         """Returns a simple boolean value, depending on the 'email_verification_status'"""
@@ -92,3 +277,266 @@ class UserEnhancement(models.Model):
             return True
 
         return False
+
+
+class VerificationStatusCounter(models.Model):
+    """Stores the number of UserEnhancements per 'email_verification_status'.
+
+    Counting the UserEnhancements directly requires a scan of the whole table.
+    Instead, these counters are updated on every status transition by signal
+    callbacks (see 'apps.py') and by 'UserEnhancementQuerySet.update_status()'.
+    Code, that bypasses both (i.e. 'bulk_create()'), has to call 'adjust()'.
+
+    If the counters get out of sync, they can be rebuilt by 'recount()'."""
+
+    status = models.PositiveSmallIntegerField(
+        choices=UserEnhancement.EMAIL_VERIFICATION_STATUS,
+        unique=True,
+    )
+
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Verification Status Counter')
+        verbose_name_plural = _('Verification Status Counters')
+
+    def __str__(self):
+        """Provides the string representation of these objects."""
+        return '{}: {}'.format(self.get_status_display(), self.count)   # pragma: nocover
+
+    @classmethod
+    def adjust(cls, deltas, using=None):
+        """Applies the given deltas (a dict of status: delta) to the counters.
+
+        The counters are written to the database 'using', which should be the
+        database of the counted UserEnhancements (default: the router's choice
+        for writing the counters).
+
+        If there is a batch active (see 'batched()'), the deltas are only
+        collected and applied at the end of the batch."""
+
+        using = using or router.db_for_write(cls)
+
+        batch = getattr(_counter_batch, 'deltas', None)
+        if batch is not None:
+            batch_deltas = batch.setdefault(using, {})
+            for status, delta in deltas.items():
+                batch_deltas[status] = batch_deltas.get(status, 0) + delta
+            return
+
+        counters = cls.objects.db_manager(using)
+        for status, delta in deltas.items():
+            if not delta:
+                continue
+            if counters.filter(status=status).update(count=F('count') + delta):
+                continue
+            # the counter does not exist yet, but it may have been created
+            #   concurrently
+            try:
+                with transaction.atomic(using=using):
+                    counters.create(status=status, count=delta)
+            except IntegrityError:
+                counters.filter(status=status).update(count=F('count') + delta)
+
+    @classmethod
+    @contextmanager
+    def batched(cls):
+        """Collects all counter updates and applies them at once on exit.
+
+        This is meant for bulk operations, that trigger the signal callbacks
+        for every single object (i.e. 'QuerySet.delete()'). The deltas are
+        collected per database and applied to the database they were adjusted
+        on. If used inside a transaction, the counters are updated inside the
+        same transaction."""
+
+        if getattr(_counter_batch, 'deltas', None) is not None:
+            # nested batches are merged into the outermost one
+            yield
+            return
+
+        _counter_batch.deltas = {}
+        try:
+            yield
+            batch = _counter_batch.deltas
+        finally:
+            _counter_batch.deltas = None
+        for using, deltas in batch.items():
+            cls.adjust(deltas, using=using)
+
+    @classmethod
+    def get_counts(cls, using=None):
+        """Returns the number of UserEnhancements per status as a dict.
+
+        Every known status is included, even if there is no counter yet. The
+        counters are read from the database 'using', if provided."""
+
+        counts = dict((status, 0) for status, _label in UserEnhancement.EMAIL_VERIFICATION_STATUS)
+        counts.update(cls.objects.using(using).values_list('status', 'count'))
+
+        return counts
+
+    @classmethod
+    def recount(cls, chunk_size=10000, using=None):
+        """Rebuilds the counters by counting the UserEnhancements in chunks of
+        primary keys.
+
+        The UserEnhancements are counted and the counters are written on the
+        database 'using' (default: the router's choice for writing
+        UserEnhancements).
+
+        Please note, that status transitions during the recount may not be
+        reflected in the result."""
+
+        counts = dict((status, 0) for status, _label in UserEnhancement.EMAIL_VERIFICATION_STATUS)
+
+        # the counters are written from the result, so the UserEnhancements
+        #   are not counted on a (possibly lagging) replica
+        using = using or router.db_for_write(UserEnhancement)
+        enhancements = UserEnhancement.objects.using(using)
+
+        max_pk = enhancements.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        for chunk_start in range(0, max_pk + 1, chunk_size):
+            chunk_counts = (
+                enhancements
+                .filter(pk__gte=chunk_start, pk__lt=chunk_start + chunk_size)
+                .order_by()
+                .values_list('email_verification_status')
+                .annotate(n=Count('pk'))
+            )
+            for status, n in chunk_counts:
+                counts[status] = counts.get(status, 0) + n
+
+        with transaction.atomic(using=using):
+            for status, count in counts.items():
+                cls.objects.using(using).update_or_create(status=status, defaults={'count': count})
+
+        return counts
+
+    @classmethod
+    def callback_status_pre_save(cls, sender, instance, using=None, **kwargs):
+        """Determines the stored status of UserEnhancements, that were not
+        loaded from the database.
+
+        This function acts like a callback to a 'pre_save'-signal."""
+
+        if instance.pk is not None and getattr(instance, '_loaded_status', None) is None:
+            instance._loaded_status = (
+                sender.objects.using(using).filter(pk=instance.pk)
+                .values_list('email_verification_status', flat=True)
+                .first()
+            )
+
+    @classmethod
+    @timed('count_status')
+    def callback_status_post_save(cls, sender, instance, created, using=None, **kwargs):
+        """Counts the status transition of a saved UserEnhancement.
+
+        This function acts like a callback to a 'post_save'-signal."""
+
+        new_status = instance.email_verification_status
+        old_status = None if created else getattr(instance, '_loaded_status', None)
+
+        if old_status != new_status:
+            deltas = {new_status: 1}
+            if old_status is not None:
+                deltas[old_status] = -1
+            cls.adjust(deltas, using=using)
+
+        instance._loaded_status = new_status
+
+    @classmethod
+    def callback_status_post_delete(cls, sender, instance, using=None, **kwargs):
+        """Counts a deleted UserEnhancement.
+
+        This function acts like a callback to a 'post_delete'-signal."""
+
+        status = getattr(instance, '_loaded_status', None)
+        if status is None:
+            status = instance.email_verification_status
+
+        cls.adjust({status: -1}, using=using)
+
+
+class PendingSignupQuerySet(models.QuerySet):
+    """Selects PendingSignups by the age of their verification token."""
+
+    def get_cutoff(self):
+        """Returns the point in time, before which PendingSignups are expired."""
+
+        return timezone.now() - timedelta(seconds=get_app_settings().verification_token_max_age)
+
+    def expired(self):
+        """Returns the PendingSignups, whose verification token has expired."""
+
+        return self.filter(created_at__lt=self.get_cutoff())
+
+    def unexpired(self):
+        """Returns the PendingSignups, that may still be verified."""
+
+        return self.filter(created_at__gte=self.get_cutoff())
+
+
+class PendingSignup(models.Model):
+    """Stores a signup, that waits for the verification of its email address
+    (see 'DAE_DEFERRED_SIGNUP').
+
+    The User object (and its UserEnhancement) is only created, when the
+    verification token is accepted, so signups, that are never verified, do
+    not grow the user table. The password is stored already hashed; the
+    verification token is not stored, because it is a signature of the
+    username and is verified without a database lookup.
+
+    PendingSignups expire together with their verification token and are
+    deleted in bulk by the admin command 'purge-unverified'."""
+
+    # the values of the User's 'USERNAME_FIELD' and 'EMAIL_FIELD'
+    username = models.CharField(max_length=254, unique=True)
+    email = models.EmailField(max_length=254, db_index=True)
+
+    # the hashed password, just like 'AbstractBaseUser.password'
+    password = models.CharField(max_length=128)
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = PendingSignupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Pending Signup')
+        verbose_name_plural = _('Pending Signups')
+
+    def __str__(self):
+        """Provides the string representation of these objects."""
+        return "Pending signup of '{}'".format(self.username)   # pragma: nocover
+
+    @classmethod
+    def create_user(cls, username, using=None):
+        """Creates the active User object of the given PendingSignup and
+        deletes the PendingSignup.
+
+        If there is no PendingSignup (anymore), i.e. because a concurrent
+        request already created the User object, the existing User object is
+        returned. Raises the User model's DoesNotExist, if there is none."""
+
+        user_model = get_user_model()
+        user_query = {
+            user_model.USERNAME_FIELD: username,
+        }
+
+        with transaction.atomic(using=using):
+            try:
+                pending = cls.objects.using(using).select_for_update().get(username=username)
+            except cls.DoesNotExist:
+                return user_model.objects.using(using).get(**user_query)
+
+            user = user_model(**user_query)
+            setattr(user, user_model.EMAIL_FIELD, pending.email)
+            user.password = pending.password
+            user.is_active = True
+            # the address is verified right away, so no verification mail is
+            #   sent by the 'post_save'-callback
+            user._dae_skip_verification_mail = True
+            user.save(using=using)
+
+            pending.delete()
+
+        return user
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Provides the rate limits of the app's views, see 'DAE_RATE_LIMITS'.
+
+Logins, signups and email verifications hash passwords or verify signed
+tokens, so unlimited requests to these views (i.e. credential stuffing or
+guessing of tokens) burn CPU in every worker process. Their requests are
+counted per endpoint in fixed windows, using two kinds of buckets:
+    1) 'ip': the client's address, as given by 'REMOTE_ADDR'.
+    2) 'identity': the username of the login or signup or the account, that
+        the verification token was issued for.
+
+The counters are stored in Django's cache framework (the 'default' cache).
+'cache.add()' and 'cache.incr()' are atomic on shared backends (i.e. memcached
+or redis), so the limits are enforced across all processes. With Django's
+local-memory backend, the limits are applied per process.
+
+    - usage:
+        check_rate_limit('login', request.META.get('REMOTE_ADDR'), 'django')
+
+The check is cheap and has to be run, before any password is hashed or any
+token is verified. The app's views do this in 'RateLimitMixin.dispatch()'."""
+
+# Python imports
+import hashlib
+from time import time
+
+# Django imports
+from django.core.cache import cache
+from django.utils.encoding import force_bytes
+from django.utils.translation import ugettext_lazy as _
+
+# app imports
+from auth_enhanced.exceptions import AuthEnhancedRateLimitExceeded
+from auth_enhanced.settings import (
+    DAE_CONST_RATE_LIMIT_CACHE_PREFIX, get_app_settings,
+)
+
+
+def get_rate_limit_cache_key(endpoint, scope, value, window):
+    """Returns the cache key for the counter of the given bucket.
+
+    The value is hashed, so arbitrary user input results in valid keys."""
+
+    return '{}:{}:{}:{}:{}'.format(
+        DAE_CONST_RATE_LIMIT_CACHE_PREFIX,
+        endpoint,
+        scope,
+        hashlib.md5(force_bytes(value)).hexdigest(),
+        window
+    )
+
+
+def increment(key, timeout):
+    """Increments the counter of the given key atomically and returns its new
+    value."""
+
+    if cache.add(key, 1, timeout):
+        return 1
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # the counter expired between 'add()' and 'incr()'
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def check_rate_limit(endpoint, ip_address, identity=None):
+    """Counts a request to the given endpoint in all of its buckets.
+
+    Raises AuthEnhancedRateLimitExceeded, if any limit is exceeded. Buckets
+    without a value (i.e. a login without username) are skipped."""
+
+    limits = get_app_settings().rate_limits.get(endpoint)
+    if not limits:
+        return
+
+    values = {
+        'identity': identity.strip().lower() if identity else None,
+        'ip': ip_address,
+    }
+
+    now = time()
+    retry_after = 0
+    for scope, limit, period in limits:
+        if not values[scope]:
+            continue
+
+        window = int(now // period)
+        key = get_rate_limit_cache_key(endpoint, scope, values[scope], window)
+        # the counter is kept one second longer than its window, so it does
+        #   not expire, while the window is still active
+        if increment(key, period + 1) > limit:
+            retry_after = max(retry_after, int((window + 1) * period - now) + 1)
+
+    if retry_after:
+        raise AuthEnhancedRateLimitExceeded(
+            _("Too many requests. Please try again later."),
+            retry_after
+        )
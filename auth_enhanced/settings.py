@@ -5,12 +5,20 @@ Please note, that this file is more or less just a glossary of the settings,
 that can be used in a project's settings module.
 The 'injection' of these settings (meaning: providing their default value,
 if not provided through a project's settings module) is done in this app's
-'AppConfig'-class (see 'apps.py')."""
+'AppConfig'-class (see 'apps.py').
 
+Afterwards, the settings are parsed once into an immutable object, that is
+used by all of the app's modules (see 'get_app_settings()'). It is rebuilt,
+whenever a setting changes (i.e. by 'override_settings()' in tests)."""
+
+
+# Python imports
+from collections import namedtuple
 
 # Django imports
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.utils import six
 from django.utils.translation import ugettext_lazy as _  # noqa
 
 # app imports
@@ -46,11 +54,75 @@ DAE_CONST_MODE_MANUAL_ACTIVATION = 'manual'
 # the name of the login url, as specified in 'urls.py'
 DAE_CONST_RECOMMENDED_LOGIN_URL = 'auth_enhanced:login'
 
+# the number of admins, that may be notified of new signups, without
+#   triggering a performance warning (see 'checks.py')
+DAE_CONST_MAX_NOTIFICATION_RECIPIENTS = 5
+
+# the endpoints and the scopes of their buckets, that may be rate limited by
+#   'DAE_RATE_LIMITS' (see 'ratelimit.py')
+DAE_CONST_RATE_LIMIT_ENDPOINTS = ('login', 'signup', 'verification')
+DAE_CONST_RATE_LIMIT_SCOPES = ('identity', 'ip')
+
+# the request counters of the rate limits are stored in Django's cache with
+#   keys using this prefix
+DAE_CONST_RATE_LIMIT_CACHE_PREFIX = 'dae_ratelimit'
+
+# the signed cookie, that identifies a new account to
+#   'EmailVerificationStatusView', until its user is able to log in
+DAE_CONST_SIGNUP_COOKIE_NAME = 'dae_signup'
+
+# the cached status of an account, that has recently been changed, is read
+#   from the database for writes for this number of seconds, even if there is
+#   a 'DAE_READ_DATABASE'. This covers the lag of the replica.
+DAE_CONST_REPLICA_LAG_WINDOW = 60
+
+# this is the default value for DAE_STATUS_CACHE_TIMEOUT (in seconds)
+DAE_CONST_STATUS_CACHE_TIMEOUT = 300
+
 # this is the default value for DAE_VERIFICATION_TOKEN_MAX_AGE. It is directly
 #   given in seconds, because it is the fallback value used in AppConfig
 DAE_CONST_VERIFICATION_TOKEN_MAX_AGE = 3600
 
 
+# #############################################################################
+# APP SETTINGS
+# #############################################################################
+
+# the parsed and immutable app-specific settings
+#   Please note: The values are *not* validated here, because invalid values
+#   are reported by the app's checks (see 'checks.py'). Values, that can not be
+#   parsed, are replaced by their defaults.
+AppSettings = namedtuple('AppSettings', (
+    # the raw entries of 'DAE_ADMIN_SIGNUP_NOTIFICATION' as a tuple
+    'admin_signup_notification',
+    # (USERNAME, EMAIL_ADDRESS) of all admins, that are notified by mail
+    'admin_signup_notification_recipients',
+    'auto_login',
+    'deferred_signup',
+    'email_admin_notification_prefix',
+    'email_from_address',
+    'email_prefix',
+    'email_template_prefix',
+    'latency_histograms',
+    'login_require_verified_email',
+    'metrics_token',
+    # one of the 'DAE_CONST_MODE_*'-constants
+    'operation_mode',
+    # {ENDPOINT: ((SCOPE, LIMIT, PERIOD_IN_SECONDS), ...)}
+    'rate_limits',
+    'read_database',
+    'salt',
+    'status_cache_prefix',
+    'status_cache_timeout',
+    # always given in seconds
+    'verification_token_max_age',
+    'warmup_on_ready',
+))
+
+# holds the current AppSettings, see 'get_app_settings()'
+_app_settings = None
+
+
 # #############################################################################
 # FUNCTIONS
 # #############################################################################
@@ -71,6 +143,162 @@ def convert_to_seconds(time_str):
     return seconds
 
 
+def convert_rate(rate_str):
+    """Converts a rate like '10/m' or '100/15m' to a tuple of the number of
+    requests and the period in seconds."""
+
+    try:
+        limit, period = rate_str.split('/')
+        limit = int(limit)
+        multiplier = {'s': 1, 'm': 60, 'h': 3600, 'd': 3600 * 24}[period[-1:]]
+        period = int(period[:-1] or 1) * multiplier
+    except (AttributeError, KeyError, ValueError):
+        raise AuthEnhancedConversionError(_("Could not convert the parameter to a rate."))
+
+    if limit < 1 or period < 1:
+        raise AuthEnhancedConversionError(_("Could not convert the parameter to a rate."))
+
+    return limit, period
+
+
+def parse_rate_limits(value):
+    """Returns 'DAE_RATE_LIMITS' as dictionary, that maps the endpoints to
+    tuples of (SCOPE, LIMIT, PERIOD_IN_SECONDS).
+
+    Raises AuthEnhancedConversionError, if the value is invalid."""
+
+    if value is False:
+        return {}
+
+    try:
+        endpoints = value.items()
+    except AttributeError:
+        raise AuthEnhancedConversionError(_("'DAE_RATE_LIMITS' has to be a dictionary."))
+
+    rate_limits = {}
+    for endpoint, scopes in endpoints:
+        if endpoint not in DAE_CONST_RATE_LIMIT_ENDPOINTS:
+            raise AuthEnhancedConversionError(_("Unknown endpoint in 'DAE_RATE_LIMITS'."))
+        try:
+            scopes = sorted(scopes.items())
+        except AttributeError:
+            raise AuthEnhancedConversionError(_("'DAE_RATE_LIMITS' has to map endpoints to dictionaries."))
+        if any(scope not in DAE_CONST_RATE_LIMIT_SCOPES for scope, _rate in scopes):
+            raise AuthEnhancedConversionError(_("Unknown scope in 'DAE_RATE_LIMITS'."))
+        rate_limits[endpoint] = tuple((scope, ) + convert_rate(rate) for scope, rate in scopes)
+
+    return rate_limits
+
+
+def _parse_admin_signup_notification(value):
+    """Returns the entries of 'DAE_ADMIN_SIGNUP_NOTIFICATION' and the
+    recipients of notification mails as tuples."""
+
+    if not value:
+        return (), ()
+
+    try:
+        entries = tuple(tuple(entry) for entry in value)
+        recipients = tuple((entry[0], entry[1]) for entry in entries if 'mail' in entry[2])
+    except (IndexError, TypeError):
+        return (), ()
+
+    return entries, recipients
+
+
+def _parse_max_age(value):
+    """Returns 'DAE_VERIFICATION_TOKEN_MAX_AGE' in seconds."""
+
+    if isinstance(value, six.integer_types):
+        return value
+
+    try:
+        return convert_to_seconds(value)
+    except (AuthEnhancedConversionError, TypeError):
+        return DAE_CONST_VERIFICATION_TOKEN_MAX_AGE
+
+
+def _parse_rate_limits(value):
+    """Returns the parsed 'DAE_RATE_LIMITS' or no limits at all, if the
+    value is invalid."""
+
+    try:
+        return parse_rate_limits(value)
+    except AuthEnhancedConversionError:
+        return {}
+
+
+def refresh_app_settings():
+    """Parses the app-specific settings into a new AppSettings object.
+
+    This is called by the AppConfig's 'ready()' and whenever one of the
+    app-specific settings is changed."""
+
+    global _app_settings
+
+    entries, recipients = _parse_admin_signup_notification(settings.DAE_ADMIN_SIGNUP_NOTIFICATION)
+
+    _app_settings = AppSettings(
+        admin_signup_notification=entries,
+        admin_signup_notification_recipients=recipients,
+        auto_login=settings.DAE_AUTO_LOGIN,
+        deferred_signup=settings.DAE_DEFERRED_SIGNUP,
+        email_admin_notification_prefix=settings.DAE_EMAIL_ADMIN_NOTIFICATION_PREFIX,
+        email_from_address=settings.DAE_EMAIL_FROM_ADDRESS,
+        email_prefix=settings.DAE_EMAIL_PREFIX,
+        email_template_prefix=settings.DAE_EMAIL_TEMPLATE_PREFIX,
+        latency_histograms=settings.DAE_LATENCY_HISTOGRAMS,
+        login_require_verified_email=settings.DAE_LOGIN_REQUIRE_VERIFIED_EMAIL,
+        metrics_token=settings.DAE_METRICS_TOKEN,
+        operation_mode=settings.DAE_OPERATION_MODE,
+        rate_limits=_parse_rate_limits(settings.DAE_RATE_LIMITS),
+        read_database=settings.DAE_READ_DATABASE,
+        salt=settings.DAE_SALT,
+        status_cache_prefix=settings.DAE_STATUS_CACHE_PREFIX,
+        status_cache_timeout=settings.DAE_STATUS_CACHE_TIMEOUT,
+        verification_token_max_age=_parse_max_age(settings.DAE_VERIFICATION_TOKEN_MAX_AGE),
+        warmup_on_ready=settings.DAE_WARMUP_ON_READY,
+    )
+
+    return _app_settings
+
+
+def get_app_settings():
+    """Returns the current AppSettings.
+
+    The settings are parsed on the first call, if the AppConfig's 'ready()'
+    did not already do so."""
+
+    if _app_settings is None:
+        return refresh_app_settings()
+
+    return _app_settings
+
+
+def get_mail_template_names():
+    """Returns the names of the mail templates, that are actually sent with
+    the current AppSettings (without prefix and extension)."""
+
+    app_settings = get_app_settings()
+
+    template_names = []
+    if app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION:
+        template_names.append('user_email_verification')
+    if app_settings.admin_signup_notification_recipients:
+        template_names.append('admin_signup_notification')
+
+    return template_names
+
+
+def callback_refresh_app_settings(setting, **kwargs):
+    """Rebuilds the AppSettings, if an app-specific setting was changed.
+
+    This function acts like a callback to the 'setting_changed'-signal."""
+
+    if setting.startswith('DAE_'):
+        refresh_app_settings()
+
+
 def inject_setting(name, default_value):
     """Injects an app-specific setting into Django's settings module.
 
@@ -107,6 +335,22 @@ def set_app_default_settings():
     #               notification methods. As of now, only 'mail' is supported
     inject_setting('DAE_ADMIN_SIGNUP_NOTIFICATION', False)
 
+    # ### DAE_AUTO_LOGIN
+    # This setting controls, if an authenticated session is started directly
+    #   after a successful signup (only 'DAE_CONST_MODE_AUTO_ACTIVATION') and
+    #   after the first successful verification of an email address, instead
+    #   of redirecting to the login page.
+    inject_setting('DAE_AUTO_LOGIN', False)
+
+    # ### DAE_DEFERRED_SIGNUP
+    # This setting controls, if signups are stored as 'PendingSignup' until
+    #   their email address is verified. The User object is only created by
+    #   the verification, so signups, that are never verified, do not grow the
+    #   user table.
+    #   Please note: This is only applied, if 'DAE_OPERATION_MODE' is set to
+    #   'DAE_CONST_MODE_EMAIL_ACTIVATION'.
+    inject_setting('DAE_DEFERRED_SIGNUP', False)
+
     # ### DAE_EMAIL_ADMIN_NOTIFICATION_PREFIX
     # Mails sent to superusers by django-auth_enhanced will contain a subject
     #   with this customizable prefix.
@@ -131,6 +375,29 @@ def set_app_default_settings():
     # Furthermore, it *must not* include a trailing slash.
     inject_setting('DAE_EMAIL_TEMPLATE_PREFIX', DAE_CONST_EMAIL_TEMPLATE_PREFIX)
 
+    # ### DAE_LATENCY_HISTOGRAMS
+    # This setting controls, if the durations of the app's hot paths (see
+    #   'instrumentation.py') are collected in an in-process histogram
+    #   registry, that may be exported in Prometheus' text format.
+    inject_setting('DAE_LATENCY_HISTOGRAMS', False)
+
+    # ### DAE_LOGIN_REQUIRE_VERIFIED_EMAIL
+    # This setting controls, if 'auth_enhanced.backends.AuthEnhancedBackend'
+    #   rejects logins of accounts with unverified email addresses.
+    #   Please note: This is only applied, if 'DAE_OPERATION_MODE' is set to
+    #   'DAE_CONST_MODE_EMAIL_ACTIVATION'.
+    inject_setting('DAE_LOGIN_REQUIRE_VERIFIED_EMAIL', False)
+
+    # ### DAE_METRICS_TOKEN
+    # This setting provides a shared secret, that grants access to the latency
+    #   histograms (see 'DAE_LATENCY_HISTOGRAMS'), if it is sent as bearer
+    #   token in the 'Authorization'-header, i.e. by Prometheus' scraper.
+    # Possible values:
+    #   None
+    #       - only staff members may access the histograms (default value)
+    #   a non-empty string
+    inject_setting('DAE_METRICS_TOKEN', None)
+
     # ### DAE_OPERATION_MODE
     # This setting determines the way newly registered are handled.
     # Possible values:
@@ -145,14 +412,58 @@ def set_app_default_settings():
     #           relies on manual activation by a superuser
     inject_setting('DAE_OPERATION_MODE', DAE_CONST_MODE_AUTO_ACTIVATION)
 
+    # ### DAE_RATE_LIMITS
+    # This setting limits the number of requests to the app's views, that
+    #   hash passwords or verify tokens (see 'ratelimit.py'). Requests over
+    #   the limit are rejected with status 429.
+    # Possible values:
+    #   False
+    #       - no limits are applied (default value)
+    #   a dictionary, mapping endpoints to their limits of the following form
+    #       - {ENDPOINT: {SCOPE: RATE, ...}, ...},
+    #       - {'login': {'ip': '30/m', 'identity': '10/15m'}},
+    #           ENDPOINT is one of 'login', 'signup' or 'verification'
+    #           SCOPE is either 'ip' (the client's address) or 'identity' (the
+    #               username or the account of the verification token)
+    #           RATE is the number of requests per period, given in seconds,
+    #               minutes, hours or days (i.e. '5/s', '10/m', '100/15m')
+    inject_setting('DAE_RATE_LIMITS', False)
+
+    # ### DAE_READ_DATABASE
+    # The database alias, that read-only reports and checks of the
+    #   'authenhanced' command are run against, i.e. a read replica.
+    #   Reads, that directly precede or follow a write, always use the
+    #   database for writes, to avoid reading stale data from a lagging replica.
+    # Possible values:
+    #   None
+    #       - reads are routed by the project's database routers (default value)
+    #   an alias of the project's 'DATABASES'-setting
+    inject_setting('DAE_READ_DATABASE', None)
+
     # ### DAE_SALT
     # This salt is used to keep signing processes thoughout your project
     #   nicely seperated. See https://docs.djangoproject.com/en/dev/topics/signing/#using-the-salt-argument
     inject_setting('DAE_SALT', 'django-auth_enhanced')
 
+    # ### DAE_STATUS_CACHE_PREFIX
+    # The cached email verification status of users (see 'cache.py') is
+    #   stored in Django's cache with keys using this prefix.
+    inject_setting('DAE_STATUS_CACHE_PREFIX', 'dae_status')
+
+    # ### DAE_STATUS_CACHE_TIMEOUT
+    # This setting determines, how long the email verification status of a
+    #   user is kept in Django's cache (in seconds).
+    inject_setting('DAE_STATUS_CACHE_TIMEOUT', DAE_CONST_STATUS_CACHE_TIMEOUT)
+
     # ### DAE_VERIFICATION_TOKEN_MAX_AGE
     # This setting determines, how long any verification token is considered
     #   valid.
     # Possible values:
     #   - an integer, specifying the maximum age of the token in seconds
     inject_setting('DAE_VERIFICATION_TOKEN_MAX_AGE', DAE_CONST_VERIFICATION_TOKEN_MAX_AGE)
+
+    # ### DAE_WARMUP_ON_READY
+    # This setting controls, if the app's warmup routine (see 'warmup.py') is
+    #   run, when the app is loaded. This is useful for pre-forking servers,
+    #   that load the project before forking their workers.
+    inject_setting('DAE_WARMUP_ON_READY', False)
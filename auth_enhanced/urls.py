@@ -10,10 +10,13 @@ may have to adjust your imports accordingly."""
 
 # Django imports
 from django.conf.urls import url
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LogoutView
 
 # app imports
-from auth_enhanced.views import EmailVerificationView, SignupView
+from auth_enhanced.views import (
+    EmailVerificationStatusView, EmailVerificationView, LoginView, MetricsView,
+    SignupView,
+)
 
 # from django.urls import register_converter
 
@@ -41,10 +44,14 @@ urlpatterns = [
     url(r'^login/$', LoginView.as_view(template_name='auth_enhanced/login.html'), name='login'),
     url(r'^logout/$', LogoutView.as_view(template_name='auth_enhanced/logout.html'), name='logout'),
     url(r'^signup/$', SignupView.as_view(), name='signup'),
+    # the verification status of the current user, may be polled by frontends
+    url(r'^verify-email/status/$', EmailVerificationStatusView.as_view(), name='email-verification-status'),
     # 'email-verification' may be called with or without an url parameter
     url(
         r'^verify-email(?:/(?P<verification_token>[A-z0-9-_=:]+))?/$',
         EmailVerificationView.as_view(),
         name='email-verification'
     ),
+    # the latency histograms, see 'DAE_LATENCY_HISTOGRAMS'
+    url(r'^metrics/$', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,18 +1,102 @@
 # -*- coding: utf-8 -*-
 
+# Python imports
+import hmac
+from calendar import timegm
+
 # Django imports
+from django.conf import settings
+from django.contrib.auth import (
+    get_user_model, load_backend, login, views as auth_views,
+)
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, quote_etag
+from django.views.generic.base import View
 from django.views.generic.edit import CreateView, FormView
 
 # app imports
+from auth_enhanced.exceptions import AuthEnhancedRateLimitExceeded
 from auth_enhanced.forms import EmailVerificationForm, SignupForm
+from auth_enhanced.instrumentation import PROMETHEUS_CONTENT_TYPE, registry
+from auth_enhanced.models import UserEnhancement
+from auth_enhanced.ratelimit import check_rate_limit
+from auth_enhanced.settings import (
+    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
+    DAE_CONST_SIGNUP_COOKIE_NAME, get_app_settings,
+)
+
+# the names of the verification status, as returned by
+#   'EmailVerificationStatusView'
+STATUS_NAMES = {
+    UserEnhancement.EMAIL_VERIFICATION_COMPLETED: 'completed',
+    UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS: 'in-progress',
+    UserEnhancement.EMAIL_VERIFICATION_FAILED: 'failed',
+}
+
+
+def login_user(request, user):
+    """Starts an authenticated session for the given user, without checking
+    its password (see 'DAE_AUTO_LOGIN').
+
+    The session is bound to the first of the project's authentication
+    backends, that accepts the user. Returns False, if no backend does."""
+
+    for backend_path in settings.AUTHENTICATION_BACKENDS:
+        user_can_authenticate = getattr(load_backend(backend_path), 'user_can_authenticate', None)
+        if user_can_authenticate is None or user_can_authenticate(user):
+            login(request, user, backend=backend_path)
+            return True
+
+    return False
+
+
+class RateLimitMixin(object):
+    """Rejects requests with status 429, if they exceed the rate limits of the
+    view's endpoint (see 'DAE_RATE_LIMITS' and 'ratelimit.py').
+
+    The limits are checked in 'dispatch()', before any form is processed, so
+    rejected requests do not hash passwords or verify tokens."""
+
+    # one of 'DAE_CONST_RATE_LIMIT_ENDPOINTS'
+    rate_limit_endpoint = None
+
+    def is_rate_limited(self, request):
+        """Returns True, if the request is counted. By default, only POST
+        requests are counted."""
+
+        return request.method == 'POST'
+
+    def get_rate_limit_identity(self, request):
+        """Returns the value of the request's 'identity'-bucket or None."""
+
+        return None
 
+    def dispatch(self, request, *args, **kwargs):
+        if self.is_rate_limited(request):
+            try:
+                check_rate_limit(
+                    self.rate_limit_endpoint,
+                    request.META.get('REMOTE_ADDR'),
+                    self.get_rate_limit_identity(request)
+                )
+            except AuthEnhancedRateLimitExceeded as e:
+                response = HttpResponse(str(e), status=429, content_type='text/plain; charset=utf-8')
+                response['Retry-After'] = str(e.retry_after)
+                return response
 
-class EmailVerificationView(FormView):
+        return super(RateLimitMixin, self).dispatch(request, *args, **kwargs)
+
+
+class EmailVerificationView(RateLimitMixin, FormView):
     """Provides the frontend to verify user's email addresses."""
 
     form_class = EmailVerificationForm
+    rate_limit_endpoint = 'verification'
     success_url = reverse_lazy('auth_enhanced:login')
     template_name = 'auth_enhanced/email_verification.html'
 
@@ -21,7 +105,15 @@ class EmailVerificationView(FormView):
         activation of the user."""
 
         # actually activate the user by using a form-method
-        form.activate_user()
+        user = form.activate_user()
+        if user is None:
+            # the account of the token does not exist (anymore)
+            return self.form_invalid(form)
+
+        # tokens stay valid until they expire, so only their first use starts
+        #   a session (see 'DAE_AUTO_LOGIN')
+        if get_app_settings().auto_login and not form.already_verified and login_user(self.request, user):
+            return redirect(settings.LOGIN_REDIRECT_URL)
 
         return super(EmailVerificationView, self).form_valid(form)
 
@@ -51,10 +143,164 @@ class EmailVerificationView(FormView):
             # this will take care of showing the form
             return super(EmailVerificationView, self).get(request, *args, **kwargs)
 
+    def is_rate_limited(self, request):
+        """Tokens are verified on POST and on GET with a token in the url."""
+
+        return request.method == 'POST' or bool(self.kwargs.get('verification_token'))
+
+    def get_rate_limit_identity(self, request):
+        """Returns the signed username of the token, without verifying the
+        signature. Guessing the token of one account is limited this way."""
+
+        token = self.kwargs.get('verification_token') or request.POST.get('token', '')
+        # a token looks like 'USERNAME:TIMESTAMP:SIGNATURE'
+        return token.rsplit(':', 2)[0] if token.count(':') >= 2 else None
+
+
+class LoginView(RateLimitMixin, auth_views.LoginView):
+    """Django's LoginView with the rate limits of the endpoint 'login'."""
 
-class SignupView(CreateView):
+    rate_limit_endpoint = 'login'
+
+    def get_rate_limit_identity(self, request):
+        """Returns the submitted username."""
+
+        return request.POST.get('username')
+
+
+class SignupView(RateLimitMixin, CreateView):
     """This class based view handles the registration of new users."""
 
     form_class = SignupForm
+    rate_limit_endpoint = 'signup'
     success_url = reverse_lazy('auth_enhanced:login')
     template_name = 'auth_enhanced/signup.html'
+
+    def get_rate_limit_identity(self, request):
+        """Returns the submitted username."""
+
+        return request.POST.get(get_user_model().USERNAME_FIELD)
+
+    def form_valid(self, form):
+        """Saves the new user and, if 'DAE_AUTO_LOGIN' is set, starts its
+        session right away, so the password is not hashed again by a login.
+
+        Accounts, that have to verify their email address, get a signed cookie
+        instead, so their status may be polled (see
+        'EmailVerificationStatusView')."""
+
+        response = super(SignupView, self).form_valid(form)
+
+        app_settings = get_app_settings()
+        # deferred signups do not have an account to poll yet
+        if app_settings.operation_mode == DAE_CONST_MODE_EMAIL_ACTIVATION and self.object.pk is not None:
+            response.set_signed_cookie(
+                DAE_CONST_SIGNUP_COOKIE_NAME,
+                self.object.pk,
+                salt=app_settings.salt,
+                max_age=app_settings.verification_token_max_age,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+
+        if (
+            app_settings.auto_login and
+            app_settings.operation_mode == DAE_CONST_MODE_AUTO_ACTIVATION and
+            self.object.is_active and
+            login_user(self.request, self.object)
+        ):
+            return redirect(settings.LOGIN_REDIRECT_URL)
+
+        return response
+
+
+class EmailVerificationStatusView(View):
+    """Returns the email verification status of the current user as JSON, so
+    a frontend may poll it, while the user is waiting for the verification
+    mail.
+
+    The current user is either the logged in user or the account, that was
+    just created by 'SignupView' (identified by a signed cookie). The status
+    is read through the app's cache and the response carries an 'ETag' and a
+    'Last-Modified' header, so unchanged states are answered with 304."""
+
+    def get_user_id(self, request):
+        """Returns the id of the current user or None."""
+
+        if request.user.is_authenticated:
+            return request.user.pk
+
+        app_settings = get_app_settings()
+        return request.get_signed_cookie(
+            DAE_CONST_SIGNUP_COOKIE_NAME,
+            default=None,
+            salt=app_settings.salt,
+            max_age=app_settings.verification_token_max_age
+        )
+
+    def get(self, request, *args, **kwargs):
+        """Returns the status or 304, if it did not change."""
+
+        user_id = self.get_user_id(request)
+        status_info = UserEnhancement.get_status_info_cached(user_id) if user_id is not None else None
+        if status_info is None:
+            raise Http404
+
+        status, changed_at = status_info
+        last_modified = timegm(changed_at.utctimetuple()) if changed_at else None
+        etag = quote_etag('{}-{}-{}'.format(user_id, status, last_modified or 0))
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = JsonResponse({
+                'email_verification_status': STATUS_NAMES[status],
+                'email_is_verified': status == UserEnhancement.EMAIL_VERIFICATION_COMPLETED,
+            })
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # the status belongs to a single user and has to be revalidated on
+        #   every poll
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+
+class MetricsView(View):
+    """Exports the latency histograms of the current process (see
+    'instrumentation.py') in Prometheus' text format.
+
+    The view is only available, if 'DAE_LATENCY_HISTOGRAMS' is True, and only
+    to active staff members or to clients, that present 'DAE_METRICS_TOKEN' as
+    bearer token (i.e. Prometheus' scraper). The remote address is not
+    considered, because behind a reverse proxy every request seems to come
+    from the local host."""
+
+    def get(self, request, *args, **kwargs):
+        """Returns the rendered histograms."""
+
+        if not get_app_settings().latency_histograms:
+            raise Http404
+
+        if not (self.has_valid_token(request) or (request.user.is_active and request.user.is_staff)):
+            raise PermissionDenied
+
+        return HttpResponse(registry.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @staticmethod
+    def has_valid_token(request):
+        """Returns True, if the request's 'Authorization'-header provides
+        'DAE_METRICS_TOKEN' as bearer token."""
+
+        token = get_app_settings().metrics_token
+        if not token:
+            return False
+
+        scheme, _space, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() != 'bearer':
+            return False
+
+        # the comparison takes constant time, so the token can not be guessed
+        #   by timing
+        return hmac.compare_digest(force_bytes(credentials.strip()), force_bytes(token))
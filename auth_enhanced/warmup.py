@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Provides the warmup routine of the app.
+
+Several things, that are required to sign up a new user, are loaded by Django
+and by this app on their first usage: the password validators (including the
+list of common passwords), the password hasher, the mail templates, the URL
+resolvers and the signer of verification tokens. Without a warmup, every
+worker process of a pre-forking server (i.e. gunicorn) pays for this on its
+first signup.
+
+Running 'warmup()' in the master process, before the workers are forked,
+loads all of these just once. The workers share the memory by copy-on-write.
+
+    - usage (i.e. in the project's 'wsgi.py', with gunicorn's '--preload'):
+        application = get_wsgi_application()
+
+        from auth_enhanced.warmup import warmup
+        warmup()
+
+The routine may also be run by the app's 'ready()' (see the setting
+'DAE_WARMUP_ON_READY') and by the management command 'authenhanced warmup'."""
+
+# Python imports
+import time
+from collections import OrderedDict
+
+# Django imports
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.password_validation import (
+    get_default_password_validators,
+)
+from django.template.exceptions import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import NoReverseMatch, reverse
+
+# app imports
+from auth_enhanced.settings import get_app_settings, get_mail_template_names
+
+
+def warmup_password_validators():
+    """Instantiates the password validators, i.e. the 'CommonPasswordValidator'
+    reads its list of passwords."""
+
+    get_default_password_validators()
+
+
+def warmup_password_hasher():
+    """Loads the default password hasher."""
+
+    get_hasher()
+
+
+def warmup_mail_templates():
+    """Imports the mail machinery and compiles the templates of the mails,
+    that are sent with the current configuration.
+
+    Raises TemplateDoesNotExist, if a required template is missing.
+
+    The compiled templates are only kept, if the project uses Django's cached
+    template loader (the default with 'DEBUG = False')."""
+
+    # imports Django's mail machinery as well
+    import auth_enhanced.email  # noqa
+
+    template_prefix = get_app_settings().email_template_prefix
+    for template_name in get_mail_template_names():
+        # the text templates are required (see 'AuthEnhancedEmail'), so
+        #   missing ones are reported
+        get_template('{}/{}.txt'.format(template_prefix, template_name))
+        try:
+            get_template('{}/{}.html'.format(template_prefix, template_name))
+        except TemplateDoesNotExist:
+            # the html templates are optional
+            pass
+
+
+def warmup_urls():
+    """Populates the URL resolvers by reversing the URLs, that are used in
+    the mail templates.
+
+    Please note, that this loads the project's URLconf."""
+
+    user_meta = get_user_model()._meta
+    for name, args in (
+        ('auth_enhanced:email-verification', ()),
+        ('admin:{}_{}_change'.format(user_meta.app_label, user_meta.model_name), (1, )),
+    ):
+        try:
+            reverse(name, args=args)
+        except NoReverseMatch:
+            # the project may not include the URLs
+            pass
+
+
+def warmup_signer():
+    """Builds the signer of verification tokens and signs a value once."""
+
+    from auth_enhanced.crypto import EnhancedCrypto
+
+    EnhancedCrypto().signer.sign('warmup')
+
+
+# all steps of the warmup, in the order they are run
+WARMUP_STEPS = OrderedDict((
+    ('password-validators', warmup_password_validators),
+    ('password-hasher', warmup_password_hasher),
+    ('mail-templates', warmup_mail_templates),
+    ('urls', warmup_urls),
+    ('signer', warmup_signer),
+))
+
+# the steps, that may be run by 'ready()'
+#   The URLconf must not be loaded, before all apps are ready, because the
+#   admin site only knows about all registered models afterwards.
+READY_STEPS = ('password-validators', 'password-hasher', 'mail-templates', 'signer')
+
+
+def warmup(steps=None):
+    """Runs the given steps of the warmup (default: all steps).
+
+    Returns an OrderedDict of the steps' names and their durations (in
+    seconds)."""
+
+    durations = OrderedDict()
+    for name in steps or WARMUP_STEPS:
+        start_time = time.time()
+        WARMUP_STEPS[name]()
+        durations[name] = time.time() - start_time
+
+    return durations
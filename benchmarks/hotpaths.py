@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measures the hot paths of 'django-auth_enhanced'.
+
+The benchmarks run against a fresh SQLite database (in memory by default) and
+Django's locmem mail backend, using the given settings module for everything
+else:
+    - signup: 'SignupForm' validation and 'save()', including the creation of
+        the UserEnhancement
+    - verification-mail: rendering, signing and sending of verification mails
+    - verification: 'EmailVerificationForm' validation and 'activate_user()'
+    - admin-fanout[N]: the notification of N admins about a single signup
+    - command[...]: the runtime of 'authenhanced' subcommands on a table of
+        '--users' accounts
+    - startup: the time until all apps are ready (see 'startup.py')
+
+Every benchmark is repeated and the median is reported. The results are
+written as JSON and may be compared against a stored baseline. The script exits
+with a non-zero code, if a benchmark is slower than its baseline by more than
+the given tolerance.
+
+Please note, that the password hasher is replaced by Django's fastest one by
+default, so the numbers reflect the app's own overhead. Use '--password-hasher'
+to measure with a production hasher.
+
+    - usage (from the project's root directory):
+        python benchmarks/hotpaths.py [--users 1000000] [--output results.json]
+        python benchmarks/hotpaths.py --baseline benchmarks/baseline.json
+        python benchmarks/hotpaths.py --output benchmarks/baseline.json"""
+
+# Python imports
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+# the project's root directory, that has to be on the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+# app imports
+from startup import measure_ready_time  # noqa: E402
+
+# the names of all benchmarks, in the order they are run
+BENCHMARKS = ('signup', 'verification-mail', 'verification', 'admin-fanout', 'command', 'startup')
+
+# the subcommands of 'authenhanced', that are measured on the seeded table
+COMMANDS = (
+    ('stats', ()),
+    ('stats --recount', ('--recount', )),
+    ('unique-email', ()),
+)
+
+# usernames have to be unique across all benchmarks
+_user_counter = [0]
+
+
+def setup_django(settings_module, database, password_hasher):
+    """Configures Django to run against SQLite and the locmem mail backend
+    and creates the database tables."""
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+
+    import django
+    from django.conf import settings
+
+    settings.DEBUG = False
+    settings.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': database,
+        },
+    }
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.PASSWORD_HASHERS = [password_hasher]
+
+    # only the app's own callback is connected on signup, the mail callbacks
+    #   are measured separately
+    settings.DAE_OPERATION_MODE = 'auto'
+    settings.DAE_ADMIN_SIGNUP_NOTIFICATION = False
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0, interactive=False)
+
+
+def next_username():
+    """Returns an unused username."""
+
+    _user_counter[0] += 1
+    return 'bench-user-{}'.format(_user_counter[0])
+
+
+def create_users(count, chunk_size=10000):
+    """Creates 'count' users with unusable passwords in bulk and returns their
+    primary keys."""
+
+    from django.contrib.auth import get_user_model
+
+    user_model = get_user_model()
+    pks = []
+    for chunk_start in range(0, count, chunk_size):
+        users = []
+        for _i in range(min(chunk_size, count - chunk_start)):
+            username = next_username()
+            users.append(user_model(
+                username=username, email='{}@example.com'.format(username), password='!', is_active=False
+            ))
+        user_model.objects.bulk_create(users)
+        pks.extend(
+            user_model.objects.filter(username__in=[u.username for u in users]).values_list('pk', flat=True)
+        )
+
+    return pks
+
+
+def median_duration(run, repeat):
+    """Runs 'run()' 'repeat' times and returns the median of its durations.
+
+    'run()' has to return the duration of the actual operation, so it is able
+    to exclude its own preparations."""
+
+    durations = sorted(run() for _i in range(repeat))
+
+    return durations[len(durations) // 2]
+
+
+def bench_signup(size, repeat):
+    """Signs up 'size' users by 'SignupForm'."""
+
+    from auth_enhanced.forms import SignupForm
+
+    def run():
+        data = [next_username() for _i in range(size)]
+        start_time = time.time()
+        for username in data:
+            form = SignupForm(data={'username': username, 'password1': 'Bench-1234', 'password2': 'Bench-1234'})
+            if not form.is_valid():
+                raise RuntimeError(form.errors)
+            form.save()
+        return time.time() - start_time
+
+    return size, median_duration(run, repeat)
+
+
+def bench_verification_mail(size, repeat):
+    """Sends the verification mail to 'size' users."""
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+
+    from auth_enhanced.email import callback_user_signup_email_verification
+    from auth_enhanced.management.commands.authenhanced import backfill_enhancements
+
+    user_model = get_user_model()
+
+    def run():
+        users = list(user_model.objects.filter(pk__in=create_users(size)))
+        list(backfill_enhancements())
+        mail.outbox = []
+        start_time = time.time()
+        for user in users:
+            callback_user_signup_email_verification(user_model, instance=user, created=True)
+        return time.time() - start_time
+
+    return size, median_duration(run, repeat)
+
+
+def bench_verification(size, repeat):
+    """Verifies the email addresses of 'size' users by their tokens."""
+
+    from django.contrib.auth import get_user_model
+
+    from auth_enhanced.crypto import EnhancedCrypto
+    from auth_enhanced.forms import EmailVerificationForm
+    from auth_enhanced.management.commands.authenhanced import backfill_enhancements
+
+    user_model = get_user_model()
+
+    def run():
+        crypto = EnhancedCrypto()
+        tokens = [
+            crypto.get_verification_token(user)
+            for user in user_model.objects.filter(pk__in=create_users(size))
+        ]
+        list(backfill_enhancements())
+        start_time = time.time()
+        for token in tokens:
+            form = EmailVerificationForm(data={'token': token})
+            if not form.is_valid():
+                raise RuntimeError(form.errors)
+            form.activate_user()
+        return time.time() - start_time
+
+    return size, median_duration(run, repeat)
+
+
+def bench_admin_fanout(recipients, repeat):
+    """Notifies 'recipients' admins about a single signup."""
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+    from django.test import override_settings
+
+    from auth_enhanced.email import callback_admin_information_new_signup
+
+    user_model = get_user_model()
+    notification = tuple(
+        ('admin-{}'.format(i), 'admin-{}@example.com'.format(i), ('mail', )) for i in range(recipients)
+    )
+
+    def run():
+        user = user_model.objects.get(pk=create_users(1)[0])
+        mail.outbox = []
+        with override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=notification):
+            start_time = time.time()
+            callback_admin_information_new_signup(user_model, instance=user, created=True)
+            return time.time() - start_time
+
+    return 1, median_duration(run, repeat)
+
+
+def bench_commands(users, repeat):
+    """Seeds 'users' accounts and measures the subcommands of 'authenhanced'.
+
+    Returns a list of (name, operations, duration)."""
+
+    from django.core.management import call_command
+    from django.utils.six import StringIO
+
+    from auth_enhanced.management.commands.authenhanced import backfill_enhancements
+
+    results = []
+
+    create_users(users)
+    start_time = time.time()
+    list(backfill_enhancements(chunk_size=10000))
+    results.append(('backfill-enhancements', users, time.time() - start_time))
+
+    for name, args in COMMANDS:
+        def run():
+            start_time = time.time()
+            call_command('authenhanced', name.split()[0], *args, stdout=StringIO(), stderr=StringIO())
+            return time.time() - start_time
+
+        results.append((name, 1, median_duration(run, repeat)))
+
+    return results
+
+
+def result(operations, duration):
+    """Returns the JSON representation of a single result."""
+
+    return OrderedDict((
+        ('operations', operations),
+        ('seconds', duration),
+        ('seconds_per_operation', duration / operations),
+        ('operations_per_second', operations / duration if duration else None),
+    ))
+
+
+def run_benchmarks(options):
+    """Runs the selected benchmarks and returns their results as OrderedDict."""
+
+    results = OrderedDict()
+
+    if 'signup' in options.benchmarks:
+        results['signup'] = result(*bench_signup(options.signups, options.repeat))
+
+    if 'verification-mail' in options.benchmarks:
+        results['verification-mail'] = result(*bench_verification_mail(options.verifications, options.repeat))
+
+    if 'verification' in options.benchmarks:
+        results['verification'] = result(*bench_verification(options.verifications, options.repeat))
+
+    if 'admin-fanout' in options.benchmarks:
+        for recipients in options.recipients:
+            results['admin-fanout[{}]'.format(recipients)] = result(
+                *bench_admin_fanout(recipients, options.repeat)
+            )
+
+    if 'command' in options.benchmarks:
+        for name, operations, duration in bench_commands(options.users, options.repeat):
+            results['command[{}]'.format(name)] = result(operations, duration)
+
+    if 'startup' in options.benchmarks:
+        results['startup'] = result(1, measure_ready_time(options.settings, options.repeat))
+
+    return results
+
+
+def get_meta(options):
+    """Returns the environment and the sizes of the benchmarks."""
+
+    import django
+
+    return OrderedDict((
+        ('python', platform.python_version()),
+        ('django', django.get_version()),
+        ('platform', platform.platform()),
+        ('password_hasher', options.password_hasher),
+        ('repeat', options.repeat),
+        ('signups', options.signups),
+        ('verifications', options.verifications),
+        ('recipients', options.recipients),
+        ('users', options.users),
+    ))
+
+
+def compare(results, baseline, tolerance):
+    """Compares the results to the baseline.
+
+    Returns a list of (name, ratio, is_regression), where 'ratio' is the time
+    per operation relative to the baseline."""
+
+    comparison = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference['seconds_per_operation']:
+            continue
+        ratio = current['seconds_per_operation'] / reference['seconds_per_operation']
+        comparison.append((name, ratio, ratio > 1 + tolerance))
+
+    return comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the hot paths of django-auth_enhanced')
+    parser.add_argument(
+        '--settings', default='tests.utils.settings_dev',
+        help="Python path to the settings module (default: 'tests.utils.settings_dev')."
+    )
+    parser.add_argument(
+        '--database', default=':memory:',
+        help="The SQLite database file. It must not exist yet (default: in memory)."
+    )
+    parser.add_argument(
+        '--password-hasher', default='django.contrib.auth.hashers.MD5PasswordHasher',
+        help="The password hasher, that is used during signup (default: MD5PasswordHasher)."
+    )
+    parser.add_argument(
+        '--benchmark', action='append', dest='benchmarks', choices=BENCHMARKS,
+        help="Run only the given benchmark. Can be used multiple times (default: all)."
+    )
+    parser.add_argument(
+        '--repeat', default=5, type=int,
+        help="The number of runs of every benchmark (default: 5)."
+    )
+    parser.add_argument(
+        '--signups', default=200, type=int,
+        help="The number of signups per run (default: 200)."
+    )
+    parser.add_argument(
+        '--verifications', default=200, type=int,
+        help="The number of verification mails and verifications per run (default: 200)."
+    )
+    parser.add_argument(
+        '--recipients', default=[1, 10, 100], type=int, nargs='+',
+        help="The numbers of notified admins (default: 1 10 100)."
+    )
+    parser.add_argument(
+        '--users', default=10000, type=int,
+        help="The number of accounts, the subcommands are run on (default: 10000)."
+    )
+    parser.add_argument(
+        '--output',
+        help="Write the results to this file instead of stdout. Use this to store a baseline."
+    )
+    parser.add_argument(
+        '--baseline',
+        help="Compare the results to this file, as written by '--output'."
+    )
+    parser.add_argument(
+        '--tolerance', default=0.3, type=float,
+        help="The accepted slowdown relative to the baseline (default: 0.3, meaning 30%%)."
+    )
+    options = parser.parse_args()
+    options.benchmarks = options.benchmarks or BENCHMARKS
+
+    setup_django(options.settings, options.database, options.password_hasher)
+
+    report = OrderedDict((
+        ('meta', get_meta(options)),
+        ('results', run_benchmarks(options)),
+    ))
+
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+            output_file.write('\n')
+    else:
+        print(json.dumps(report, indent=2))
+
+    for name, values in report['results'].items():
+        sys.stderr.write('{}: {:.3f}ms per operation\n'.format(name, values['seconds_per_operation'] * 1000))
+
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if baseline['meta'] != report['meta']:
+            sys.stderr.write('The baseline was measured with a different environment or different sizes!\n')
+
+        regressions = False
+        for name, ratio, is_regression in compare(report['results'], baseline['results'], options.tolerance):
+            sys.stderr.write('{}: {:+.1f}%{}\n'.format(
+                name, (ratio - 1) * 100, ' REGRESSION' if is_regression else ''
+            ))
+            regressions = regressions or is_regression
+
+        if regressions:
+            sys.exit(1)
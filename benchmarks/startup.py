@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measures the startup cost of 'django-auth_enhanced'.
+
+Every measurement is taken in a fresh interpreter, using the given settings
+module:
+    - the time until all apps are ready (the median of several runs)
+    - the cumulative import time of the app's modules, that are imported
+        by its AppConfig ('-X importtime', Python 3.7+ only)
+    - modules, that must only be imported on first use (see 'LAZY_MODULES')
+
+The script exits with a non-zero code, if one of the lazy modules was
+imported during startup.
+
+    - usage (from the project's root directory):
+        python benchmarks/startup.py [--settings tests.utils.settings_dev] [--repeat 5]"""
+
+# Python imports
+import argparse
+import os
+import subprocess
+import sys
+
+# the project's root directory, that has to be on the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# these modules pull in Django's mail and template machinery, so they are
+#   only imported, when a mail is actually sent
+LAZY_MODULES = (
+    'auth_enhanced.crypto',
+    'auth_enhanced.email',
+)
+
+SETUP_CODE = (
+    "import sys, time\n"
+    "start_time = time.time()\n"
+    "import django\n"
+    "django.setup()\n"
+    "duration = time.time() - start_time\n"
+)
+
+
+def run_python(code, settings, interpreter_args=()):
+    """Runs the given code in a fresh interpreter and returns its stdout and
+    stderr."""
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (PROJECT_ROOT, env.get('PYTHONPATH')) if p)
+
+    process = subprocess.Popen(
+        [sys.executable] + list(interpreter_args) + ['-c', code],
+        cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        raise RuntimeError(stderr)
+
+    return stdout, stderr
+
+
+def measure_ready_time(settings, repeat=5):
+    """Returns the median time (in seconds) until all apps are ready."""
+
+    durations = sorted(
+        float(run_python(SETUP_CODE + "print(duration)", settings)[0])
+        for _i in range(repeat)
+    )
+
+    return durations[len(durations) // 2]
+
+
+def measure_import_times(settings):
+    """Returns the cumulative import time (in microseconds) of the app's
+    modules, that are imported by its AppConfig, as reported by
+    '-X importtime'.
+
+    Please note, that this includes the Django modules, that are imported by
+    the app's modules."""
+
+    _stdout, stderr = run_python('import auth_enhanced.apps', settings, ('-X', 'importtime'))
+
+    times = {}
+    for line in stderr.splitlines():
+        # 'import time: self [us] | cumulative | imported package'
+        if not line.startswith('import time:'):
+            continue
+        _self, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name.startswith('auth_enhanced'):
+            times[name] = int(cumulative)
+
+    return times
+
+
+def find_eager_imports(settings):
+    """Returns the lazy modules, that are imported during startup."""
+
+    stdout, _stderr = run_python(
+        SETUP_CODE + "print(','.join(m for m in {!r} if m in sys.modules))".format(LAZY_MODULES),
+        settings
+    )
+
+    return [m for m in stdout.strip().split(',') if m]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the startup cost of django-auth_enhanced')
+    parser.add_argument(
+        '--settings', default='tests.utils.settings_dev',
+        help="Python path to the settings module (default: 'tests.utils.settings_dev')."
+    )
+    parser.add_argument(
+        '--repeat', default=5, type=int,
+        help="The number of runs to measure the time until all apps are ready (default: 5)."
+    )
+    options = parser.parse_args()
+
+    print('django.setup(): {:.1f}ms (median of {} runs)'.format(
+        measure_ready_time(options.settings, options.repeat) * 1000, options.repeat
+    ))
+
+    if sys.version_info >= (3, 7):
+        for name, cumulative in sorted(measure_import_times(options.settings).items()):
+            print('import {}: {:.1f}ms'.format(name, cumulative / 1000.0))
+
+    eager = find_eager_imports(options.settings)
+    if eager:
+        print('The following modules are imported during startup: {}'.format(', '.join(eager)))
+        sys.exit(1)
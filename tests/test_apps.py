@@ -5,15 +5,20 @@
     - included tags: 'appconfig'"""
 
 # Python imports
+import os
+import subprocess
+import sys
 from unittest import skip  # noqa
 
 # Django imports
 from django.apps import apps
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.db.models import signals
 from django.test import override_settings, tag  # noqa
 
 # app imports
+from auth_enhanced.apps import callback_admin_information_new_signup
 from auth_enhanced.settings import (
     DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_CONST_MODE_MANUAL_ACTIVATION,
 )
@@ -23,6 +28,13 @@ from .utils.testcases import (
     AuthEnhancedPerTestDeactivatedSignalsTestCase, AuthEnhancedTestCase,
 )
 
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
 
 @tag('appconfig')
 class AuthEnhancedConfigTests(AuthEnhancedTestCase):
@@ -44,6 +56,48 @@ class AuthEnhancedConfigTests(AuthEnhancedTestCase):
         apps.get_app_config('auth_enhanced').ready()
         self.assertEqual(settings.DAE_VERIFICATION_TOKEN_MAX_AGE, 3600)
 
+    @override_settings(DAE_WARMUP_ON_READY=True)
+    @mock.patch('auth_enhanced.warmup.warmup')
+    def test_warmup_on_ready(self, mocked_warmup):
+        """The warmup routine is run by 'ready()', if enabled, but without
+        loading the URLconf."""
+
+        apps.get_app_config('auth_enhanced').ready()
+        self.assertEqual(mocked_warmup.call_count, 1)
+        self.assertNotIn('urls', mocked_warmup.call_args[0][0])
+
+    @mock.patch('auth_enhanced.warmup.warmup')
+    def test_warmup_disabled(self, mocked_warmup):
+        """The warmup routine is not run by default."""
+
+        apps.get_app_config('auth_enhanced').ready()
+        self.assertFalse(mocked_warmup.called)
+
+    def test_lazy_modules_not_imported(self):
+        """The app's mail and crypto modules are not imported on startup.
+
+        See 'benchmarks/startup.py' to measure the startup time."""
+
+        tests_root = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join((os.path.dirname(tests_root), tests_root)))
+
+        output = subprocess.check_output(
+            [
+                sys.executable, '-c',
+                "import sys, django; django.setup(); "
+                "print([m for m in ('auth_enhanced.crypto', 'auth_enhanced.email') if m in sys.modules])"
+            ],
+            env=env, universal_newlines=True
+        )
+        self.assertEqual(output.strip(), '[]')
+
+    @mock.patch('auth_enhanced.email.callback_admin_information_new_signup')
+    def test_lazy_callback(self, mocked_callback):
+        """Lazy callbacks import and call the actual callback."""
+
+        callback_admin_information_new_signup('foo', instance='bar', created=True)
+        mocked_callback.assert_called_once_with('foo', instance='bar', created=True)
+
 
 @tag('appconfig')
 class AuthEnhancedConfigSignalTests(AuthEnhancedPerTestDeactivatedSignalsTestCase):
@@ -71,6 +125,13 @@ class AuthEnhancedConfigSignalTests(AuthEnhancedPerTestDeactivatedSignalsTestCas
         self.assertIn('DAE_create_enhance_user_object', dispatch_uids)
         self.assertNotIn('DAE_admin_information_new_signup', dispatch_uids)
         self.assertNotIn('DAE_user_signup_email_verification', dispatch_uids)
+        self.assertIn('DAE_invalidate_status_on_save', dispatch_uids)
+
+        dispatch_uids = [x[0][0] for x in signals.post_delete.receivers]
+        self.assertIn('DAE_invalidate_status_on_delete', dispatch_uids)
+
+        dispatch_uids = [x[0][0] for x in setting_changed.receivers]
+        self.assertIn('DAE_refresh_app_settings', dispatch_uids)
 
     @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=(('foo', 'foo@localhost', ('mail', )), ),)
     def test_admin_signup_notification_registered(self):
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Includes tests targeting the app-specific authentication backend.
+
+    - target file: auth_enhanced/backends.py
+    - included tags: 'backends'"""
+
+# Python imports
+from unittest import skip  # noqa
+
+# Django imports
+from django.contrib.auth import get_user_model
+from django.test import override_settings, tag  # noqa
+
+# app imports
+from auth_enhanced.backends import AuthEnhancedBackend
+from auth_enhanced.models import UserEnhancement
+from auth_enhanced.settings import (
+    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
+)
+
+# app imports
+from .utils.testcases import AuthEnhancedTestCase
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
+
+@tag('backends')
+@override_settings(AUTHENTICATION_BACKENDS=['auth_enhanced.backends.AuthEnhancedBackend'])
+class AuthEnhancedBackendTests(AuthEnhancedTestCase):
+    """These tests target the 'AuthEnhancedBackend'."""
+
+    def setUp(self):
+        """Provide a user with a known password and an enhancement."""
+
+        self.user = get_user_model().objects.create_user(username='foo', password='bar')
+        self.enhancement = UserEnhancement.objects.create(user=self.user)
+        self.backend = AuthEnhancedBackend()
+
+    def test_get_user_joins_enhancement(self):
+        """The enhancement is fetched together with the user.
+
+        See 'get_user()'-method."""
+
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+            self.assertFalse(user.enhancement.email_is_verified)
+
+    def test_get_user_does_not_exist(self):
+        """Unknown ids return None.
+
+        See 'get_user()'-method."""
+
+        self.assertIsNone(self.backend.get_user(1337))
+
+    def test_authenticate_joins_enhancement(self):
+        """Valid credentials return the user, including its enhancement.
+
+        See 'authenticate()'-method."""
+
+        user = self.backend.authenticate(None, username='foo', password='bar')
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(user.enhancement.email_is_verified)
+
+    def test_authenticate_invalid_credentials(self):
+        """Invalid passwords or unknown users return None.
+
+        See 'authenticate()'-method."""
+
+        self.assertIsNone(self.backend.authenticate(None, username='foo', password='baz'))
+        self.assertIsNone(self.backend.authenticate(None, username='baz', password='bar'))
+
+    def test_authenticate_username_by_field_name(self):
+        """The username may be passed by using 'USERNAME_FIELD'.
+
+        See 'authenticate()'-method."""
+
+        user = self.backend.authenticate(None, password='bar', **{get_user_model().USERNAME_FIELD: 'foo'})
+        self.assertEqual(user, self.user)
+
+    def test_authenticate_custom_natural_key(self):
+        """The lookup of a project's 'get_by_natural_key()' is respected, i.e.
+        case-insensitive usernames.
+
+        See 'authenticate()'-method."""
+
+        def get_by_natural_key(manager, username):
+            return manager.get(**{'{}__iexact'.format(manager.model.USERNAME_FIELD): username})
+
+        with mock.patch.object(type(get_user_model()._default_manager), 'get_by_natural_key', get_by_natural_key):
+            user = self.backend.authenticate(None, username='FOO', password='bar')
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(user.enhancement.email_is_verified)
+
+    def test_login(self):
+        """The backend works with Django's 'login()', i.e. by the test client.
+
+        See 'authenticate()'- and 'get_user()'-method."""
+
+        self.assertTrue(self.client.login(username='foo', password='bar'))
+        self.assertEqual(self.client.session['_auth_user_backend'], 'auth_enhanced.backends.AuthEnhancedBackend')
+
+    def test_authenticate_inactive(self):
+        """Inactive users are rejected.
+
+        See 'user_can_authenticate()'-method."""
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(self.backend.authenticate(None, username='foo', password='bar'))
+
+    @override_settings(
+        DAE_LOGIN_REQUIRE_VERIFIED_EMAIL=True,
+        DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION
+    )
+    def test_unverified_rejected(self):
+        """Unverified accounts are rejected, if required by the settings.
+
+        See 'user_can_authenticate()'-method."""
+
+        self.assertIsNone(self.backend.authenticate(None, username='foo', password='bar'))
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+        self.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        self.enhancement.save()
+
+        self.assertEqual(self.backend.authenticate(None, username='foo', password='bar'), self.user)
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+
+    @override_settings(
+        DAE_LOGIN_REQUIRE_VERIFIED_EMAIL=True,
+        DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION
+    )
+    def test_missing_enhancement_rejected(self):
+        """Accounts without an enhancement are considered unverified.
+
+        See 'user_can_authenticate()'-method."""
+
+        self.enhancement.delete()
+
+        self.assertIsNone(self.backend.authenticate(None, username='foo', password='bar'))
+
+    @override_settings(
+        DAE_LOGIN_REQUIRE_VERIFIED_EMAIL=False,
+        DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION
+    )
+    def test_unverified_accepted_setting_disabled(self):
+        """Unverified accounts are accepted by default.
+
+        See 'user_can_authenticate()'-method."""
+
+        self.assertEqual(self.backend.authenticate(None, username='foo', password='bar'), self.user)
+
+    @override_settings(
+        DAE_LOGIN_REQUIRE_VERIFIED_EMAIL=True,
+        DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION
+    )
+    def test_unverified_accepted_other_mode(self):
+        """The setting is only applied in email activation mode.
+
+        See 'user_can_authenticate()'-method."""
+
+        self.assertEqual(self.backend.authenticate(None, username='foo', password='bar'), self.user)
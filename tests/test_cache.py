@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Includes tests targeting the caching of the email verification status.
+
+    - target file: auth_enhanced/cache.py
+    - included tags: 'cache', 'models', 'read_database'"""
+
+# Python imports
+from unittest import skip  # noqa
+
+# Django imports
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings, tag  # noqa
+from django.utils import timezone
+
+# app imports
+from auth_enhanced.cache import (
+    callback_end_request_memo, callback_start_request_memo,
+    get_status_cache_key, get_status_info_cache_key, invalidate_cached_status,
+    is_recently_changed,
+)
+from auth_enhanced.models import UserEnhancement, VerificationStatusCounter
+
+# app imports
+from .utils.testcases import (
+    AuthEnhancedReplicaTestCase, AuthEnhancedTestCaseBase,
+)
+
+
+@tag('cache', 'models')
+class StatusCacheTests(AuthEnhancedTestCaseBase):
+    """These tests target 'UserEnhancement.get_status_cached()' and the
+    invalidation of cached values.
+
+    The app's signal callbacks are required to be connected."""
+
+    def setUp(self):
+        """Start every test with an empty cache and a known status."""
+
+        self.user = get_user_model().objects.create(username='foo')
+        UserEnhancement.objects.filter(user=self.user).update(
+            email_verification_status=UserEnhancement.EMAIL_VERIFICATION_FAILED
+        )
+        cache.clear()
+
+    def tearDown(self):
+        """Don't leave an active request memo behind."""
+
+        callback_end_request_memo(None)
+
+    def test_read_through(self):
+        """Only the first lookup hits the database."""
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                UserEnhancement.get_status_cached(self.user.pk),
+                UserEnhancement.EMAIL_VERIFICATION_FAILED
+            )
+            self.assertEqual(
+                UserEnhancement.get_status_cached(self.user.pk),
+                UserEnhancement.EMAIL_VERIFICATION_FAILED
+            )
+
+    @override_settings(DAE_STATUS_CACHE_PREFIX='foo')
+    def test_cache_key_prefix(self):
+        """The cache key is built by using 'DAE_STATUS_CACHE_PREFIX'."""
+
+        self.assertEqual(get_status_cache_key(42), 'foo:42')
+
+        UserEnhancement.get_status_cached(self.user.pk)
+        self.assertEqual(cache.get('foo:{}'.format(self.user.pk)), UserEnhancement.EMAIL_VERIFICATION_FAILED)
+
+    def test_missing_enhancement(self):
+        """Users without an UserEnhancement return None."""
+
+        self.assertIsNone(UserEnhancement.get_status_cached(1337))
+        self.assertIsNone(cache.get(get_status_cache_key(1337)))
+
+    def test_invalidate_on_save(self):
+        """Saving an UserEnhancement removes the cached value."""
+
+        UserEnhancement.get_status_cached(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            self.user.enhancement.save()
+
+        self.assertEqual(
+            UserEnhancement.get_status_cached(self.user.pk),
+            UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+
+    def test_invalidate_on_commit(self):
+        """The cached value is kept until the transaction is committed, so a
+        concurrent request can not cache the old row again in the meantime."""
+
+        UserEnhancement.get_status_cached(self.user.pk)
+        UserEnhancement.get_status_info_cached(self.user.pk)
+        keys = [get_status_cache_key(self.user.pk), get_status_info_cache_key(self.user.pk)]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            self.user.enhancement.save()
+            UserEnhancement.objects.filter(user=self.user).update_status(UserEnhancement.EMAIL_VERIFICATION_FAILED)
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(len(cache.get_many(keys)), 2)
+
+        # the commit
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_invalidate_on_delete(self):
+        """Deleting an UserEnhancement removes the cached value."""
+
+        UserEnhancement.get_status_cached(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.enhancement.delete()
+
+        self.assertIsNone(UserEnhancement.get_status_cached(self.user.pk))
+
+    def test_invalidate_bulk(self):
+        """'invalidate_cached_status()' is used by code paths without signals."""
+
+        UserEnhancement.get_status_cached(self.user.pk)
+
+        UserEnhancement.objects.filter(user=self.user).update(
+            email_verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+        invalidate_cached_status([self.user.pk])
+
+        self.assertEqual(
+            UserEnhancement.get_status_cached(self.user.pk),
+            UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+
+    def test_request_memo(self):
+        """Within a request, the status is memorised without the cache."""
+
+        callback_start_request_memo(None)
+        UserEnhancement.get_status_cached(self.user.pk)
+
+        # the memo survives, even if Django's cache is emptied
+        cache.clear()
+        with self.assertNumQueries(0):
+            UserEnhancement.get_status_cached(self.user.pk)
+
+        # after the request, Django's cache (and the database) is used again
+        callback_end_request_memo(None)
+        with self.assertNumQueries(1):
+            UserEnhancement.get_status_cached(self.user.pk)
+
+    def test_request_memo_invalidation(self):
+        """Invalidation applies to the memo aswell."""
+
+        callback_start_request_memo(None)
+        UserEnhancement.get_status_cached(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            self.user.enhancement.save()
+
+        self.assertEqual(
+            UserEnhancement.get_status_cached(self.user.pk),
+            UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+
+    def test_status_info(self):
+        """The status info is cached and invalidated together with the status."""
+
+        sent_at = UserEnhancement.objects.get(user=self.user).verification_sent_at
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                UserEnhancement.get_status_info_cached(self.user.pk),
+                (UserEnhancement.EMAIL_VERIFICATION_FAILED, sent_at)
+            )
+            UserEnhancement.get_status_info_cached(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            self.user.enhancement.verified_at = timezone.now()
+            self.user.enhancement.save()
+
+        self.assertEqual(
+            UserEnhancement.get_status_info_cached(self.user.pk),
+            (UserEnhancement.EMAIL_VERIFICATION_COMPLETED, self.user.enhancement.verified_at)
+        )
+        self.assertIsNone(UserEnhancement.get_status_info_cached(1337))
+
+
+@tag('cache', 'models', 'read_database')
+@override_settings(DAE_READ_DATABASE='replica')
+class StatusCacheReadDatabaseTests(AuthEnhancedReplicaTestCase):
+    """These tests target the cached status lookups with 'DAE_READ_DATABASE'.
+
+    The status is read from the replica, unless it was changed recently."""
+
+    def setUp(self):
+        """Start every test with an empty cache and a known status."""
+
+        self.user = get_user_model().objects.create(username='foo')
+        UserEnhancement.objects.filter(user=self.user).update(
+            email_verification_status=UserEnhancement.EMAIL_VERIFICATION_FAILED
+        )
+        cache.clear()
+
+    def test_read_from_replica(self):
+        """Cache misses are read from the replica."""
+
+        with self.captureDatabaseQueries() as (default, replica):
+            self.assertEqual(
+                UserEnhancement.get_status_cached(self.user.pk),
+                UserEnhancement.EMAIL_VERIFICATION_FAILED
+            )
+            UserEnhancement.get_status_info_cached(self.user.pk)
+
+        self.assertEqual(len(replica), 2)
+        self.assertEqual(len(default), 0)
+
+    def test_recently_changed(self):
+        """Status changes are written to the database for writes, which is
+        also used to read the status of the changed account afterwards."""
+
+        with self.captureDatabaseQueries() as (default, replica):
+            UserEnhancement.objects.filter(user=self.user).update_status(
+                UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            )
+        self.assertGreater(len(default), 0)
+        self.assertEqual(len(replica), 0)
+        self.assertTrue(is_recently_changed(self.user.pk))
+        self.assertEqual(
+            VerificationStatusCounter.get_counts()[UserEnhancement.EMAIL_VERIFICATION_COMPLETED], 1
+        )
+
+        with self.captureDatabaseQueries() as (default, replica):
+            self.assertEqual(
+                UserEnhancement.get_status_cached(self.user.pk),
+                UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            )
+        self.assertEqual(len(default), 1)
+        self.assertEqual(len(replica), 0)
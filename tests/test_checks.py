@@ -10,20 +10,46 @@ The app's checks rely on Django's system check framework."""
 from unittest import skip  # noqa
 
 # Django imports
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import override_settings, tag  # noqa
 
 # app imports
 from auth_enhanced.checks import (
-    E001, E002, E003, E004, E008, E009, E010, W005, W006, W007,
+    DAE_PERFORMANCE_TAG, E001, E002, E003, E004, E008, E009, E010, E011, E012,
+    E013, E014, E015, E016, E017, E018, E019, E020, P001, P002, P003, P004,
+    W005, W006, W007, check_email_index, check_performance,
     check_settings_values,
 )
 from auth_enhanced.settings import (
-    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_RECOMMENDED_LOGIN_URL,
+    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
+    DAE_CONST_RECOMMENDED_LOGIN_URL,
 )
 
 # app imports
 from .utils.testcases import AuthEnhancedTestCase
 
+try:
+    # Python 2.7 has to come before Python 3!
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
+# settings, that do not trigger any performance check
+PERFORMANCE_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'DAE_ADMIN_SIGNUP_NOTIFICATION': False,
+    'DAE_OPERATION_MODE': DAE_CONST_MODE_EMAIL_ACTIVATION,
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
 
 @tag('checks')
 class CheckSettingsValuesTests(AuthEnhancedTestCase):
@@ -173,3 +199,194 @@ class CheckSettingsValuesTests(AuthEnhancedTestCase):
         Actually, 'None' is the only way to raise this error."""
         errors = check_settings_values(None)
         self.assertEqual(errors, [E010])
+
+    @override_settings(DAE_LOGIN_REQUIRE_VERIFIED_EMAIL=True)
+    def test_e011_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_LOGIN_REQUIRE_VERIFIED_EMAIL='foo')
+    def test_e011_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E011])
+
+    @override_settings(DAE_STATUS_CACHE_PREFIX='foo')
+    def test_e012_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_STATUS_CACHE_PREFIX=None)
+    def test_e012_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E012])
+
+    @override_settings(DAE_STATUS_CACHE_TIMEOUT=60)
+    def test_e013_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_STATUS_CACHE_TIMEOUT='foo')
+    def test_e013_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E013])
+
+    @override_settings(DAE_READ_DATABASE='default')
+    def test_e014_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_READ_DATABASE='foo')
+    def test_e014_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E014])
+
+    @override_settings(DAE_WARMUP_ON_READY=True)
+    def test_e015_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_WARMUP_ON_READY='foo')
+    def test_e015_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E015])
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True)
+    def test_e016_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS='foo')
+    def test_e016_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E016])
+
+    @override_settings(DAE_RATE_LIMITS={'login': {'ip': '30/m', 'identity': '10/15m'}})
+    def test_e017_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    def test_e017_invalid(self):
+        """Invalid values show an error message."""
+        for value in (True, {'foo': {'ip': '1/m'}}, {'login': {'foo': '1/m'}}, {'login': {'ip': '1/x'}}):
+            with self.settings(DAE_RATE_LIMITS=value):
+                errors = check_settings_values(None)
+                self.assertEqual(errors, [E017], value)
+
+    @override_settings(DAE_AUTO_LOGIN=True)
+    def test_e018_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_AUTO_LOGIN='foo')
+    def test_e018_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E018])
+
+    @override_settings(DAE_DEFERRED_SIGNUP=True)
+    def test_e019_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_DEFERRED_SIGNUP='foo')
+    def test_e019_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E019])
+
+    @override_settings(DAE_METRICS_TOKEN='foo')
+    def test_e020_valid(self):
+        """Check should accept valid values."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(DAE_METRICS_TOKEN='')
+    def test_e020_invalid(self):
+        """Invalid values show an error message."""
+        errors = check_settings_values(None)
+        self.assertEqual(errors, [E020])
+
+
+@tag('checks')
+@override_settings(**PERFORMANCE_SETTINGS)
+class CheckPerformanceTests(AuthEnhancedTestCase):
+    """These tests target 'check_performance()' and 'check_email_index()'."""
+
+    def test_valid(self):
+        """Check should accept valid configurations."""
+        errors = check_performance(None)
+        self.assertEqual(errors, [])
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+    def test_p001(self):
+        """Synchronous sending of verification mails shows a warning."""
+        errors = check_performance(None)
+        self.assertEqual(errors, [P001])
+
+    @override_settings(
+        DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION,
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend'
+    )
+    def test_p001_no_verification(self):
+        """Without verification mails, the mail backend is not relevant."""
+        errors = check_performance(None)
+        self.assertEqual(errors, [])
+
+    def test_p002(self):
+        """A missing index on the email column shows a warning."""
+        with mock.patch('auth_enhanced.checks.has_email_index', return_value=False):
+            self.assertEqual(check_email_index(None), [P002])
+        with mock.patch('auth_enhanced.checks.has_email_index', return_value=True):
+            self.assertEqual(check_email_index(None), [])
+
+    @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=[
+        ('admin{}'.format(i), 'admin{}@localhost'.format(i), ('mail', )) for i in range(6)
+    ])
+    def test_p003(self):
+        """Notifying many admins on every signup shows a warning."""
+        errors = check_performance(None)
+        self.assertEqual(errors, [P003])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_p004(self):
+        """A process-local status cache shows a warning."""
+        errors = check_performance(None)
+        self.assertEqual(errors, [P004])
+
+    @override_settings(
+        DAE_ADMIN_SIGNUP_NOTIFICATION=(('django', 'django@localhost', ('mail', )), ),
+        DAE_EMAIL_TEMPLATE_PREFIX='foo'
+    )
+    def test_p005(self):
+        """Every missing mail template shows an error."""
+        errors = check_performance(None)
+        self.assertEqual([e.id for e in errors], ['dae.p005', 'dae.p005'])
+        self.assertIn('foo/user_email_verification.txt', errors[0].msg)
+        self.assertIn('foo/admin_signup_notification.txt', errors[1].msg)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_command(self):
+        """The performance checks are deployment checks, that are selected by
+        their tag. Without '--deploy', the tag is unknown."""
+
+        err = StringIO()
+        call_command('check', '--deploy', '--tag', DAE_PERFORMANCE_TAG, stdout=StringIO(), stderr=err)
+        self.assertIn('dae.p004', err.getvalue())
+
+        with self.assertRaisesMessage(CommandError, DAE_PERFORMANCE_TAG):
+            call_command('check', '--tag', DAE_PERFORMANCE_TAG, stdout=StringIO(), stderr=StringIO())
@@ -2,24 +2,36 @@
 """Includes tests targeting the app's management commands.
 
     - target file: auth_enhanced/management/commands/_lib.py
-    - included tags: 'command'"""
+    - included tags: 'command', 'deferred_signup', 'query_budget', 'read_database'"""
 
 
 # Python imports
+import json
+from datetime import timedelta
 from unittest import skip  # noqa
 
 # Django imports
 from django.contrib.auth import get_user_model
 from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import override_settings, tag  # noqa
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 # app imports
 from auth_enhanced.management.commands.authenhanced import (
-    check_admin_notification, check_email_uniqueness,
+    EXIT_ERROR, EXIT_FAILED, ChecksFailed, backfill_enhancements,
+    calibrate_hashers, check_admin_notification, check_email_uniqueness,
+    explain_hot_queries, find_duplicate_emails, get_hot_querysets,
+    get_status_statistics, purge_expired_signups, purge_unverified_accounts,
+    run_check, run_checks, seed_accounts,
+)
+from auth_enhanced.models import (
+    PendingSignup, UserEnhancement, VerificationStatusCounter,
 )
 
 # app imports
-from .utils.testcases import AuthEnhancedTestCase
+from .utils.testcases import AuthEnhancedReplicaTestCase, AuthEnhancedTestCase
 
 try:
     # Python 2.7 has to come before Python 3!
@@ -44,7 +56,7 @@ class CheckAuthEnhancedCommand(AuthEnhancedTestCase):
         """This class just provides necessary mock methods."""
 
         @staticmethod
-        def return_true():
+        def return_true(*args, **kwargs):
             return True
 
     def test_unknown_command(self):
@@ -103,6 +115,124 @@ class CheckAuthEnhancedCommand(AuthEnhancedTestCase):
         self.assertIn('Notification settings are valid!', out.getvalue())
 
 
+@tag('command')
+class CheckRunnerTests(AuthEnhancedTestCase):
+    """These tests target the check runner ('run_check()', 'run_checks()')
+    and its integration into the command."""
+
+    class MockCheckFunctions:
+        """This class just provides necessary mock methods."""
+
+        @staticmethod
+        def return_true(*args, **kwargs):
+            return True
+
+        @staticmethod
+        def raise_command_error(*args, **kwargs):
+            raise CommandError('foo\nbar')
+
+        @staticmethod
+        def raise_exception(*args, **kwargs):
+            raise ValueError('baz')
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.return_true
+    )
+    def test_run_check_ok(self):
+        """A passing check is reported with its success message and duration."""
+
+        result = run_check('unique-email')
+        self.assertEqual(result['name'], 'unique-email')
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(result['messages'], ['All email addresses are unique!'])
+        self.assertGreaterEqual(result['duration'], 0)
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.raise_command_error
+    )
+    def test_run_check_failed(self):
+        """A CommandError marks the check as failed, every line of its message
+        is reported."""
+
+        result = run_check('unique-email')
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(result['messages'], ['foo', 'bar'])
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.raise_exception
+    )
+    def test_run_check_error(self):
+        """Any other exception marks the check as erroneous."""
+
+        result = run_check('unique-email')
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('baz', result['messages'][0])
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_admin_notification',
+        new=MockCheckFunctions.return_true
+    )
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.return_true
+    )
+    def test_run_checks_concurrently(self):
+        """Concurrently run checks are reported in the given order."""
+
+        names = ['admin-notification', 'unique-email']
+        results = run_checks(names, jobs=2)
+        self.assertEqual([r['name'] for r in results], names)
+        self.assertEqual([r['status'] for r in results], ['ok', 'ok'])
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_admin_notification',
+        new=MockCheckFunctions.return_true
+    )
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.raise_command_error
+    )
+    def test_full_runs_all_checks(self):
+        """'full' runs all checks, even if one of them fails."""
+
+        out = StringIO()
+
+        with self.assertRaises(ChecksFailed) as cm:
+            call_command('authenhanced', 'full', stdout=out)
+        self.assertEqual(cm.exception.returncode, EXIT_FAILED)
+        self.assertIn('unique-email', str(cm.exception))
+        self.assertIn('[failed] unique-email', out.getvalue())
+        self.assertIn('    foo', out.getvalue())
+        self.assertIn('Notification settings are valid!', out.getvalue())
+
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_admin_notification',
+        new=MockCheckFunctions.raise_exception
+    )
+    @mock.patch(
+        'auth_enhanced.management.commands.authenhanced.check_email_uniqueness',
+        new=MockCheckFunctions.return_true
+    )
+    def test_full_json(self):
+        """'--format json' reports all checks as JSON, errors take precedence."""
+
+        out = StringIO()
+
+        with self.assertRaises(ChecksFailed) as cm:
+            call_command('authenhanced', 'full', format='json', stdout=out)
+        self.assertEqual(cm.exception.returncode, EXIT_ERROR)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['status'], 'error')
+        self.assertEqual(
+            [(c['name'], c['status']) for c in report['checks']],
+            [('unique-email', 'ok'), ('admin-notification', 'error')]
+        )
+
+
 @tag('command')
 class CheckAdminNotificationTests(AuthEnhancedTestCase):
     """These tests target the 'check_admin_notification()'-function.
@@ -118,7 +248,27 @@ class CheckAdminNotificationTests(AuthEnhancedTestCase):
     def test_all_valid(self):
         """Returns True, if the setting is completely valid."""
 
-        self.assertTrue(check_admin_notification())
+        with self.assertNumQueries(1):
+            self.assertTrue(check_admin_notification())
+
+    @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=(
+        ('django', 'django@localhost', ('mail', )),
+        ('foo', 'bar@localhost', ('mail', )),
+        ('bar', 'bar@localhost', ('mail', )),
+        ('baz', 'baz@localhost', ('mail', )),
+        ('qux', 'qux@localhost', ('mail', )),
+    ))
+    def test_all_problems_single_query(self):
+        """All problems are reported at once, using a single query."""
+
+        with self.assertNumQueries(1):
+            with self.assertRaises(CommandError) as cm:
+                check_admin_notification()
+
+        message = str(cm.exception)
+        self.assertIn("do not have a verified email address: bar, qux.", message)
+        self.assertIn("do not match the project's settings: foo.", message)
+        self.assertIn("sufficient permissions to actually modify accounts: baz, qux.", message)
 
     @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=(
         ('django', 'django@localhost', ('mail', )),
@@ -214,3 +364,674 @@ class CheckEmailUniquenessTests(AuthEnhancedTestCase):
             "The following accounts don't have unique email addresses: django, foo"
         ):
             check_email_uniqueness()
+
+
+@tag('command')
+class FindDuplicateEmailsTests(AuthEnhancedTestCase):
+    """These tests target the 'find_duplicate_emails()'-function, using both
+    scan modes."""
+
+    def setUp(self):
+        """Provide accounts with duplicate, case-different and blank email
+        addresses."""
+
+        user_model = get_user_model()
+        for username, email in (
+            ('a1', 'a@localhost'),
+            ('a2', 'A@localhost'),
+            ('b1', 'b@localhost'),
+            ('b2', 'b@localhost'),
+            ('b3', 'B@LOCALHOST'),
+            ('c1', 'c@localhost'),
+            ('blank1', ''),
+            ('blank2', ''),
+        ):
+            user_model.objects.create(**{user_model.USERNAME_FIELD: username, user_model.EMAIL_FIELD: email})
+
+    def test_database(self):
+        """The database groups case-insensitively and ignores blanks."""
+
+        duplicates, total = find_duplicate_emails(mode='database')
+
+        self.assertEqual(total, 2)
+        self.assertEqual(duplicates, [('a@localhost', ['a1', 'a2']), ('b@localhost', ['b1', 'b2', 'b3'])])
+
+    def test_stream(self):
+        """Streaming in small chunks gives the same result."""
+
+        duplicates, total = find_duplicate_emails(mode='stream', chunk_size=3)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(duplicates, [('a@localhost', ['a1', 'a2']), ('b@localhost', ['b1', 'b2', 'b3'])])
+
+    def test_stream_partitions(self):
+        """Splitting the addresses into partitions does not change the result."""
+
+        progress = []
+        duplicates, total = find_duplicate_emails(
+            mode='stream', chunk_size=4, partition_size=2, progress=lambda *args: progress.append(args)
+        )
+
+        self.assertEqual(total, 2)
+        self.assertEqual(duplicates, [('a@localhost', ['a1', 'a2']), ('b@localhost', ['b1', 'b2', 'b3'])])
+        # 6 rows in 3 partitions, reported per chunk
+        self.assertEqual(progress[-1], (18, 18))
+
+    def test_auto(self):
+        """'auto' picks a mode, both deliver the same result."""
+
+        self.assertEqual(find_duplicate_emails()[1], 2)
+
+    def test_auto_index(self):
+        """'auto' uses the database, only if there is an index on the
+        lowercased email column. A plain index can not serve the grouping."""
+
+        user_model = get_user_model()
+        table = user_model._meta.db_table
+        column = user_model._meta.get_field(user_model.EMAIL_FIELD).column
+        module = 'auth_enhanced.management.commands.authenhanced'
+
+        for index, mode in (
+            ('CREATE INDEX dae_test_email ON {} ({})', 'stream'),
+            ('CREATE INDEX dae_test_email_lower ON {} (LOWER({}))', 'database'),
+        ):
+            with connection.cursor() as cursor:
+                cursor.execute(index.format(table, column))
+
+            with mock.patch('{}._find_duplicate_emails_{}'.format(module, mode), return_value=([], 0)) as mocked:
+                find_duplicate_emails()
+            self.assertTrue(mocked.called)
+
+    def test_pagination(self):
+        """The output is capped and can be paginated."""
+
+        for mode in ('database', 'stream'):
+            self.assertEqual(
+                find_duplicate_emails(mode=mode, limit=1, offset=1),
+                ([('b@localhost', ['b1', 'b2', 'b3'])], 2)
+            )
+
+    def test_check_capped_message(self):
+        """The check mentions, if not all duplicates are reported."""
+
+        with self.assertRaisesMessage(
+            CommandError,
+            "The following accounts don't have unique email addresses: a1, a2 "
+            "(showing 1 of 2 duplicate email addresses)"
+        ):
+            check_email_uniqueness(limit=1)
+
+
+@tag('command')
+class PurgeUnverifiedAccountsTests(AuthEnhancedTestCase):
+    """These tests target the 'purge_unverified_accounts()'-function and the
+    'purge-unverified' command."""
+
+    def _create_account(self, username, is_active=False, age=None,
+                        status=UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS):
+        """Creates an account, whose verification mail was sent 'age' days ago."""
+
+        user = get_user_model().objects.create(username=username, is_active=is_active)
+        UserEnhancement.objects.create(
+            user=user,
+            email_verification_status=status,
+            verification_sent_at=timezone.now() - timedelta(days=age) if age is not None else None
+        )
+        return user
+
+    def setUp(self):
+        """Provide different accounts, only the first ones may be purged."""
+
+        for i in range(5):
+            self._create_account('stale{}'.format(i), age=40)
+        self._create_account('recent', age=5)
+        self._create_account('active', is_active=True, age=40)
+        self._create_account('verified', status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED, age=40)
+        self._create_account('untracked', status=UserEnhancement.EMAIL_VERIFICATION_FAILED)
+
+    def _remaining_usernames(self):
+        """Returns the usernames of all remaining accounts."""
+
+        return sorted(get_user_model().objects.values_list('username', flat=True))
+
+    def test_purge_in_chunks(self):
+        """Only stale, inactive and unverified accounts are deleted in chunks."""
+
+        counts = list(purge_unverified_accounts(30 * 24 * 3600, chunk_size=2))
+
+        self.assertEqual(counts, [2, 2, 1])
+        self.assertEqual(self._remaining_usernames(), ['active', 'recent', 'untracked', 'verified'])
+        self.assertEqual(UserEnhancement.objects.count(), 4)
+
+    def test_purge_dry_run(self):
+        """With 'dry_run' the candidates are only counted."""
+
+        self.assertEqual(sum(purge_unverified_accounts(30 * 24 * 3600, chunk_size=2, dry_run=True)), 5)
+        self.assertEqual(get_user_model().objects.count(), 9)
+
+    def test_command(self):
+        """The command reports the number of purged accounts."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'purge-unverified', '--older-than', '30d', '--sleep', '0', stdout=out)
+        self.assertIn('Purged 5 unverified accounts', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+    def test_command_invalid_age(self):
+        """Invalid values for '--older-than' raise an error."""
+
+        with self.assertRaisesMessage(CommandError, "'--older-than' could not be converted to seconds!"):
+            call_command('authenhanced', 'purge-unverified', '--older-than', 'foo', stdout=StringIO())
+
+    @override_settings(DAE_VERIFICATION_TOKEN_MAX_AGE='2d')
+    def test_command_age_below_token_max_age(self):
+        """Accounts with a valid verification token are never purged."""
+
+        message = "'--older-than' has to be at least DAE_VERIFICATION_TOKEN_MAX_AGE"
+        with self.assertRaisesMessage(CommandError, message):
+            call_command('authenhanced', 'purge-unverified', '--older-than', '1d', stdout=StringIO())
+        self.assertEqual(get_user_model().objects.count(), 9)
+
+    def test_command_invalid_chunk_size(self):
+        """Chunks have to contain at least one row."""
+
+        with self.assertRaisesMessage(CommandError, "'--chunk-size' has to be a positive integer!"):
+            call_command('authenhanced', 'purge-unverified', '--chunk-size', '0', stdout=StringIO())
+
+
+@tag('command', 'deferred_signup')
+class PurgeExpiredSignupsTests(AuthEnhancedTestCase):
+    """These tests target the 'purge_expired_signups()'-function and its part
+    of the 'purge-unverified' command."""
+
+    def setUp(self):
+        """Provide expired and unexpired PendingSignups."""
+
+        expired_at = timezone.now() - timedelta(hours=2)
+        PendingSignup.objects.bulk_create(
+            [PendingSignup(username='expired{}'.format(i), created_at=expired_at) for i in range(5)] +
+            [PendingSignup(username='pending')]
+        )
+
+    def test_purge_in_chunks(self):
+        """Only expired PendingSignups are deleted in chunks."""
+
+        self.assertEqual(sum(purge_expired_signups(chunk_size=2, dry_run=True)), 5)
+        self.assertEqual(PendingSignup.objects.count(), 6)
+
+        self.assertEqual(list(purge_expired_signups(chunk_size=2)), [2, 2, 1])
+        self.assertEqual(list(PendingSignup.objects.values_list('username', flat=True)), ['pending'])
+
+    def test_command(self):
+        """The command reports the number of purged PendingSignups."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'purge-unverified', '--sleep', '0', stdout=out)
+        self.assertIn('Purged 5 expired pending signups', out.getvalue())
+
+
+@tag('command', 'counters')
+class BackfillEnhancementsTests(AuthEnhancedTestCase):
+    """These tests target the 'backfill_enhancements()'-function and the
+    'backfill-enhancements' command."""
+
+    def setUp(self):
+        """Provide accounts without enhancements and one with an enhancement."""
+
+        for i in range(5):
+            get_user_model().objects.create(username='missing{}'.format(i))
+        user = get_user_model().objects.create(username='existing')
+        UserEnhancement.objects.create(
+            user=user, email_verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+
+    def test_backfill_in_chunks(self):
+        """Missing enhancements are created in chunks, existing ones are kept."""
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = list(backfill_enhancements(chunk_size=2))
+
+        self.assertEqual(counts, [2, 2, 1])
+        # one INSERT per chunk
+        table = UserEnhancement._meta.db_table
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT') and table in q['sql']]), 3)
+        self.assertFalse(get_user_model().objects.filter(enhancement__isnull=True).exists())
+        self.assertEqual(
+            UserEnhancement.objects.get(user__username='existing').email_verification_status,
+            UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+        self.assertEqual(VerificationStatusCounter.get_counts()[UserEnhancement.EMAIL_VERIFICATION_FAILED], 5)
+
+    def test_backfill_restartable(self):
+        """An interrupted backfill is continued by running it again."""
+
+        next(backfill_enhancements(chunk_size=2))
+        self.assertEqual(list(backfill_enhancements(chunk_size=2)), [2, 1])
+        self.assertEqual(UserEnhancement.objects.count(), 6)
+
+    def test_backfill_dry_run(self):
+        """With 'dry_run' the accounts are only counted."""
+
+        self.assertEqual(sum(backfill_enhancements(chunk_size=2, dry_run=True)), 5)
+        self.assertEqual(UserEnhancement.objects.count(), 1)
+
+    def test_command(self):
+        """The command reports the number of created enhancements."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'backfill-enhancements', '--sleep', '0', stdout=out)
+        self.assertIn('Created 5 enhancements', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+
+@tag('command')
+class SeedAccountsTests(AuthEnhancedTestCase):
+    """These tests target the 'seed_accounts()'-function and the 'seed'
+    command."""
+
+    def test_seed_in_chunks(self):
+        """Accounts and enhancements are created in chunks, without signals and
+        with a single password hash."""
+
+        with mock.patch(
+            'auth_enhanced.management.commands.authenhanced.make_password', return_value='hash'
+        ) as mocked_make_password:
+            counts = list(seed_accounts(5, verified_ratio=0.4, in_progress_ratio=0.4, chunk_size=2, random_seed=1))
+
+        self.assertEqual(len(counts), 3)
+        self.assertEqual(mocked_make_password.call_count, 1)
+        self.assertEqual(get_user_model().objects.filter(password='hash').count(), 5)
+        self.assertEqual(UserEnhancement.objects.count(), 5)
+
+        # the signal callbacks are disconnected, so the counters have been
+        #   adjusted by the function
+        totals = dict((key, sum(c[key] for c in counts)) for key in ('completed', 'in_progress', 'failed'))
+        self.assertEqual(get_status_statistics(), dict(totals, total=5))
+        self.assertEqual(get_status_statistics(), get_status_statistics(recount=True))
+
+    def test_seed_distribution(self):
+        """The status determines the activation and the verification
+        details."""
+
+        list(seed_accounts(30, verified_ratio=0.5, in_progress_ratio=0.25, random_seed=1))
+
+        for enhancement in UserEnhancement.objects.select_related('user'):
+            verified = enhancement.email_verification_status == UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+            failed = enhancement.email_verification_status == UserEnhancement.EMAIL_VERIFICATION_FAILED
+            self.assertEqual(enhancement.user.is_active, verified)
+            self.assertEqual(enhancement.verification_sent_at is None, failed)
+            self.assertEqual(enhancement.verified_at is None, not verified)
+
+    def test_seed_duplicates(self):
+        """Duplicate email addresses are found by the 'unique-email' check."""
+
+        counts = list(seed_accounts(20, duplicate_ratio=0.5, random_seed=1))
+
+        self.assertGreater(counts[0]['duplicates'], 0)
+        self.assertGreater(find_duplicate_emails(mode='database')[1], 0)
+
+    def test_seed_continues_numbering(self):
+        """Subsequent runs continue the numbering of the usernames."""
+
+        list(seed_accounts(2))
+        list(seed_accounts(2))
+
+        self.assertEqual(
+            sorted(get_user_model().objects.values_list('username', flat=True)),
+            ['seed-0', 'seed-1', 'seed-2', 'seed-3']
+        )
+
+    def test_seed_continues_after_deleted(self):
+        """The numbering continues after the highest number, even if seeded
+        accounts were deleted in the meantime."""
+
+        list(seed_accounts(11))
+        get_user_model().objects.filter(username__in=['seed-0', 'seed-1']).delete()
+        get_user_model().objects.create(username='seed-admin')
+
+        list(seed_accounts(2))
+
+        self.assertEqual(get_user_model().objects.filter(username__in=['seed-11', 'seed-12']).count(), 2)
+        self.assertEqual(get_user_model().objects.count(), 12)
+
+    def test_seed_invalid_ratios(self):
+        """The ratios are validated."""
+
+        with self.assertRaises(ValueError):
+            next(seed_accounts(1, verified_ratio=0.6, in_progress_ratio=0.6))
+
+        with self.assertRaises(ValueError):
+            next(seed_accounts(1, duplicate_ratio=1))
+
+    def test_command(self):
+        """The command reports the number of created accounts."""
+
+        out = StringIO()
+
+        call_command(
+            'authenhanced', 'seed', '--users', '10', '--verified-ratio', '1', '--in-progress-ratio', '0', stdout=out
+        )
+        self.assertIn('Created 10 accounts (10 verified, 0 in progress, 0 failed', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+    def test_command_invalid_options(self):
+        """Invalid options are rejected."""
+
+        with self.assertRaises(CommandError):
+            call_command('authenhanced', 'seed', '--users', '0')
+
+        with self.assertRaises(CommandError):
+            call_command('authenhanced', 'seed', '--sent-within', 'foo')
+
+        with self.assertRaises(CommandError):
+            call_command('authenhanced', 'seed', '--verified-ratio', '2')
+
+
+@tag('command')
+class ExplainTests(AuthEnhancedTestCase):
+    """These tests target the 'explain_hot_queries()'-function and the
+    'explain' command.
+
+    The tests run on SQLite, where Django's User has no index on the email
+    column."""
+
+    def test_explain(self):
+        """Every hot query is explained, sequential scans are detected."""
+
+        results = dict((r['name'], r) for r in explain_hot_queries(min_rows=0))
+
+        self.assertEqual(set(results), set(name for name, _qs, _full_scan in get_hot_querysets()))
+        self.assertTrue(results['email-uniqueness']['flagged'])
+        self.assertEqual(results['email-uniqueness']['sequential_scans'], [{'table': 'auth_user', 'rows': 0}])
+        self.assertFalse(results['activation-lookup']['sequential_scans'])
+        self.assertFalse(results['purge-candidates']['sequential_scans'])
+
+        # these queries read the whole table anyway
+        self.assertTrue(results['duplicate-scan']['sequential_scans'])
+        self.assertFalse(results['duplicate-scan']['flagged'])
+
+    def test_explain_small_tables(self):
+        """Sequential scans on small tables are not flagged."""
+
+        get_user_model().objects.create(username='foo')
+
+        results = explain_hot_queries(min_rows=2)
+        self.assertFalse(any(r['flagged'] for r in results))
+        self.assertEqual(
+            [r['sequential_scans'] for r in results if r['name'] == 'email-uniqueness'],
+            [[{'table': 'auth_user', 'rows': 1}]]
+        )
+
+    def test_command(self):
+        """The command prints the plans."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'explain', stdout=out)
+        self.assertIn('email-uniqueness:', out.getvalue())
+        self.assertIn('sequential scan on auth_user (0 rows)', out.getvalue())
+        self.assertIn('[ok] No sequential scans on tables with at least 10000 rows.', out.getvalue())
+
+    def test_command_flagged(self):
+        """Flagged queries make the command fail."""
+
+        out = StringIO()
+
+        with self.assertRaises(ChecksFailed) as cm:
+            call_command('authenhanced', 'explain', '--min-rows', '0', '--format', 'json', stdout=out)
+
+        self.assertEqual(cm.exception.returncode, EXIT_FAILED)
+        self.assertIn('email-uniqueness', str(cm.exception))
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['status'], 'failed')
+        self.assertEqual([q['name'] for q in report['queries'] if q['flagged']], ['email-uniqueness'])
+
+
+@tag('command', 'counters')
+class StatusStatisticsTests(AuthEnhancedTestCase):
+    """These tests target the 'get_status_statistics()'-function and the
+    'stats' command.
+
+    The signal callbacks are disconnected, so the counters are set manually."""
+
+    def setUp(self):
+        """Provide some counters."""
+
+        VerificationStatusCounter.objects.create(status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED, count=3)
+        VerificationStatusCounter.objects.create(status=UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS, count=2)
+
+    def test_statistics(self):
+        """The counters are read without counting the accounts."""
+
+        with self.assertNumQueries(1):
+            statistics = get_status_statistics()
+
+        self.assertEqual(statistics, {'completed': 3, 'in_progress': 2, 'failed': 0, 'total': 5})
+
+    def test_statistics_recount(self):
+        """With 'recount' the counters are rebuilt."""
+
+        UserEnhancement.objects.create(user=get_user_model().objects.create(username='foo'))
+
+        statistics = get_status_statistics(recount=True)
+
+        self.assertEqual(statistics, {'completed': 0, 'in_progress': 0, 'failed': 1, 'total': 1})
+
+    def test_command_text(self):
+        """The statistics are printed as plain text by default."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'stats', stdout=out)
+        self.assertIn('completed:   3', out.getvalue())
+        self.assertIn('total:       5', out.getvalue())
+
+    def test_command_json(self):
+        """The statistics may be printed as JSON."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'stats', '--format', 'json', stdout=out)
+        self.assertEqual(
+            json.loads(out.getvalue()),
+            {'completed': 3, 'in_progress': 2, 'failed': 0, 'total': 5}
+        )
+
+    def test_command_database(self):
+        """'--database' selects the database, that the report is read from."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'stats', '--database', 'default', stdout=out)
+        self.assertIn('completed:   3', out.getvalue())
+
+        with self.assertRaisesMessage(CommandError, "'--database' has to be the alias of a configured database!"):
+            call_command('authenhanced', 'stats', '--database', 'foo', stdout=StringIO())
+
+    @override_settings(DAE_READ_DATABASE='foo')
+    def test_command_read_database_setting(self):
+        """'DAE_READ_DATABASE' is used, if '--database' is not provided."""
+
+        with self.assertRaisesMessage(CommandError, "'--database' has to be the alias of a configured database!"):
+            call_command('authenhanced', 'stats', stdout=StringIO())
+
+    def test_command_recount(self):
+        """'--recount' rebuilds the counters before printing them."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'stats', '--recount', '--chunk-size', '10', stdout=out)
+        self.assertIn('total:       0', out.getvalue())
+
+
+@tag('command', 'read_database')
+@override_settings(DAE_READ_DATABASE='replica')
+class ReadDatabaseTests(AuthEnhancedReplicaTestCase):
+    """These tests target the usage of 'DAE_READ_DATABASE' by the command.
+
+    The read-only subcommands query the replica, while all subcommands, that
+    modify data, stay on the database for writes."""
+
+    def setUp(self):
+        """Create some accounts with a known status."""
+
+        user_model = get_user_model()
+        admin = user_model.objects.create(username='django', email='django@localhost', is_superuser=True)
+        UserEnhancement.objects.filter(user=admin).update(
+            email_verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+        )
+        user = user_model.objects.create(username='foo', email='foo@localhost', is_active=False)
+        UserEnhancement.objects.filter(user=user).update(
+            email_verification_status=UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS,
+            verification_sent_at=timezone.now() - timedelta(days=60)
+        )
+        VerificationStatusCounter.recount()
+
+    def test_read_only_subcommands(self):
+        """The checks and the report read from the replica."""
+
+        for args in (('unique-email',), ('admin-notification',), ('stats',)):
+            with self.captureDatabaseQueries() as (default, replica):
+                call_command('authenhanced', *args, stdout=StringIO())
+
+            self.assertGreater(len(replica), 0, args)
+            self.assertEqual(len(default), 0, args)
+
+    def test_write_subcommands(self):
+        """Purging accounts and rebuilding the counters use the database for writes."""
+
+        for args in (('purge-unverified', '--sleep', '0'), ('stats', '--recount')):
+            with self.captureDatabaseQueries() as (default, replica):
+                call_command('authenhanced', *args, stdout=StringIO())
+
+            self.assertGreater(len(default), 0, args)
+            self.assertEqual(len(replica), 0, args)
+
+        self.assertFalse(get_user_model().objects.filter(username='foo').exists())
+        self.assertEqual(VerificationStatusCounter.get_counts()[UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS], 0)
+
+
+@tag('command', 'query_budget')
+class CommandQueryBudgetTests(AuthEnhancedTestCase):
+    """These tests ensure, that the number of queries of the checks and
+    reports does not grow with the number of accounts or admins."""
+
+    def create_users(self, size, **user_kwargs):
+        """Creates 'size' accounts with verified email addresses and returns
+        the corresponding entries of 'DAE_ADMIN_SIGNUP_NOTIFICATION'."""
+
+        users = super(CommandQueryBudgetTests, self).create_users(
+            size, verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED, **user_kwargs
+        )
+
+        return tuple((u.username, u.email, ('mail', )) for u in users)
+
+    def test_admin_notification(self):
+        """'check_admin_notification()' with 10 and 1000 admins."""
+
+        def check(notification):
+            with self.settings(DAE_ADMIN_SIGNUP_NOTIFICATION=notification):
+                self.assertTrue(check_admin_notification())
+
+        self.assertQueryBudget(1, check, prepare=lambda size: self.create_users(size, is_superuser=True))
+
+    def test_unique_email(self):
+        """'find_duplicate_emails()' in 'database'-mode."""
+
+        self.assertQueryBudget(
+            2,
+            lambda _data: self.assertEqual(find_duplicate_emails(mode='database'), ([], 0)),
+            prepare=self.create_users
+        )
+
+    def test_stats(self):
+        """The 'stats' command."""
+
+        self.assertQueryBudget(
+            1,
+            lambda _data: call_command('authenhanced', 'stats', stdout=StringIO()),
+            prepare=self.create_users
+        )
+
+
+@tag('command')
+class CalibrateHasherTests(AuthEnhancedTestCase):
+    """These tests target the 'calibrate_hashers()'-function and the
+    'calibrate-hasher' command."""
+
+    @staticmethod
+    def measure(hasher, samples, concurrency):
+        """Mimics '_measure_hasher()': one millisecond per 1000 iterations or
+        per bcrypt round above 4, doubled by every concurrent thread."""
+
+        if hasattr(hasher, 'iterations'):
+            duration = hasher.iterations / 1000000.0
+        elif hasattr(hasher, 'rounds'):
+            duration = 2 ** (hasher.rounds - 4) / 1000.0
+        else:
+            duration = 0.0001
+        return duration * concurrency
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_calibrate(self):
+        """The work factors are scaled by the duration under load."""
+
+        with mock.patch(
+            'auth_enhanced.management.commands.authenhanced._measure_hasher', side_effect=self.measure
+        ):
+            pbkdf2, bcrypt, md5 = calibrate_hashers(target_ms=100, concurrency=2)
+
+        self.assertTrue(pbkdf2['default'])
+        self.assertEqual((pbkdf2['parameter'], pbkdf2['recommended']), ('iterations', 50000))
+        self.assertAlmostEqual(pbkdf2['recommended_loaded_ms'], 100)
+        self.assertAlmostEqual(pbkdf2['recommended_signups_per_second'], 10)
+
+        # 2 ** (12 - 4) * 2ms = 512ms, every round less halves the duration
+        self.assertEqual((bcrypt['parameter'], bcrypt['current'], bcrypt['recommended']), ('rounds', 12, 9))
+        self.assertAlmostEqual(bcrypt['recommended_loaded_ms'], 64)
+
+        self.assertFalse(md5['default'])
+        self.assertIsNone(md5['parameter'])
+        self.assertAlmostEqual(md5['current_loaded_ms'], 0.2)
+
+    def test_command(self):
+        """The command measures the configured hashers."""
+
+        out = StringIO()
+        call_command(
+            'authenhanced', 'calibrate-hasher', '--samples', '1', '--concurrency', '2', '--format', 'json',
+            stdout=out
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['concurrency'], 2)
+        self.assertEqual(report['hashers'][0]['algorithm'], 'md5')
+        self.assertIn('current_loaded_ms', report['hashers'][0])
+
+        out = StringIO()
+        call_command('authenhanced', 'calibrate-hasher', '--samples', '1', '--concurrency', '1', stdout=out)
+        self.assertIn('MD5PasswordHasher (default)', out.getvalue())
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.Argon2PasswordHasher'])
+    def test_missing_library(self):
+        """Hashers, that can not be loaded, are reported."""
+
+        with mock.patch(
+            'django.contrib.auth.hashers.Argon2PasswordHasher.encode', side_effect=ValueError('foo')
+        ):
+            result, = calibrate_hashers(samples=1, concurrency=1)
+
+        self.assertEqual(result['error'], 'foo')
+
+    def test_command_invalid_options(self):
+        """The options are validated."""
+
+        with self.assertRaisesMessage(CommandError, "'--target-ms' has to be a positive number!"):
+            call_command('authenhanced', 'calibrate-hasher', '--target-ms', '0', stdout=StringIO())
@@ -18,6 +18,7 @@ from auth_enhanced.email import (
     AuthEnhancedEmail, callback_admin_information_new_signup,
     callback_user_signup_email_verification,
 )
+from auth_enhanced.models import UserEnhancement
 from auth_enhanced.settings import (
     DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
     DAE_CONST_MODE_MANUAL_ACTIVATION,
@@ -243,3 +244,43 @@ class UserSignupEmailVerificationTests(AuthEnhancedTestCase):
         self.assertEqual(mail.outbox[0].subject, '[{}] Email Verification Mail'.format(
             settings.DAE_EMAIL_PREFIX
         ))
+
+    def test_callback_tracks_verification(self):
+        """Sending the mail sets the status to 'in progress' and stores the
+        point in time.
+
+        See 'callback_user_signup_email_verification()'-function."""
+
+        # create a User object to pass along
+        u = get_user_model().objects.create(username='foo', email='foo@localhost')
+        UserEnhancement.objects.create(user=u)
+
+        retval = callback_user_signup_email_verification(
+            get_user_model(),
+            u,
+            True
+        )
+        self.assertTrue(retval)
+
+        enhancement = UserEnhancement.objects.get(user=u)
+        self.assertEqual(enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS)
+        self.assertIsNotNone(enhancement.verification_sent_at)
+        self.assertIsNone(enhancement.verified_at)
+
+    def test_callback_tracks_verification_missing_enhancement(self):
+        """If there is no UserEnhancement, it will be created.
+
+        See 'callback_user_signup_email_verification()'-function."""
+
+        # create a User object to pass along
+        u = get_user_model().objects.create(username='foo', email='foo@localhost')
+
+        callback_user_signup_email_verification(
+            get_user_model(),
+            u,
+            True
+        )
+
+        enhancement = UserEnhancement.objects.get(user=u)
+        self.assertEqual(enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS)
+        self.assertIsNotNone(enhancement.verification_sent_at)
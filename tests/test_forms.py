@@ -2,31 +2,37 @@
 """Includes tests targeting the app-specific forms.
 
     - target file: auth_enhanced/forms.py
-    - included tags: 'forms', 'settings', 'setting_operation_mode', 'signup',
-        'verification'
+    - included tags: 'deferred_signup', 'forms', 'query_budget', 'settings',
+        'setting_operation_mode', 'signup', 'verification'
 
 The app's checks rely on Django's system check framework."""
 
 # Python imports
+from datetime import timedelta
 from unittest import skip  # noqa
 
 # Django imports
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.core.signing import SignatureExpired
+from django.db import router
 from django.forms import ValidationError
 from django.test import override_settings, tag  # noqa
+from django.utils import timezone
 
 # app imports
 from auth_enhanced.crypto import EnhancedCrypto
 from auth_enhanced.forms import EmailVerificationForm, SignupForm
-from auth_enhanced.models import UserEnhancement
+from auth_enhanced.models import (
+    PendingSignup, UserEnhancement, VerificationStatusCounter,
+)
 from auth_enhanced.settings import (
     DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
     DAE_CONST_MODE_MANUAL_ACTIVATION,
 )
 
 # app imports
-from .utils.testcases import AuthEnhancedTestCase
+from .utils.testcases import AuthEnhancedTestCase, AuthEnhancedTestCaseBase
 
 try:
     # Python 3
@@ -129,18 +135,63 @@ class EmailVerificationFormTests(AuthEnhancedTestCase):
 
         self.assertTrue(get_user_model().objects.get(username='foo').is_active)
         self.assertEqual(u.enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_COMPLETED)
+        self.assertIsNotNone(u.enhancement.verified_at)
 
-    def test_activate_user_invalid_user(self):
-        """A non-existent user can not be activated and raises an exception.
+    def test_activate_user_again(self):
+        """Using the token again does not modify the account, i.e. the time of
+        the verification is kept.
 
         See 'activate_user()'-method."""
 
+        u = get_user_model().objects.create(username='foo', is_active=False)
+
+        form = EmailVerificationForm()
+        form.username = u.username
+        form.activate_user()
+        verified_at = UserEnhancement.objects.get(user=u).verified_at
+
         form = EmailVerificationForm()
-        form.username = 'bar'   # this username does not exist
+        form.username = u.username
+        with mock.patch.object(UserEnhancement, 'save') as mocked_save:
+            self.assertEqual(form.activate_user(), u)
 
-        with self.assertRaises(get_user_model().DoesNotExist):
+        self.assertTrue(form.already_verified)
+        self.assertFalse(mocked_save.called)
+        self.assertEqual(UserEnhancement.objects.get(user=u).verified_at, verified_at)
+
+    def test_activate_user_ignores_read_database(self):
+        """The account is read from the database for writes, because it is
+        modified right away.
+
+        See 'activate_user()'-method."""
+
+        u = get_user_model().objects.create(username='foo', is_active=False)
+
+        form = EmailVerificationForm()
+        form.username = u.username
+
+        # any read from the (not existing) replica would fail
+        with mock.patch.object(router, 'db_for_read', return_value='replica'):
             form.activate_user()
 
+        self.assertTrue(get_user_model().objects.get(username='foo').is_active)
+
+    def test_activate_user_invalid_user(self):
+        """A non-existent user (i.e. a purged account) can not be activated,
+        its token is treated as invalid.
+
+        See 'activate_user()'-method."""
+
+        # this username does not exist
+        form = EmailVerificationForm(data={
+            'token': EnhancedCrypto().get_verification_token(get_user_model()(username='bar')),
+        })
+        self.assertTrue(form.is_valid())
+
+        self.assertIsNone(form.activate_user())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['token'][0].code, 'dae_token_could_not_be_verified')
+
 
 @tag('forms', 'signup')
 class SignupFormTests(AuthEnhancedTestCase):
@@ -367,3 +418,151 @@ class SignupFormTests(AuthEnhancedTestCase):
 
         user = form.save()
         self.assertFalse(user.is_active)
+
+
+@tag('forms', 'signup', 'verification', 'deferred_signup')
+@override_settings(
+    DAE_DEFERRED_SIGNUP=True,
+    DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION,
+    DAE_ADMIN_SIGNUP_NOTIFICATION=False
+)
+class DeferredSignupTests(AuthEnhancedTestCaseBase):
+    """These tests target signups, that are stored as 'PendingSignup' until
+    their email address is verified.
+
+    The app's signal callbacks are required to be connected."""
+
+    def signup(self, username='foo', email='foo@localhost'):
+        """Returns the bound SignupForm."""
+
+        return SignupForm(data={
+            'username': username,
+            'email': email,
+            'password1': 'foo-bar-1234',
+            'password2': 'foo-bar-1234',
+        })
+
+    def verify(self, username='foo'):
+        """Verifies the token of the given username and returns the form."""
+
+        form = EmailVerificationForm(data={
+            'token': EnhancedCrypto().get_verification_token(get_user_model()(username=username)),
+        })
+        self.assertTrue(form.is_valid())
+        form.activate_user()
+        return form
+
+    def test_signup(self):
+        """The signup creates a PendingSignup instead of an account and sends
+        the verification mail."""
+
+        form = self.signup()
+        self.assertTrue(form.is_valid())
+        user = form.save()
+
+        self.assertIsNone(user.pk)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(UserEnhancement.objects.exists())
+
+        pending = PendingSignup.objects.get()
+        self.assertEqual((pending.username, pending.email), ('foo', 'foo@localhost'))
+        self.assertEqual(pending.password, user.password)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['foo@localhost'])
+
+    @override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION)
+    def test_signup_other_modes(self):
+        """Signups are only deferred in 'email-verification' mode."""
+
+        self.signup().save()
+
+        self.assertTrue(get_user_model().objects.filter(username='foo').exists())
+        self.assertFalse(PendingSignup.objects.exists())
+
+    def test_verification(self):
+        """The verification creates the active account with its password and
+        a verified UserEnhancement, without sending another mail."""
+
+        self.signup().save()
+        mail.outbox = []
+
+        form = self.verify()
+
+        user = get_user_model().objects.get(username='foo')
+        self.assertTrue(user.is_active)
+        self.assertEqual(user.email, 'foo@localhost')
+        self.assertTrue(user.check_password('foo-bar-1234'))
+        self.assertTrue(user.enhancement.email_is_verified)
+        self.assertFalse(form.already_verified)
+        self.assertFalse(PendingSignup.objects.exists())
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            VerificationStatusCounter.objects.get(status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED).count,
+            1
+        )
+
+        # the token may be used again
+        self.assertTrue(self.verify().already_verified)
+
+    def test_verification_unknown(self):
+        """Without account or PendingSignup, the token is invalid."""
+
+        self.assertFalse(self.verify('bar').is_valid())
+
+    def test_pending_reserved(self):
+        """Pending usernames and email addresses can not be signed up again,
+        until they expire."""
+
+        self.signup().save()
+
+        form = self.signup(email='bar@localhost')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors().as_data()[0].code, 'username_pending')
+
+        form = self.signup(username='bar')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors().as_data()[0].code, 'email_not_unique')
+
+        PendingSignup.objects.update(created_at=timezone.now() - timedelta(days=1))
+        form = self.signup(username='foo', email='foo@localhost')
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(PendingSignup.objects.count(), 1)
+
+
+@tag('forms', 'query_budget')
+@override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_ADMIN_SIGNUP_NOTIFICATION=False)
+class FormQueryBudgetTests(AuthEnhancedTestCaseBase):
+    """These tests ensure, that the number of queries of the forms does not
+    grow with the number of existing accounts.
+
+    The app's signal callbacks are connected, so their queries are counted."""
+
+    def test_signup(self):
+        """Validating and saving the signup form."""
+
+        def signup(_data):
+            form = SignupForm(data={
+                'username': 'foo',
+                'email': 'foo@localhost',
+                'password1': 'foo-bar-1234',
+                'password2': 'foo-bar-1234',
+            })
+            self.assertTrue(form.is_valid())
+            form.save()
+
+        self.assertQueryBudget(8, signup, prepare=self.create_users)
+
+    def test_activate_user(self):
+        """Validating the verification form and activating the account."""
+
+        def prepare(size):
+            self.create_users(size)
+            return EnhancedCrypto().get_verification_token(get_user_model().objects.get(username='user0'))
+
+        def activate(token):
+            form = EmailVerificationForm(data={'token': token})
+            self.assertTrue(form.is_valid())
+            form.activate_user()
+
+        self.assertQueryBudget(6, activate, prepare=prepare)
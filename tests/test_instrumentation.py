@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Includes tests targeting the app's latency instrumentation.
+
+    - target file: auth_enhanced/instrumentation.py
+    - included tags: 'instrumentation'"""
+
+# Python imports
+from unittest import skip  # noqa
+
+# Django imports
+from django.test import override_settings, tag  # noqa
+
+# app imports
+from auth_enhanced.forms import SignupForm
+from auth_enhanced.instrumentation import (
+    Histogram, HistogramRegistry, latency_measured, registry, timed,
+)
+from auth_enhanced.settings import DAE_CONST_MODE_AUTO_ACTIVATION
+
+# app imports
+from .utils.testcases import AuthEnhancedTestCase, AuthEnhancedTestCaseBase
+
+
+@tag('instrumentation')
+class HistogramTests(AuthEnhancedTestCase):
+    """These tests target the 'Histogram' and the 'HistogramRegistry'."""
+
+    def test_observe(self):
+        """Values are counted in the first bucket, that is not smaller."""
+
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        cumulative, total = histogram.snapshot()
+        self.assertEqual(cumulative, [2, 3, 4])
+        self.assertAlmostEqual(total, 2.65)
+
+    def test_render_prometheus(self):
+        """The histograms are rendered in Prometheus' text format."""
+
+        test_registry = HistogramRegistry(buckets=(0.1, 1.0))
+        test_registry.observe('signup', 0.5)
+        test_registry.observe('signup', 2.0)
+
+        self.assertEqual(
+            test_registry.render_prometheus(),
+            '# HELP dae_operation_duration_seconds Duration of the operations of django-auth_enhanced.\n'
+            '# TYPE dae_operation_duration_seconds histogram\n'
+            'dae_operation_duration_seconds_bucket{operation="signup",le="0.1"} 0\n'
+            'dae_operation_duration_seconds_bucket{operation="signup",le="1.0"} 1\n'
+            'dae_operation_duration_seconds_bucket{operation="signup",le="+Inf"} 2\n'
+            'dae_operation_duration_seconds_sum{operation="signup"} 2.5\n'
+            'dae_operation_duration_seconds_count{operation="signup"} 2\n'
+        )
+
+
+@tag('instrumentation')
+class TimedTests(AuthEnhancedTestCase):
+    """These tests target 'timed()'."""
+
+    def setUp(self):
+        """Starts every test with an empty registry."""
+
+        registry.clear()
+        self.measurements = []
+
+    def receiver(self, sender, name, duration, **kwargs):
+        """Collects the measurements."""
+
+        self.measurements.append((sender, name, duration))
+
+    def test_disabled(self):
+        """Nothing is measured without receivers and histograms."""
+
+        with timed('foo') as timer:
+            self.assertIsNone(timer.start_time)
+
+        self.assertIsNone(registry.get('foo'))
+
+    def test_signal(self):
+        """Measurements are sent as signals."""
+
+        latency_measured.connect(self.receiver)
+        try:
+            with timed('foo'):
+                pass
+            timed('bar')(lambda: None)()
+        finally:
+            latency_measured.disconnect(self.receiver)
+
+        self.assertEqual([m[:2] for m in self.measurements], [('foo', 'foo'), ('bar', 'bar')])
+        self.assertIsNone(registry.get('foo'))
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True)
+    def test_histograms(self):
+        """Measurements are observed by the registry, if enabled, even if the
+        operation fails."""
+
+        @timed('foo')
+        def fail():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            fail()
+
+        self.assertEqual(registry.get('foo').snapshot()[0][-1], 1)
+
+
+@tag('instrumentation')
+class InstrumentedSignupTests(AuthEnhancedTestCaseBase):
+    """These tests target the instrumentation of the app's hot paths, with
+    the app's signal callbacks connected."""
+
+    def setUp(self):
+        """Starts every test with an empty registry."""
+
+        registry.clear()
+
+    @override_settings(
+        DAE_LATENCY_HISTOGRAMS=True,
+        DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION
+    )
+    def test_signup(self):
+        """A signup measures the form, the password hashing and the
+        'post_save'-callbacks."""
+
+        form = SignupForm(data={
+            'username': 'django',
+            'password1': 'foo-bar-1234',
+            'password2': 'foo-bar-1234',
+        })
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        self.assertEqual(registry.get('signup').snapshot()[0][-1], 1)
+        for name in ('password_hashing', 'create_enhancement', 'count_status', 'invalidate_status'):
+            self.assertIsNotNone(registry.get(name), name)
@@ -2,21 +2,30 @@
 """Includes tests targeting the app-specific models.
 
     - target file: auth_enhanced/models.py
-    - included tags: 'models', 'signals'"""
+    - included tags: 'counters', 'models', 'signals'"""
 
 # Python imports
 from unittest import skip  # noqa
 
 # Django imports
+from django import VERSION as DJANGO_VERSION
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.test import override_settings, tag  # noqa
 
 # app imports
-from auth_enhanced.models import UserEnhancement
+from auth_enhanced.models import UserEnhancement, VerificationStatusCounter
 
 # app imports
 from .utils.testcases import AuthEnhancedTestCase, AuthEnhancedTestCaseBase
 
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
 
 @tag('models')
 class UserEnhancementTests(AuthEnhancedTestCaseBase):
@@ -34,9 +43,16 @@ class UserEnhancementTests(AuthEnhancedTestCaseBase):
         # create a User-object; post_save will create a UserEnhancement automatically
         u = get_user_model().objects.create(username='foo')
 
-        # the UserEnhancement-object will be created with 'email_verification_status'
-        #   set to 'EMAIL_VERIFICATION_FAILED', which should be evaluated as
-        #   'False'
+        # the test settings use 'DAE_CONST_MODE_EMAIL_ACTIVATION', so the
+        #   verification mail has already been sent and the UserEnhancement-
+        #   object is 'EMAIL_VERIFICATION_IN_PROGRESS', which should be
+        #   evaluated as 'False'
+        self.assertEqual(u.enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS)
+        self.assertFalse(u.enhancement.email_is_verified)
+
+        # manually update 'email_verification_status', but should still be
+        #   considered 'False'
+        u.enhancement.email_verification_status = UserEnhancement.EMAIL_VERIFICATION_FAILED
         self.assertEqual(u.enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_FAILED)
         self.assertFalse(u.enhancement.email_is_verified)
 
@@ -51,6 +67,21 @@ class UserEnhancementTests(AuthEnhancedTestCaseBase):
         self.assertEqual(u.enhancement.email_verification_status, UserEnhancement.EMAIL_VERIFICATION_COMPLETED)
         self.assertTrue(u.enhancement.email_is_verified)
 
+    def test_pending_verification_index(self):
+        """The status column is indexed, restricted to pending verifications.
+
+        See 'pending_verification_index()'-function."""
+
+        indexes = [i for i in UserEnhancement._meta.indexes if i.name == 'dae_ue_pending_status_idx']
+        self.assertEqual(len(indexes), 1)
+        self.assertEqual(indexes[0].fields, ['email_verification_status'])
+
+        if DJANGO_VERSION >= (2, 2):
+            self.assertEqual(
+                indexes[0].condition,
+                ~Q(email_verification_status=UserEnhancement.EMAIL_VERIFICATION_COMPLETED)
+            )
+
 
 @tag('models', 'signals')
 class UserEnhancementTestsDisabledSignalHandler(AuthEnhancedTestCase):
@@ -140,3 +171,158 @@ class UserEnhancementTestsDisabledSignalHandler(AuthEnhancedTestCase):
                 None,                                                       # noqa
                 True,                                                       # noqa
             )                                                               # noqa
+
+
+@tag('models', 'signals', 'counters')
+class VerificationStatusCounterTests(AuthEnhancedTestCaseBase):
+    """Tests targeting the maintained per-status counters.
+
+    The app's signal callbacks are required to be connected."""
+
+    FAILED = UserEnhancement.EMAIL_VERIFICATION_FAILED
+    IN_PROGRESS = UserEnhancement.EMAIL_VERIFICATION_IN_PROGRESS
+    COMPLETED = UserEnhancement.EMAIL_VERIFICATION_COMPLETED
+
+    def assertCounts(self, failed, in_progress, completed):
+        """Asserts the current value of all counters."""
+
+        self.assertEqual(
+            VerificationStatusCounter.get_counts(),
+            {self.FAILED: failed, self.IN_PROGRESS: in_progress, self.COMPLETED: completed}
+        )
+
+    def _create_enhancements(self, number):
+        """Creates users and returns their (freshly loaded) enhancements."""
+
+        users = [get_user_model().objects.create(username='foo{}'.format(i)) for i in range(number)]
+        return list(UserEnhancement.objects.filter(user__in=users).order_by('pk'))
+
+    def test_no_counters(self):
+        """All known statuses are reported, even without counters."""
+
+        self.assertCounts(0, 0, 0)
+
+    def test_create_and_transition(self):
+        """Creating and saving UserEnhancements updates the counters.
+
+        The test settings use email activation, so every new user is
+        'in progress'."""
+
+        enhancements = self._create_enhancements(2)
+        self.assertCounts(0, 2, 0)
+
+        enhancements[0].email_verification_status = self.COMPLETED
+        enhancements[0].save()
+        self.assertCounts(0, 1, 1)
+
+        # saving without a transition does not change anything
+        enhancements[0].save()
+        self.assertCounts(0, 1, 1)
+
+    def test_transition_unknown_status(self):
+        """The stored status is looked up, if the object was not loaded from
+        the database."""
+
+        enhancement = self._create_enhancements(1)[0]
+
+        UserEnhancement(
+            pk=enhancement.pk,
+            user_id=enhancement.user_id,
+            email_verification_status=self.COMPLETED
+        ).save()
+        self.assertCounts(0, 0, 1)
+
+    def test_delete(self):
+        """Deleting UserEnhancements (directly or by cascade) updates the
+        counters."""
+
+        enhancements = self._create_enhancements(3)
+
+        enhancements[0].delete()
+        self.assertCounts(0, 2, 0)
+
+        get_user_model().objects.filter(pk=enhancements[1].user_id).delete()
+        self.assertCounts(0, 1, 0)
+
+    def test_update_status(self):
+        """Bulk transitions update the counters.
+
+        See 'UserEnhancementQuerySet.update_status()'."""
+
+        self._create_enhancements(3)
+
+        updated = UserEnhancement.objects.all().update_status(self.COMPLETED)
+        self.assertEqual(updated, 3)
+        self.assertCounts(0, 0, 3)
+
+        # objects, that already have the target status, are not counted
+        self.assertEqual(UserEnhancement.objects.all().update_status(self.COMPLETED), 0)
+        self.assertCounts(0, 0, 3)
+
+    def test_batched(self):
+        """Within a batch, the counters are updated only once."""
+
+        enhancements = self._create_enhancements(3)
+
+        with self.assertNumQueries(1):
+            with VerificationStatusCounter.batched():
+                VerificationStatusCounter.callback_status_post_delete(UserEnhancement, enhancements[0])
+                VerificationStatusCounter.callback_status_post_delete(UserEnhancement, enhancements[1])
+
+                # nested batches are merged
+                with VerificationStatusCounter.batched():
+                    VerificationStatusCounter.callback_status_post_delete(UserEnhancement, enhancements[2])
+
+        self.assertCounts(0, 0, 0)
+
+    def test_using(self):
+        """The counters are written to the database of the UserEnhancements,
+        also by the signal callbacks and by 'update_status()'."""
+
+        enhancements = self._create_enhancements(2)
+
+        with mock.patch.object(VerificationStatusCounter, 'adjust') as mocked_adjust:
+            enhancements[0].email_verification_status = self.COMPLETED
+            enhancements[0].save()
+            UserEnhancement.objects.filter(pk=enhancements[1].pk).update_status(self.FAILED)
+            enhancements[1].delete()
+
+        self.assertEqual(
+            [c[1] for c in mocked_adjust.call_args_list],
+            [{'using': 'default'}, {'using': 'default'}, {'using': 'default'}]
+        )
+
+    def test_batched_using(self):
+        """Batched deltas are applied to the database, they were adjusted on."""
+
+        # the counter exists, so no transaction is started on 'other'
+        VerificationStatusCounter.objects.create(status=self.FAILED)
+        db_manager = VerificationStatusCounter.objects.db_manager
+        aliases = []
+
+        def record_db_manager(using):
+            # there is only one test database
+            aliases.append(using)
+            return db_manager('default')
+
+        with mock.patch.object(VerificationStatusCounter.objects, 'db_manager', side_effect=record_db_manager):
+            with VerificationStatusCounter.batched():
+                VerificationStatusCounter.adjust({self.FAILED: 1}, using='default')
+                VerificationStatusCounter.adjust({self.FAILED: 1}, using='other')
+
+        self.assertEqual(sorted(aliases), ['default', 'other'])
+        self.assertCounts(2, 0, 0)
+
+    def test_recount(self):
+        """Counters, that are out of sync, are rebuilt."""
+
+        self._create_enhancements(3)
+        UserEnhancement.objects.filter(pk__in=UserEnhancement.objects.all()[:1]).update(
+            email_verification_status=self.COMPLETED
+        )
+        VerificationStatusCounter.objects.all().delete()
+
+        counts = VerificationStatusCounter.recount(chunk_size=2)
+
+        self.assertEqual(counts, {self.FAILED: 0, self.IN_PROGRESS: 2, self.COMPLETED: 1})
+        self.assertCounts(0, 2, 1)
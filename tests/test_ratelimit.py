@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Includes tests targeting the app's rate limits.
+
+    - target file: auth_enhanced/ratelimit.py
+    - included tags: 'ratelimit'"""
+
+# Python imports
+from unittest import skip  # noqa
+
+# Django imports
+from django.core.cache import cache
+from django.test import override_settings, tag  # noqa
+
+# app imports
+from auth_enhanced.exceptions import AuthEnhancedRateLimitExceeded
+from auth_enhanced.ratelimit import check_rate_limit
+
+# app imports
+from .utils.testcases import AuthEnhancedTestCase
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
+
+@tag('ratelimit')
+@override_settings(DAE_RATE_LIMITS={'login': {'ip': '3/m', 'identity': '2/h'}})
+class CheckRateLimitTests(AuthEnhancedTestCase):
+    """These tests target 'check_rate_limit()'."""
+
+    def setUp(self):
+        """Starts every test with empty counters."""
+
+        cache.clear()
+
+    @override_settings(DAE_RATE_LIMITS=False)
+    @mock.patch('auth_enhanced.ratelimit.increment')
+    def test_disabled(self, mock_increment):
+        """Without limits, no requests are counted."""
+
+        for i in range(10):
+            check_rate_limit('login', '127.0.0.1', 'django')
+
+        self.assertFalse(mock_increment.called)
+
+    def test_identity(self):
+        """The identity is limited independently of the address and is
+        normalised."""
+
+        check_rate_limit('login', '10.0.0.1', 'django')
+        check_rate_limit('login', '10.0.0.2', ' Django ')
+
+        with self.assertRaises(AuthEnhancedRateLimitExceeded) as cm:
+            check_rate_limit('login', '10.0.0.3', 'DJANGO')
+        self.assertTrue(0 < cm.exception.retry_after <= 3600)
+
+        # other identities and endpoints are not affected
+        check_rate_limit('login', '10.0.0.3', 'foo')
+        check_rate_limit('signup', '10.0.0.3', 'django')
+
+    def test_ip(self):
+        """The address is limited, even without identity."""
+
+        for username in ('foo', 'bar', None):
+            check_rate_limit('login', '127.0.0.1', username)
+
+        with self.assertRaises(AuthEnhancedRateLimitExceeded) as cm:
+            check_rate_limit('login', '127.0.0.1', None)
+        self.assertTrue(0 < cm.exception.retry_after <= 60)
+
+    @mock.patch('auth_enhanced.ratelimit.time')
+    def test_window(self, mock_time):
+        """The counters are reset with every window."""
+
+        mock_time.return_value = 120.0
+        for i in range(3):
+            check_rate_limit('login', '127.0.0.1')
+        with self.assertRaises(AuthEnhancedRateLimitExceeded) as cm:
+            check_rate_limit('login', '127.0.0.1')
+        self.assertEqual(cm.exception.retry_after, 61)
+
+        mock_time.return_value = 180.0
+        check_rate_limit('login', '127.0.0.1')
@@ -17,7 +17,10 @@ from django.test import override_settings, tag  # noqa
 
 # app imports
 from auth_enhanced.exceptions import AuthEnhancedConversionError
-from auth_enhanced.settings import convert_to_seconds, inject_setting
+from auth_enhanced.settings import (
+    DAE_CONST_MODE_MANUAL_ACTIVATION, DAE_CONST_VERIFICATION_TOKEN_MAX_AGE,
+    convert_rate, convert_to_seconds, get_app_settings, inject_setting,
+)
 
 # app imports
 from .utils.testcases import AuthEnhancedTestCase
@@ -64,6 +67,26 @@ class ConvertToSecondsTests(AuthEnhancedTestCase):
             convert_to_seconds('food')
 
 
+@tag('settings')
+class ConvertRateTests(AuthEnhancedTestCase):
+    """These tests target the function 'convert_rate()'."""
+
+    def test_value_units(self):
+        """Periods are given in seconds, minutes, hours or days."""
+
+        self.assertEqual(convert_rate('5/s'), (5, 1))
+        self.assertEqual(convert_rate('10/m'), (10, 60))
+        self.assertEqual(convert_rate('100/15m'), (100, 900))
+        self.assertEqual(convert_rate('1000/d'), (1000, 86400))
+
+    def test_value_invalid(self):
+        """Invalid rates raise an exception."""
+
+        for value in ('10', '10/', '10/x', 'a/m', '0/m', '10/0m', 10):
+            with self.assertRaises(AuthEnhancedConversionError):
+                convert_rate(value)
+
+
 @tag('settings')
 class InjectSettingTests(AuthEnhancedTestCase):
     """These tests target 'inject_setting()'."""
@@ -87,3 +110,63 @@ class InjectSettingTests(AuthEnhancedTestCase):
 
         inject_setting('FOO', 'bar')
         self.assertEqual(settings.FOO, 'bar')
+
+
+@tag('settings')
+class AppSettingsTests(AuthEnhancedTestCase):
+    """These tests target the parsed app settings ('get_app_settings()')."""
+
+    def test_immutable(self):
+        """The app settings can not be modified."""
+
+        with self.assertRaises(AttributeError):
+            get_app_settings().salt = 'foo'
+
+    def test_refreshed_on_setting_changed(self):
+        """The app settings follow changes of the project's settings."""
+
+        with override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_MANUAL_ACTIVATION):
+            self.assertEqual(get_app_settings().operation_mode, DAE_CONST_MODE_MANUAL_ACTIVATION)
+
+        self.assertEqual(get_app_settings().operation_mode, settings.DAE_OPERATION_MODE)
+
+    @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=(
+        ('django', 'django@localhost', ('mail', )),
+        ('foo', 'foo@localhost', ('foo', )),
+    ))
+    def test_admin_notification_recipients(self):
+        """The recipients of notification mails are determined in advance."""
+
+        self.assertEqual(get_app_settings().admin_signup_notification_recipients, (('django', 'django@localhost'), ))
+
+    @override_settings(DAE_ADMIN_SIGNUP_NOTIFICATION=(('foo', ), ))
+    def test_admin_notification_invalid(self):
+        """Invalid values are replaced by empty tuples, the app's checks will
+        report them."""
+
+        self.assertEqual(get_app_settings().admin_signup_notification, ())
+        self.assertEqual(get_app_settings().admin_signup_notification_recipients, ())
+
+    @override_settings(DAE_VERIFICATION_TOKEN_MAX_AGE='2h')
+    def test_max_age_converted(self):
+        """Time strings are converted to seconds."""
+
+        self.assertEqual(get_app_settings().verification_token_max_age, 7200)
+
+    @override_settings(DAE_VERIFICATION_TOKEN_MAX_AGE='foo')
+    def test_max_age_fallback(self):
+        """Invalid time strings are replaced by the default value."""
+
+        self.assertEqual(get_app_settings().verification_token_max_age, DAE_CONST_VERIFICATION_TOKEN_MAX_AGE)
+
+    @override_settings(DAE_RATE_LIMITS={'login': {'ip': '30/m', 'identity': '10/15m'}})
+    def test_rate_limits_parsed(self):
+        """The rates are converted and sorted by scope."""
+
+        self.assertEqual(get_app_settings().rate_limits, {'login': (('identity', 10, 900), ('ip', 30, 60))})
+
+    @override_settings(DAE_RATE_LIMITS={'login': {'ip': 'foo'}})
+    def test_rate_limits_invalid(self):
+        """Invalid rate limits are not applied, the checks report them."""
+
+        self.assertEqual(get_app_settings().rate_limits, {})
@@ -29,7 +29,7 @@ class UrlTests(AEUrlTestCase):
         url = reverse('auth_enhanced:login')
         self.assertEqual(url, '/login/')
 
-        self.assertCBVName('LoginView', module='django.contrib.auth.views', url=url)
+        self.assertCBVName('LoginView', url=url)
 
     def test_logout_url(self):
         """Can the URL be retrieved by its name and is the right function used?"""
@@ -49,6 +49,15 @@ class UrlTests(AEUrlTestCase):
 
         self.assertCBVName('SignupView', module='auth_enhanced.views', url=url)
 
+    def test_verify_email_status_url(self):
+        """Can the URL be retrieved by its name and is the right function used?"""
+
+        # get the URL by its name
+        url = reverse('auth_enhanced:email-verification-status')
+        self.assertEqual(url, '/verify-email/status/')
+
+        self.assertCBVName('EmailVerificationStatusView', url=url)
+
     def test_verify_email_url_no_token(self):
         """Can the URL be retrieved by its name and is the right function used?"""
 
@@ -2,7 +2,8 @@
 """Includes tests targeting the app's views.
 
     - target file: auth_enhanced/views.py
-    - included tags: 'verification', 'views'"""
+    - included tags: 'auto_login', 'instrumentation', 'query_budget',
+        'ratelimit', 'verification', 'verification_status', 'views'"""
 
 
 # Python imports
@@ -10,15 +11,27 @@ from unittest import skip  # noqa
 
 # Django imports
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
 from django.test import RequestFactory, override_settings, tag  # noqa
+from django.urls import reverse
 
 # app imports
+from auth_enhanced.crypto import EnhancedCrypto
 from auth_enhanced.exceptions import AuthEnhancedException
 from auth_enhanced.forms import EmailVerificationForm
-from auth_enhanced.views import EmailVerificationView
+from auth_enhanced.instrumentation import PROMETHEUS_CONTENT_TYPE
+from auth_enhanced.models import UserEnhancement
+from auth_enhanced.settings import (
+    DAE_CONST_MODE_AUTO_ACTIVATION, DAE_CONST_MODE_EMAIL_ACTIVATION,
+    DAE_CONST_SIGNUP_COOKIE_NAME,
+)
+from auth_enhanced.views import EmailVerificationView, MetricsView
 
 # app imports
-from .utils.testcases import AuthEnhancedTestCase
+from .utils.testcases import AuthEnhancedTestCase, AuthEnhancedTestCaseBase
 
 try:
     # Python 3
@@ -95,6 +108,16 @@ class EmailVerificationViewTests(AuthEnhancedTestCase):
         with self.assertRaises(get_user_model().DoesNotExist):
             view.form_valid(view.get_form())
 
+    def test_form_valid_missing_user(self):
+        """A valid token of a deleted (i.e. purged) account shows the form
+        with an error."""
+
+        token = EnhancedCrypto().get_verification_token(get_user_model()(username='bar'))
+        response = self.client.post(reverse('auth_enhanced:email-verification'), data={'token': token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.context['form'].errors)
+
     @mock.patch('auth_enhanced.forms.EmailVerificationForm.is_valid', MockEmailVerificationForm.is_valid_true)
     @mock.patch('auth_enhanced.views.EmailVerificationView.form_valid')
     def test_get_verification_token_valid(self, mock_func):
@@ -143,3 +166,313 @@ class EmailVerificationViewTests(AuthEnhancedTestCase):
         view.get(RequestFactory().get('/foo/'))
 
         self.assertTrue(mock_func)
+
+
+@tag('views', 'instrumentation')
+class MetricsViewTests(AuthEnhancedTestCase):
+    """These tests target the 'MetricsView'"""
+
+    def get_metrics(self, user=None, **extra):
+        """Requests the metrics, from the local host, as 'user'."""
+
+        request = RequestFactory().get('/foo/', REMOTE_ADDR='127.0.0.1', **extra)
+        request.user = user or AnonymousUser()
+        return MetricsView.as_view()(request)
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True)
+    def test_get(self):
+        """The histograms are rendered for staff members."""
+
+        response = self.get_metrics(get_user_model()(username='foo', is_staff=True))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], PROMETHEUS_CONTENT_TYPE)
+        self.assertIn(b'# TYPE dae_operation_duration_seconds histogram', response.content)
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True)
+    def test_get_not_staff(self):
+        """Other users are rejected, even from the local host (i.e. behind a
+        reverse proxy)."""
+
+        with self.assertRaises(PermissionDenied):
+            self.get_metrics()
+
+        with self.assertRaises(PermissionDenied):
+            self.get_metrics(get_user_model()(username='foo'))
+
+        with self.assertRaises(PermissionDenied):
+            self.get_metrics(get_user_model()(username='foo', is_staff=True, is_active=False))
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True, DAE_METRICS_TOKEN='secret')
+    def test_get_token(self):
+        """Clients without a session (i.e. Prometheus) may send the token."""
+
+        response = self.get_metrics(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], PROMETHEUS_CONTENT_TYPE)
+
+        for authorization in ('Bearer wrong', 'Basic secret', 'Bearer ', None):
+            extra = {'HTTP_AUTHORIZATION': authorization} if authorization is not None else {}
+            with self.assertRaises(PermissionDenied):
+                self.get_metrics(**extra)
+
+        # staff members do not need the token
+        response = self.get_metrics(get_user_model()(username='foo', is_staff=True))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DAE_LATENCY_HISTOGRAMS=True)
+    def test_get_token_disabled(self):
+        """Without 'DAE_METRICS_TOKEN', no token is accepted."""
+
+        with self.assertRaises(PermissionDenied):
+            self.get_metrics(HTTP_AUTHORIZATION='Bearer ')
+
+    def test_get_disabled(self):
+        """The view is not available, if the histograms are disabled."""
+
+        with self.assertRaises(Http404):
+            self.get_metrics()
+
+
+@tag('views', 'auto_login')
+@override_settings(DAE_AUTO_LOGIN=True, LOGIN_REDIRECT_URL='/foo/')
+class AutoLoginTests(AuthEnhancedTestCaseBase):
+    """These tests target the sessions, that are started by 'SignupView' and
+    'EmailVerificationView', if 'DAE_AUTO_LOGIN' is set."""
+
+    def signup(self):
+        """Posts the signup form and returns the response."""
+
+        return self.client.post(reverse('auth_enhanced:signup'), data={
+            'username': 'foo',
+            'email': 'foo@localhost',
+            'password1': 'foo-bar-1234',
+            'password2': 'foo-bar-1234',
+        })
+
+    @override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION)
+    def test_signup(self):
+        """New accounts are logged in and redirected to 'LOGIN_REDIRECT_URL'."""
+
+        response = self.signup()
+        self.assertRedirects(response, '/foo/', fetch_redirect_response=False)
+        self.assertEqual(
+            self.client.session['_auth_user_id'],
+            str(get_user_model().objects.get(username='foo').pk)
+        )
+
+    @override_settings(DAE_AUTO_LOGIN=False, DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION)
+    def test_signup_disabled(self):
+        """Without 'DAE_AUTO_LOGIN', new accounts are redirected to the login."""
+
+        response = self.signup()
+        self.assertRedirects(response, reverse('auth_enhanced:login'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    @override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_ADMIN_SIGNUP_NOTIFICATION=False)
+    def test_signup_email_verification(self):
+        """Accounts, that have to verify their email address, are not logged
+        in by the signup."""
+
+        response = self.signup()
+        self.assertRedirects(response, reverse('auth_enhanced:login'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    @override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_ADMIN_SIGNUP_NOTIFICATION=False)
+    def test_verification(self):
+        """The first use of a verification token logs the account in, later
+        uses of the same token do not."""
+
+        self.signup()
+        user = get_user_model().objects.get(username='foo')
+        url = reverse('auth_enhanced:email-verification', args=(EnhancedCrypto().get_verification_token(user), ))
+
+        response = self.client.get(url)
+        self.assertRedirects(response, '/foo/', fetch_redirect_response=False)
+        self.assertEqual(self.client.session['_auth_user_id'], str(user.pk))
+
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse('auth_enhanced:login'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+@tag('views', 'verification_status')
+@override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_ADMIN_SIGNUP_NOTIFICATION=False)
+class EmailVerificationStatusViewTests(AuthEnhancedTestCaseBase):
+    """These tests target the 'EmailVerificationStatusView'.
+
+    The app's signal callbacks are required to be connected."""
+
+    def setUp(self):
+        """Signs up a new account, that waits for its verification."""
+
+        cache.clear()
+        self.url = reverse('auth_enhanced:email-verification-status')
+        self.client.post(reverse('auth_enhanced:signup'), data={
+            'username': 'foo',
+            'email': 'foo@localhost',
+            'password1': 'foo-bar-1234',
+            'password2': 'foo-bar-1234',
+        })
+        self.user = get_user_model().objects.get(username='foo')
+
+    def test_get(self):
+        """The new account is identified by its cookie and the response
+        carries validators."""
+
+        self.assertIn(DAE_CONST_SIGNUP_COOKIE_NAME, self.client.cookies)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'email_verification_status': 'in-progress', 'email_is_verified': False})
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_not_modified(self):
+        """Unchanged states are answered with 304, without any query."""
+
+        response = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        not_modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_verified(self):
+        """A verification changes the validators."""
+
+        response = self.client.get(self.url)
+
+        # the cached status is invalidated on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse(
+                'auth_enhanced:email-verification',
+                args=(EnhancedCrypto().get_verification_token(self.user), )
+            ))
+
+        verified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(verified.status_code, 200)
+        self.assertTrue(verified.json()['email_is_verified'])
+        self.assertNotEqual(verified['ETag'], response['ETag'])
+
+    def test_logged_in(self):
+        """Logged in users get their own status."""
+
+        self.client.cookies.pop(DAE_CONST_SIGNUP_COOKIE_NAME)
+        user = get_user_model().objects.create(username='bar')
+        UserEnhancement.objects.filter(user=user).update_status(UserEnhancement.EMAIL_VERIFICATION_COMPLETED)
+        self.client.force_login(user)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['email_verification_status'], 'completed')
+
+    def test_unknown(self):
+        """Without a valid cookie, there is no status."""
+
+        self.client.cookies[DAE_CONST_SIGNUP_COOKIE_NAME] = '{}:foo:bar'.format(self.user.pk)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.cookies.pop(DAE_CONST_SIGNUP_COOKIE_NAME)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@tag('views', 'ratelimit')
+@override_settings(DAE_RATE_LIMITS={
+    'login': {'ip': '3/m', 'identity': '2/m'},
+    'signup': {'ip': '1/m'},
+    'verification': {'identity': '1/m'},
+})
+class RateLimitMixinTests(AuthEnhancedTestCase):
+    """These tests target the rate limits of the views."""
+
+    def setUp(self):
+        """Starts every test with empty counters."""
+
+        cache.clear()
+
+    def test_login(self):
+        """Logins are limited by address and by username."""
+
+        url = reverse('auth_enhanced:login')
+        for i in range(2):
+            response = self.client.post(url, data={'username': 'django', 'password': 'foo'})
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(url, data={'username': 'django', 'password': 'foo'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+        response = self.client.post(url, data={'username': 'foo', 'password': 'foo'})
+        self.assertEqual(response.status_code, 429)
+
+        # the form is still shown
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @mock.patch('auth_enhanced.views.SignupView.post')
+    def test_signup(self, mock_post):
+        """Rejected signups are not processed at all."""
+
+        mock_post.return_value = HttpResponse()
+
+        url = reverse('auth_enhanced:signup')
+        self.assertEqual(self.client.post(url, data={'username': 'foo'}).status_code, 200)
+        self.assertEqual(self.client.post(url, data={'username': 'bar'}).status_code, 429)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @mock.patch('auth_enhanced.crypto.EnhancedCrypto.verify_token')
+    def test_verification(self, mock_verify):
+        """Tokens are limited by the signed username, without verifying them."""
+
+        mock_verify.side_effect = EnhancedCrypto.EnhancedCryptoException('bar')
+
+        response = self.client.get(reverse('auth_enhanced:email-verification', args=('django:foo:bar', )))
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(reverse('auth_enhanced:email-verification'), data={'token': 'django:foo:baz'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(mock_verify.call_count, 1)
+
+        # other accounts are not affected
+        response = self.client.get(reverse('auth_enhanced:email-verification', args=('foo:foo:bar', )))
+        self.assertEqual(response.status_code, 302)
+
+
+@tag('views', 'query_budget')
+@override_settings(DAE_OPERATION_MODE=DAE_CONST_MODE_EMAIL_ACTIVATION, DAE_ADMIN_SIGNUP_NOTIFICATION=False)
+class ViewQueryBudgetTests(AuthEnhancedTestCaseBase):
+    """These tests ensure, that the number of queries of the views does not
+    grow with the number of existing accounts.
+
+    The requests pass the whole middleware stack and the app's signal
+    callbacks are connected, so all queries are counted."""
+
+    def test_signup_view(self):
+        """Posting the signup form."""
+
+        def signup(_data):
+            response = self.client.post(reverse('auth_enhanced:signup'), data={
+                'username': 'foo',
+                'email': 'foo@localhost',
+                'password1': 'foo-bar-1234',
+                'password2': 'foo-bar-1234',
+            })
+            self.assertEqual(response.status_code, 302)
+
+        self.assertQueryBudget(8, signup, prepare=self.create_users)
+
+    def test_email_verification_view(self):
+        """Following the link of the verification mail."""
+
+        def prepare(size):
+            self.create_users(size)
+            return EnhancedCrypto().get_verification_token(get_user_model().objects.get(username='user0'))
+
+        def verify(token):
+            response = self.client.get(reverse('auth_enhanced:email-verification', args=(token, )))
+            self.assertEqual(response.status_code, 302)
+
+        self.assertQueryBudget(6, verify, prepare=prepare)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Includes tests targeting the app's warmup routine.
+
+    - target file: auth_enhanced/warmup.py
+    - included tags: 'warmup'"""
+
+# Python imports
+from unittest import skip  # noqa
+
+# Django imports
+from django.core.management import call_command
+from django.template.exceptions import TemplateDoesNotExist
+from django.test import override_settings, tag  # noqa
+
+# app imports
+from auth_enhanced.settings import DAE_CONST_MODE_AUTO_ACTIVATION
+from auth_enhanced.warmup import WARMUP_STEPS, warmup
+
+# app imports
+from .utils.testcases import AuthEnhancedTestCase
+
+try:
+    # Python 2.7 has to come before Python 3!
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2.7
+    import mock
+
+
+@tag('warmup')
+class WarmupTests(AuthEnhancedTestCase):
+    """These tests target the 'warmup()'-function."""
+
+    def test_all_steps(self):
+        """By default, all steps are run and timed."""
+
+        durations = warmup()
+        self.assertEqual(list(durations), list(WARMUP_STEPS))
+        for duration in durations.values():
+            self.assertGreaterEqual(duration, 0)
+
+    def test_selected_steps(self):
+        """Only the given steps are run."""
+
+        self.assertEqual(list(warmup(['signer'])), ['signer'])
+
+    @override_settings(DAE_EMAIL_TEMPLATE_PREFIX='foo')
+    def test_missing_templates(self):
+        """Missing mail templates are reported."""
+
+        with self.assertRaises(TemplateDoesNotExist):
+            warmup(['mail-templates'])
+
+    @mock.patch('auth_enhanced.warmup.get_template')
+    def test_mail_templates(self, mocked_get_template):
+        """The text and html templates of all mails are loaded."""
+
+        warmup(['mail-templates'])
+        loaded = [c[0][0] for c in mocked_get_template.call_args_list]
+        self.assertIn('auth_enhanced/mail/user_email_verification.txt', loaded)
+        self.assertIn('auth_enhanced/mail/admin_signup_notification.html', loaded)
+
+    @override_settings(
+        DAE_OPERATION_MODE=DAE_CONST_MODE_AUTO_ACTIVATION,
+        DAE_ADMIN_SIGNUP_NOTIFICATION=False,
+        DAE_EMAIL_TEMPLATE_PREFIX='foo'
+    )
+    def test_mail_templates_not_sent(self):
+        """Templates of mails, that are not sent, are not loaded, so a missing
+        template is not reported."""
+
+        with mock.patch('auth_enhanced.warmup.get_template') as mocked_get_template:
+            warmup(['mail-templates'])
+        self.assertFalse(mocked_get_template.called)
+
+        # the real template loader does not complain either
+        warmup(['mail-templates'])
+
+    def test_command(self):
+        """The command reports the duration of all steps."""
+
+        out = StringIO()
+
+        call_command('authenhanced', 'warmup', stdout=out)
+        for name in WARMUP_STEPS:
+            self.assertIn(name, out.getvalue())
+        self.assertIn('Warmup finished', out.getvalue())
@@ -29,7 +29,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': join(TEST_ROOT, 'test.sqlite'),
-    }
+    },
+    # a read replica, i.e. for 'DAE_READ_DATABASE'. During tests, it is a
+    #   mirror of 'default'.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': join(TEST_ROOT, 'test.sqlite'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
 # minimum installed apps to make the app work
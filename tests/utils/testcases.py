@@ -1,25 +1,119 @@
 # -*- coding: utf-8 -*-
 """Contains base classes for test cases"""
 
+# Python imports
+from contextlib import contextmanager
+
 # Django imports
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
-from django.test import TestCase
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve
 
 # app imports
+from auth_enhanced.cache import callback_invalidate_status
 from auth_enhanced.email import (
     callback_admin_information_new_signup,
     callback_user_signup_email_verification,
 )
-from auth_enhanced.models import UserEnhancement
+from auth_enhanced.models import UserEnhancement, VerificationStatusCounter
 from auth_enhanced.settings import DAE_CONST_MODE_EMAIL_ACTIVATION
 
 
 class AuthEnhancedTestCaseBase(TestCase):
     """Base class for all tests of django-auth_enhanced app."""
 
+    def assertQueryBudget(self, budget, func, prepare=None, sizes=(10, 1000), using=DEFAULT_DB_ALIAS):
+        """Asserts, that 'func' executes at most 'budget' queries and that the
+        number of queries does not depend on the size of its input.
+
+        For every size, 'prepare(size)' builds the input (i.e. creates 'size'
+        users) and 'func' is called with its result (or with the size, if
+        'prepare' is not given). Only the queries of 'func' are counted. The
+        database changes of every size are rolled back.
+
+        On failure, the captured SQL is included in the message."""
+
+        counts = []
+        for size in sizes:
+            with transaction.atomic(using=using):
+                data = prepare(size) if prepare else size
+                with CaptureQueriesContext(connections[using]) as context:
+                    func(data)
+                transaction.set_rollback(True, using=using)
+
+            queries = [q['sql'] for q in context.captured_queries]
+            counts.append(len(queries))
+
+            if len(queries) > budget:
+                self.fail(self._format_queries(
+                    '{} queries executed with size {}, the budget is {}'.format(len(queries), size, budget),
+                    queries
+                ))
+
+            if len(queries) != counts[0]:
+                self.fail(self._format_queries(
+                    'The number of queries depends on the size of the input: {}'.format(
+                        ', '.join('{} queries with size {}'.format(c, s) for c, s in zip(counts, sizes))
+                    ),
+                    queries
+                ))
+
+    @staticmethod
+    def create_users(size, verification_status=None, **user_kwargs):
+        """Creates 'size' accounts ('user0', 'user1', ...) with enhancements,
+        rebuilds the counters and returns the accounts.
+
+        'user_kwargs' are passed to the user model (i.e. 'is_superuser=True'),
+        'verification_status' is applied to the enhancements."""
+
+        user_model = get_user_model()
+        user_model.objects.bulk_create([
+            user_model(username='user{}'.format(i), email='user{}@localhost'.format(i), **user_kwargs)
+            for i in range(size)
+        ])
+        users = list(user_model.objects.filter(username__startswith='user').order_by('pk'))
+
+        enhancement_kwargs = {}
+        if verification_status is not None:
+            enhancement_kwargs['email_verification_status'] = verification_status
+        UserEnhancement.objects.bulk_create([UserEnhancement(user=u, **enhancement_kwargs) for u in users])
+        VerificationStatusCounter.recount()
+
+        return users
+
+    @classmethod
+    @contextmanager
+    def captureOnCommitCallbacks(cls, using=DEFAULT_DB_ALIAS, execute=False):
+        """Captures the 'transaction.on_commit()'-callbacks, that are
+        registered inside the context, and optionally runs them on exit.
+
+        The test's transaction is never committed, so these callbacks would
+        not be run otherwise. This mimics the method of Django 3.2's
+        'TestCase'."""
+
+        callbacks = []
+        start_count = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            callbacks[:] = [func for _sids, func in connections[using].run_on_commit[start_count:]]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
+    @staticmethod
+    def _format_queries(message, queries):
+        """Appends the numbered queries to the message."""
+
+        return '{}\n{}'.format(
+            message,
+            '\n'.join('{}. {}'.format(i, sql) for i, sql in enumerate(queries, start=1))
+        )
+
     @classmethod
     def _disconnect_signal_callbacks(cls):
         """Disconnects all app-specific signal callbacks.
@@ -52,6 +146,36 @@ class AuthEnhancedTestCaseBase(TestCase):
             dispatch_uid='DAE_user_signup_email_verification'
         )
 
+        post_save.disconnect(
+            callback_invalidate_status,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_invalidate_status_on_save'
+        )
+
+        post_delete.disconnect(
+            callback_invalidate_status,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_invalidate_status_on_delete'
+        )
+
+        pre_save.disconnect(
+            VerificationStatusCounter.callback_status_pre_save,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_pre_save'
+        )
+
+        post_save.disconnect(
+            VerificationStatusCounter.callback_status_post_save,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_post_save'
+        )
+
+        post_delete.disconnect(
+            VerificationStatusCounter.callback_status_post_delete,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_post_delete'
+        )
+
     @classmethod
     def _reconnect_signal_callbacks(cls):
         """(Re-) connects all app-specific signal callbacks.
@@ -85,6 +209,36 @@ class AuthEnhancedTestCaseBase(TestCase):
                 dispatch_uid='DAE_user_signup_email_verification'
             )
 
+        post_save.connect(
+            callback_invalidate_status,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_invalidate_status_on_save'
+        )
+
+        post_delete.connect(
+            callback_invalidate_status,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_invalidate_status_on_delete'
+        )
+
+        pre_save.connect(
+            VerificationStatusCounter.callback_status_pre_save,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_pre_save'
+        )
+
+        post_save.connect(
+            VerificationStatusCounter.callback_status_post_save,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_post_save'
+        )
+
+        post_delete.connect(
+            VerificationStatusCounter.callback_status_post_delete,
+            sender=UserEnhancement,
+            dispatch_uid='DAE_count_status_post_delete'
+        )
+
 
 class AuthEnhancedTestCase(AuthEnhancedTestCaseBase):
     """This test class enables running tests without the app-specific
@@ -128,6 +282,25 @@ class AuthEnhancedPerTestDeactivatedSignalsTestCase(AuthEnhancedTestCaseBase):
         self._reconnect_signal_callbacks()
 
 
+class AuthEnhancedReplicaTestCase(TransactionTestCase):
+    """This test class provides the database 'replica' of the test settings,
+    which is a test mirror of 'default'.
+
+    The replica uses its own connection, that only sees committed data, so
+    this is a TransactionTestCase. The app-specific signal callbacks are
+    connected."""
+
+    databases = {DEFAULT_DB_ALIAS, 'replica'}
+
+    @contextmanager
+    def captureDatabaseQueries(self):
+        """Captures the queries of 'default' and 'replica' separately."""
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as default:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                yield default, replica
+
+
 class AEUrlTestCase(AuthEnhancedTestCase):
     """Test cases for URL configuration
 